@@ -0,0 +1,82 @@
+"""聚类基准：全量 KMeans(n_init=10) vs mini-batch / 热启动
+
+用法（项目根目录）：
+    python benchmarks/bench_clustering.py [--sizes 7043 100000 1000000]
+
+大于样本量的规模由清洗后的数据有放回抽样并加少量抖动得到。
+报告各模式的耗时和簇内平方和（inertia），以全量 KMeans 为基准给出比值。
+"""
+import argparse
+import logging
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from sklearn.cluster import KMeans
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from src.data_processing.data_cleaner import clean_data  # noqa: E402
+from src.feature_engineering import clustering  # noqa: E402
+
+RAW_CSV = Path('data/WA_Fn-UseC_-Telco-Customer-Churn.csv')
+COLS = ['tenure', 'MonthlyCharges', 'TotalCharges']
+
+
+def _scaled(X: np.ndarray, n: int, seed: int = 0) -> np.ndarray:
+    if n <= len(X):
+        return X[:n]
+    rng = np.random.default_rng(seed)
+    out = X[rng.integers(len(X), size=n)]
+    return out + rng.normal(scale=X.std(axis=0) * 0.01, size=out.shape)
+
+
+def _timed(fn):
+    t0 = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - t0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="聚类基准")
+    parser.add_argument('--csv', default=str(RAW_CSV))
+    parser.add_argument('--sizes', type=int, nargs='+', default=[7043, 100_000, 1_000_000])
+    parser.add_argument('--n-clusters', type=int, default=4)
+    args = parser.parse_args(argv)
+    logging.disable(logging.INFO)
+
+    base = clean_data(pd.read_csv(args.csv))[COLS].to_numpy(dtype='float64')
+    k = args.n_clusters
+    print(f"{'rows':>10} {'mode':<12} {'seconds':>9} {'speedup':>8} {'inertia/full':>13}")
+    for n in args.sizes:
+        X = _scaled(base, n)
+        full, t_full = _timed(lambda: KMeans(n_clusters=k, random_state=42, n_init=10).fit(X))
+        ref = full.inertia_
+        print(f"{n:>10} {'full':<12} {t_full:9.3f} {1.0:8.1f} {1.0:13.4f}")
+
+        mb, t_mb = _timed(lambda: clustering.fit_minibatch(X, n_clusters=k))
+        labels, t_pred = _timed(lambda: clustering.predict_chunked(X, mb))
+        ratio = clustering.inertia(X, mb, labels) / ref
+        t = t_mb + t_pred
+        print(f"{n:>10} {'minibatch':<12} {t:9.3f} {t_full / t:8.1f} {ratio:13.4f}")
+
+        # 热启动：用上一次保存的质心作为初始值（模拟增量重跑）
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / 'centroids.json'
+            clustering.save_centroids(mb, path, COLS)
+            init = clustering.load_centroids(path, COLS)
+            warm, t_warm = _timed(lambda: clustering.fit_minibatch(X, n_clusters=k, init=init))
+        ratio = clustering.inertia(X, warm) / ref
+        print(f"{n:>10} {'warm-start':<12} {t_warm:9.3f} {t_full / t_warm:8.1f} {ratio:13.4f}")
+
+        chunks = (X[i:i + 100_000] for i in range(0, len(X), 100_000))
+        stream, t_stream = _timed(lambda: clustering.fit_streaming(chunks, n_clusters=k))
+        ratio = clustering.inertia(X, stream) / ref
+        print(f"{n:>10} {'streaming':<12} {t_stream:9.3f} {t_full / t_stream:8.1f} {ratio:13.4f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+"""单条记录特征路径：一致性校验 + 延迟基准
+
+用法（项目根目录）：
+    python benchmarks/bench_online_features.py [--n 5000] [--pandas-n 200]
+
+1. 在原始 CSV 上 clean_data + FeaturePipeline.fit，批量 transform 作为参考结果
+2. RecordFeaturizer 逐行计算，与参考结果逐位比较（float64 位模式完全相同）
+3. 统计单条延迟 p50 / p99，并与「一行 DataFrame 走 pandas 批量路径」对比
+"""
+import argparse
+import csv
+import logging
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from src.data_processing.data_cleaner import clean_data, compute_fill_values  # noqa: E402
+from src.feature_engineering.online_features import RecordFeaturizer  # noqa: E402
+from src.feature_engineering.pipeline import FeaturePipeline  # noqa: E402
+
+RAW_CSV = Path('data/WA_Fn-UseC_-Telco-Customer-Churn.csv')
+
+
+def _latency(fn, records) -> np.ndarray:
+    """逐条计时（微秒）"""
+    out = np.empty(len(records))
+    for i, rec in enumerate(records):
+        t0 = time.perf_counter_ns()
+        fn(rec)
+        out[i] = (time.perf_counter_ns() - t0) / 1e3
+    return out
+
+
+def _summary(name: str, us: np.ndarray) -> str:
+    return (f"{name:<16} n={len(us):<6} p50={np.percentile(us, 50):9.1f}µs  "
+            f"p99={np.percentile(us, 99):9.1f}µs  mean={us.mean():9.1f}µs")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="单条记录特征路径基准")
+    parser.add_argument('--csv', default=str(RAW_CSV))
+    parser.add_argument('--n', type=int, default=5000, help="单条路径计时条数")
+    parser.add_argument('--pandas-n', type=int, default=200, help="pandas 单行路径计时条数")
+    args = parser.parse_args(argv)
+    logging.disable(logging.INFO)
+
+    raw = pd.read_csv(args.csv)
+    cleaned = clean_data(raw)
+    pipeline = FeaturePipeline(corr_threshold=0.05).fit(cleaned)
+    featurizer = RecordFeaturizer(pipeline, fill_values=compute_fill_values(args.csv))
+    names = featurizer.feature_names_
+    print(f"特征数：{len(names)}，样本数：{len(cleaned)}")
+
+    # ---------- 一致性 ----------
+    expected = pipeline.transform(cleaned)[names].to_numpy(dtype='float64')
+    # 两种输入：pandas 解析后的 dict，以及 csv 模块读出的纯字符串 dict（服务端 JSON 场景）
+    parsed = raw.loc[cleaned.index].to_dict('records')
+    with open(args.csv, newline='', encoding='utf-8') as f:
+        rows = list(csv.DictReader(f))
+    text = [rows[i] for i in cleaned.index]
+    for label, records in (('pandas 解析', parsed), ('原始字符串', text)):
+        got = featurizer.transform_records(records)
+        same = got.view('uint64') == expected.view('uint64')
+        bad = np.flatnonzero(~same.all(axis=1))
+        status = "逐位一致" if not len(bad) else f"{len(bad)} 行不一致，如第 {bad[:5].tolist()} 行"
+        print(f"[一致性] {label}：{status}")
+        if len(bad):
+            cols = [names[j] for j in np.flatnonzero(~same[bad[0]])]
+            print(f"          不一致列：{cols}")
+
+    # ---------- 延迟 ----------
+    rng = np.random.default_rng(0)
+    sample = [text[i] for i in rng.integers(len(text), size=args.n)]
+    for rec in sample[:100]:  # 预热
+        featurizer.transform_record(rec)
+    print(_summary('RecordFeaturizer', _latency(featurizer.transform_record, sample)))
+
+    def pandas_path(rec):
+        df = clean_data(pd.DataFrame([rec]))
+        return pipeline.transform(df)[names].to_numpy(dtype='float64')
+
+    parsed_sample = [parsed[i] for i in rng.integers(len(parsed), size=args.pandas_n)]
+    print(_summary('pandas 单行', _latency(pandas_path, parsed_sample)))
+
+
+if __name__ == '__main__':
+    main()
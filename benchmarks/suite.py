@@ -0,0 +1,299 @@
+"""阶段级性能基准：各公开入口在不同数据规模下的耗时 / 峰值内存 / 吞吐
+
+用法（项目根目录）：
+    python benchmarks/suite.py                                  # 默认规模 7043 / 100k / 1M
+    python benchmarks/suite.py --sizes 7043 1000000 10000000 --cases 'select_*' 'plot_*'
+    python benchmarks/suite.py --save-baseline                  # 本次结果存为基线
+    python benchmarks/suite.py --threshold 0.2 --fail-on-regression
+
+- 每个用例在 fork 出的子进程里执行：缓存（列画像、相关矩阵、随机森林）互不影响，
+  峰值内存取子进程 ru_maxrss 相对开始时 RSS 的增量
+- 大规模数据默认由原始 CSV 有放回抽样得到（customerID 重新编号，空白 TotalCharges 保留）；
+  --synthetic 改用 src/data_processing/synthetic.py 的合成数据（可带空白 / 重复行比例）
+- 每次运行追加到 benchmarks/results/history.jsonl；与 baseline.json 对比，
+  耗时或内存超过基线 (1 + threshold) 倍的记为回退
+"""
+import argparse
+import fnmatch
+import json
+import logging
+import multiprocessing as mp
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import traceback
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+import matplotlib  # noqa: E402
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt  # noqa: E402
+
+from src.data_processing.data_cleaner import clean_data  # noqa: E402
+from src.feature_engineering.basic_features import create_basic_features  # noqa: E402
+from src.feature_engineering.advanced_features import create_advanced_features  # noqa: E402
+from src.feature_engineering import feature_selection  # noqa: E402
+from src.visualization import eda_plots  # noqa: E402
+from src.reporting.quality_report import quality_report  # noqa: E402
+from src.reporting.numerical_report import numerical_report  # noqa: E402
+from src.reporting.feature_documentation import generate_feature_documentation  # noqa: E402
+from src.data_processing import synthetic, polars_backend  # noqa: E402
+from src.feature_engineering.pipeline import FeaturePipeline  # noqa: E402
+from src.pipeline import partitioned  # noqa: E402
+from src.utils.memory import current_rss_mb, peak_rss_mb  # noqa: E402
+
+RAW_CSV = ROOT / 'data' / 'WA_Fn-UseC_-Telco-Customer-Churn.csv'
+RESULTS_DIR = ROOT / 'benchmarks' / 'results'
+DEFAULT_SIZES = [7043, 100_000, 1_000_000]
+
+
+# ---------- 数据 ----------
+def scale_raw(raw: pd.DataFrame, n: int, seed: int = 0) -> pd.DataFrame:
+    """把原始数据放大 / 截取到 n 行"""
+    if n <= len(raw):
+        return raw.iloc[:n].reset_index(drop=True)
+    idx = np.random.default_rng(seed).integers(len(raw), size=n)
+    out = raw.iloc[idx].reset_index(drop=True)
+    out['customerID'] = [f"SYN-{i:09d}" for i in range(n)]
+    return out
+
+
+class Inputs:
+    """按需构造各阶段输入（raw → cleaned → basic → selection），同一规模内复用"""
+
+    def __init__(self, raw: pd.DataFrame):
+        self.raw = raw
+        self._cache = {}
+
+    def get(self, name: str):
+        if name not in self._cache:
+            self._cache[name] = getattr(self, f'_make_{name}')()
+        return self._cache[name]
+
+    def _make_raw(self):
+        return self.raw
+
+    def _make_cleaned(self):
+        return clean_data(self.raw)
+
+    def _make_basic(self):
+        return create_basic_features(self.get('cleaned'))
+
+    def _make_selection(self):
+        basic = self.get('basic')
+        X = basic.select_dtypes(['number', 'bool']).drop(columns=['Churn_numeric', 'num_services'],
+                                                         errors='ignore')
+        return X, basic['Churn_numeric']
+
+
+# ---------- 用例 ----------
+@dataclass
+class Case:
+    name: str
+    input: str
+    run: object
+    max_rows: int = None   # 超过该规模跳过（如 RFE 在千万行上不现实）
+
+
+def _plot(func):
+    def run(df, out):
+        func(df, save_path=str(out / f'{func.__name__}.png'))
+        plt.close('all')
+    return run
+
+
+CASES = [
+    Case('clean_data', 'raw', lambda df, out: clean_data(df)),
+    Case('create_basic_features', 'cleaned', lambda df, out: create_basic_features(df)),
+    Case('create_advanced_features', 'basic', lambda df, out: create_advanced_features(df)),
+    Case('feature_pipeline', 'cleaned', lambda df, out: FeaturePipeline(corr_threshold=0.05).fit_transform(df)),
+    # 分区并行：进程数默认取 CPU 核数，与上面的串行用例对比即为加速比
+    Case('partitioned_clean_data', 'raw', lambda df, out: partitioned.clean_data(df)),
+    Case('partitioned_feature_pipeline', 'cleaned',
+         lambda df, out: partitioned.fit_transform_features(df, FeaturePipeline(corr_threshold=0.05))),
+    Case('select_correlation', 'basic',
+         lambda df, out: feature_selection.select_correlation(df, 'Churn_numeric')),
+    Case('select_rfe', 'selection', lambda xy, out: feature_selection.select_rfe(*xy), max_rows=200_000),
+    Case('select_importance', 'selection',
+         lambda xy, out: feature_selection.select_importance(*xy), max_rows=1_000_000),
+] + ([
+    Case('polars_clean_data', 'raw', lambda df, out: polars_backend.clean_data(df)),
+    Case('polars_create_basic_features', 'cleaned', lambda df, out: polars_backend.create_basic_features(df)),
+] if polars_backend.pl is not None else []) + [
+    Case(name, 'cleaned', _plot(getattr(eda_plots, name)))
+    for name in sorted(n for n in dir(eda_plots) if n.startswith('plot_'))
+] + [
+    Case('quality_report', 'cleaned', lambda df, out: quality_report(df, out)),
+    Case('numerical_report', 'cleaned', lambda df, out: numerical_report(df, out)),
+    Case('feature_documentation', 'basic',
+         lambda df, out: generate_feature_documentation(df, str(out / 'feature_documentation.md'))),
+]
+
+
+def _child(case: Case, inputs: Inputs, conn):
+    """子进程：计时一次用例并把结果发回父进程"""
+    try:
+        logging.disable(logging.WARNING)
+        data = inputs.get(case.input)
+        with tempfile.TemporaryDirectory() as tmp:
+            # 与 reports/ 相同的子目录布局（报告假设 tables/、figures/ 已由 main.py 建好）
+            for sub in ('tables', 'figures'):
+                (Path(tmp) / sub).mkdir()
+            rss0 = current_rss_mb()
+            wall0, cpu0 = time.perf_counter(), time.process_time()
+            case.run(data, Path(tmp))
+            wall, cpu = time.perf_counter() - wall0, time.process_time() - cpu0
+            conn.send({'wall_s': wall, 'cpu_s': cpu, 'peak_mem_mb': max(0.0, peak_rss_mb() - rss0)})
+    except Exception:
+        conn.send({'error': traceback.format_exc(limit=3)})
+    finally:
+        conn.close()
+
+
+def run_case(case: Case, inputs: Inputs, repeat: int = 1) -> dict:
+    """fork 子进程执行 repeat 次，取最快一次的耗时与最小的内存增量"""
+    ctx = mp.get_context('fork')
+    runs = []
+    for _ in range(repeat):
+        parent, child = ctx.Pipe(duplex=False)
+        proc = ctx.Process(target=_child, args=(case, inputs, child))
+        proc.start()
+        child.close()
+        result = parent.recv() if parent.poll(None) else {'error': '子进程无输出'}
+        proc.join()
+        if 'error' in result:
+            return result
+        runs.append(result)
+    return {'wall_s': min(r['wall_s'] for r in runs), 'cpu_s': min(r['cpu_s'] for r in runs),
+            'peak_mem_mb': min(r['peak_mem_mb'] for r in runs)}
+
+
+# ---------- 历史 / 基线 ----------
+def _git_commit() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except Exception:
+        return 'unknown'
+
+
+def compare(results: list, baseline: dict, threshold: float) -> list:
+    """与基线逐项比较，返回回退列表"""
+    base = {(r['case'], r['rows']): r for r in baseline.get('results', []) if 'wall_s' in r}
+    regressions = []
+    for r in results:
+        b = base.get((r['case'], r['rows']))
+        if b is None or 'wall_s' not in r:
+            continue
+        r['baseline_wall_s'] = b['wall_s']
+        r['wall_ratio'] = r['wall_s'] / b['wall_s'] if b['wall_s'] > 0 else float('inf')
+        mem_ratio = (r['peak_mem_mb'] / b['peak_mem_mb']) if b['peak_mem_mb'] > 1 else 1.0
+        r['mem_ratio'] = mem_ratio
+        if r['wall_ratio'] > 1 + threshold or mem_ratio > 1 + threshold:
+            r['regression'] = True
+            regressions.append(r)
+    return regressions
+
+
+def _print_table(results: list):
+    print(f"\n{'case':<32} {'rows':>10} {'wall_s':>9} {'rows/s':>12} {'mem_mb':>9} {'vs base':>8}")
+    for r in results:
+        if 'skipped' in r or 'error' in r:
+            status = 'skipped' if 'skipped' in r else 'ERROR'
+            print(f"{r['case']:<32} {r['rows']:>10} {status:>9}")
+            continue
+        ratio = f"{r['wall_ratio']:.2f}x" if 'wall_ratio' in r else '-'
+        flag = '  << 回退' if r.get('regression') else ''
+        print(f"{r['case']:<32} {r['rows']:>10} {r['wall_s']:9.3f} {r['rows_per_s']:12,.0f} "
+              f"{r['peak_mem_mb']:9.1f} {ratio:>8}{flag}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="阶段级性能基准")
+    parser.add_argument('--csv', default=str(RAW_CSV))
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES)
+    parser.add_argument('--cases', nargs='+', default=['*'], help="用例名通配符，如 'plot_*'")
+    parser.add_argument('--synthetic', action='store_true', help="用合成数据代替重抽样")
+    parser.add_argument('--blank-rate', type=float, default=0.001, help="合成数据的额外空白 TotalCharges 比例")
+    parser.add_argument('--duplicate-rate', type=float, default=0.001, help="合成数据的整行重复比例")
+    parser.add_argument('--repeat', type=int, default=1)
+    parser.add_argument('--results-dir', default=str(RESULTS_DIR))
+    parser.add_argument('--threshold', type=float, default=0.2, help="相对基线的容忍比例")
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--fail-on-regression', action='store_true')
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    logging.disable(logging.WARNING)
+    cases = [c for c in CASES if any(fnmatch.fnmatch(c.name, p) for p in args.cases)]
+    raw = pd.read_csv(args.csv)
+    profile = synthetic.fit_profile(raw) if args.synthetic else None
+
+    results = []
+    for n in sorted(args.sizes):
+        if args.synthetic:
+            data = synthetic.generate_frame(n, profile, blank_rate=args.blank_rate,
+                                            duplicate_rate=args.duplicate_rate)
+        else:
+            data = scale_raw(raw, n)
+        inputs = Inputs(data)
+        print(f"[基准] {n:,} 行：{len(cases)} 个用例", flush=True)
+        for case in cases:
+            record = {'case': case.name, 'rows': n}
+            if case.max_rows is not None and n > case.max_rows:
+                record['skipped'] = f"超过 max_rows={case.max_rows}"
+            else:
+                # 输入在父进程准备好，fork 后子进程直接共享，不计入用例耗时
+                inputs.get(case.input)
+                record.update(run_case(case, inputs, args.repeat))
+                if 'wall_s' in record:
+                    record['rows_per_s'] = n / record['wall_s'] if record['wall_s'] > 0 else float('inf')
+            results.append(record)
+        del inputs
+
+    results_dir = Path(args.results_dir)
+    results_dir.mkdir(parents=True, exist_ok=True)
+    baseline_path = results_dir / 'baseline.json'
+    regressions = []
+    if baseline_path.exists():
+        regressions = compare(results, json.loads(baseline_path.read_text(encoding='utf-8')),
+                              args.threshold)
+    _print_table(results)
+
+    run = {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'commit': _git_commit(),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'data': 'synthetic' if args.synthetic else 'resampled',
+        'machine': platform.machine(),
+        'cpu_count': mp.cpu_count(),
+        'results': results,
+    }
+    with open(results_dir / 'history.jsonl', 'a', encoding='utf-8') as f:
+        f.write(json.dumps(run, ensure_ascii=False) + '\n')
+    if args.save_baseline:
+        baseline_path.write_text(json.dumps(run, indent=2, ensure_ascii=False), encoding='utf-8')
+        print(f"\n[基准] 已保存基线 -> {baseline_path}")
+
+    if regressions:
+        print(f"\n[基准] {len(regressions)} 项超过基线 {1 + args.threshold:.2f} 倍：")
+        for r in regressions:
+            print(f"  - {r['case']} @ {r['rows']:,} 行：耗时 {r['wall_ratio']:.2f}x，内存 {r['mem_ratio']:.2f}x")
+        return 1 if args.fail_on_regression else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
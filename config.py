@@ -16,20 +16,39 @@ def get_config(config_path: str = None) -> Dict[str, Any]:
     # 默认配置
     default_config = {
         'data_path': 'data/WA_Fn-UseC_-Telco-Customer-Churn.csv',
-        'save_cleaned_data': True,
-        'generate_plots': True,
+        # 阶段开关：关闭的阶段不执行（--only 显式指定时以命令行为准）
+        'save_cleaned_data': True,      # 导出 data/cleaned.csv（列式缓存始终写出）
+        'save_engineered_data': True,   # 导出 data/engineered.csv
+        'generate_plots': True,         # eda
+        'generate_reports': True,       # documentation / quality / numerical
+        'train_model': True,            # train
+        'run_search': False,            # search：训练前做超参搜索，最优参数交给 train
         'random_seed': 42,
+        # clean 阶段的执行后端：'pandas'（参考实现）| 'polars'（惰性查询计划，多线程）；
+        # features 阶段始终由 FeaturePipeline（pandas）拟合
+        'backend': 'pandas',
+        # 分区并行（清洗 + 特征工程）：workers > 1 时按分区扇出到进程池；
+        # partition_by：'rows' 按行区间 | 'hash' 按 customerID 哈希
+        'parallel': {'workers': 1, 'partitions': None, 'partition_by': 'rows'},
         
         'data_cleaning': {
             'handle_outliers': False,
             'remove_duplicates': True
         },
         
+        # 特征流水线：cluster_mode 'full'（全量 KMeans）| 'minibatch'（逐块流式，大数据用）；
+        # pca_mode 'exact'（全量 PCA）| 'incremental'（逐块 IncrementalPCA）；
+        # 两者都取流式模式时分区执行不再拼整表；warm_start 时 minibatch 聚类以上次保存的质心热启动
+        'features': {'cluster_mode': 'full', 'pca_mode': 'exact', 'chunksize': 100_000,
+                     'warm_start': False},
+
         'eda': {
             'correlation_threshold': 0.5,
             'top_categories_limit': 10
         },
         
+        # 其余键（n_jobs、scoring、models 及各模型参数）见 src/modeling/train.py 的 DEFAULT_MODELING；
+        # 超参搜索 modeling.search 见 src/modeling/search.py 的 DEFAULT_SEARCH
         'modeling': {
             'test_size': 0.2,
             'cv_folds': 5
@@ -1,21 +1,30 @@
 #!/usr/bin/env python3
 """
 电信客户流失分析主脚本
-功能：加载 → 清洗 → 可视化 → 基础特征 → 高级特征 → 特征选择 → 保存结果
+功能：加载 → 清洗 → 可视化 → 基础特征 → 高级特征 → 特征选择 → 模型训练 → 保存结果
 """
 import sys
+import json
+import argparse
 from pathlib import Path
 import logging
 import pandas as pd
 # ---------- 导入纯函数（不再导入类） ----------
-from src.data_processing.data_cleaner import clean_data
-from src.data_processing.eda import EDA
-from src.feature_engineering.basic_features import create_basic_features
-from src.feature_engineering.advanced_features import create_advanced_features
-from src.feature_engineering.feature_selection import select_correlation
+from src.data_processing.data_cleaner import clean_data, clean_data_chunked, convert_data_types
+from src.data_processing.eda import EDA, PLOT_TASKS
+from src.data_processing.data_cache import read_csv_cached, write_frame, read_frame
+from src.pipeline.stage_graph import Stage, StageGraph
+import src.data_processing.polars_backend as polars_backend
+import src.pipeline.partitioned as partitioned
+import src.modeling.train as train_mod
+import src.modeling.search as search_mod
+from src.feature_engineering.pipeline import FeaturePipeline
 from src.reporting.quality_report import quality_report
 from src.reporting.numerical_report import numerical_report
 from src.reporting.feature_documentation import generate_feature_documentation, save_feature_info_json
+from src.utils.memory import set_memory_tracking
+from src.utils.instrumentation import set_instrumentation, export_metrics
+from config import get_config
 
 # ---------- 路径加入 ----------
 sys.path.append(str(Path(__file__).parent / 'src'))
@@ -40,52 +49,151 @@ def init_dirs():
 
 
 # ---------- 1. 加载数据 ----------
-def load_data() -> pd.DataFrame:
+def load_data(use_csv: bool = False) -> pd.DataFrame:
     csv_path = Path('data/WA_Fn-UseC_-Telco-Customer-Churn.csv')
     if not csv_path.exists():
         raise FileNotFoundError(f"请把原始数据放到 {csv_path}")
-    df = pd.read_csv(csv_path)
+    # 默认走列式缓存（按内容哈希），use_csv=True 才每次重新解析 CSV
+    df = read_csv_cached(csv_path, use_csv=use_csv)
     logging.info(f"[加载] 数据形状：{df.shape}")
     return df
 
 
 # ---------- 2. 数据清洗 ----------
-def run_clean(df: pd.DataFrame) -> pd.DataFrame:
-    df_clean = clean_data(df)  # 直接调纯函数
-    out_path = Path('data/cleaned.csv')
-    df_clean.to_csv(out_path, index=False)
+def save_dataset(df: pd.DataFrame, name: str, use_csv: bool = False, export_csv: bool = True):
+    """中间结果：默认同时写列式文件（保留 dtype，供后续直接读取）与 CSV 导出
+
+    export_csv=False：只写列式文件（--csv 模式下 CSV 是唯一存储，仍会写出）
+    """
+    out_path = Path(f'data/{name}.csv')
+    if not use_csv:
+        out_path = write_frame(df, Path(f'data/{name}.feather'))
+    if use_csv or export_csv:
+        out_path = Path(f'data/{name}.csv')
+        df.to_csv(out_path, index=False)
+    return out_path
+
+
+def dataset_outputs(name: str, use_csv: bool = False, export_csv: bool = True) -> list:
+    """save_dataset 会写出的文件（阶段产物）"""
+    if use_csv:
+        return [Path(f'data/{name}.csv')]
+    return [Path(f'data/{name}.feather')] + ([Path(f'data/{name}.csv')] if export_csv else [])
+
+
+def load_dataset(name: str, use_csv: bool = False) -> pd.DataFrame:
+    """读回 save_dataset 写出的中间结果（CSV 模式下需重新做类型转换）"""
+    if not use_csv:
+        return read_frame(Path(f'data/{name}.feather'))
+    return convert_data_types(pd.read_csv(f'data/{name}.csv'), copy=False)
+
+
+def _parallel_enabled(parallel: dict = None) -> bool:
+    return bool(parallel) and (parallel.get('workers') or 1) > 1
+
+
+def run_clean(df: pd.DataFrame, copy: bool = True, use_csv: bool = False,
+              optimize_dtypes: bool = False, max_memory=None, parallel: dict = None,
+              drop_duplicates: bool = True, export_csv: bool = True) -> pd.DataFrame:
+    if _parallel_enabled(parallel):
+        # 分区并行：逐行步骤扇出到进程池，填充值 / 类别全集 / 去重两阶段汇总
+        df_clean = partitioned.clean_data(df, **parallel, drop_duplicates=drop_duplicates)
+    else:
+        df_clean = clean_data(df, copy=copy, optimize_dtypes=optimize_dtypes,
+                              max_memory=max_memory, drop_duplicates=drop_duplicates)  # 直接调纯函数
+    out_path = save_dataset(df_clean, 'cleaned', use_csv, export_csv)
     logging.info(f"[清洗] 已保存清洗结果 -> {out_path}")
     return df_clean
 
 
+def run_clean_polars(use_csv: bool = False, drop_duplicates: bool = True,
+                     export_csv: bool = True) -> pd.DataFrame:
+    """polars 后端：直接扫描原始 CSV 执行惰性清洗计划（多线程解析，不经过 pandas 读入）"""
+    df_clean = polars_backend.clean_data(RAW_CSV, drop_duplicates=drop_duplicates)
+    out_path = save_dataset(df_clean, 'cleaned', use_csv, export_csv)
+    logging.info(f"[清洗] 已保存清洗结果 -> {out_path}")
+    return df_clean
+
+
+def run_clean_chunked(chunksize: int, approx_error: float = None, drop_duplicates: bool = True) -> dict:
+    """大文件分块清洗：不整体加载原始 CSV，直接流式写出 data/cleaned.csv
+
+    approx_error：填充用的中位数 / 众数改用流式概要近似（KLL / SpaceSaving），内存与取值个数无关；
+                  默认精确，与整表清洗结果一致
+    """
+    csv_path = Path('data/WA_Fn-UseC_-Telco-Customer-Churn.csv')
+    if not csv_path.exists():
+        raise FileNotFoundError(f"请把原始数据放到 {csv_path}")
+    return clean_data_chunked(csv_path, Path('data/cleaned.csv'), chunksize=chunksize,
+                              approx_error=approx_error, drop_duplicates=drop_duplicates)
+
+
 # ---------- 3. 可视化 ----------
-def run_eda(df: pd.DataFrame):
-    eda = EDA()  # 仅保留 EDA 类当调度器，内部仍调纯函数画图
+def run_eda(df: pd.DataFrame, workers: int = None):
+    eda = EDA(max_workers=workers)  # 仅保留 EDA 类当调度器，内部仍调纯函数画图；workers>1 时多进程并行渲染
     paths = eda.perform_visual_analysis(df)
     logging.info(f"[可视化] 共生成 {len(paths)} 张图 -> reports/plots/")
 
 
 # ---------- 4. 特征工程 ----------
-def run_feature_engineering(df: pd.DataFrame) -> pd.DataFrame:
-    # 4.1 基础特征
-    df_base = create_basic_features(df)
-    logging.info(f"[特征] 基础特征完成，列数：{df_base.shape[1]}")
-
-    # 4.2 高级特征
-    df_adv = create_advanced_features(df_base)
-    logging.info(f"[特征] 高级特征完成，列数：{df_adv.shape[1]}")
-
-    # 4.3 特征选择（相关性过滤）
-    if 'Churn_numeric' in df_adv.columns:
-        df_selected = select_correlation(df_adv, target_col='Churn_numeric', threshold=0.05)
+def build_feature_pipeline(features: dict = None) -> FeaturePipeline:
+    """config['features']：聚类 / PCA 模式、块大小；warm_start 时用 models/ 里上次保存的质心热启动"""
+    pipeline = FeaturePipeline.from_config(features)
+    if (features or {}).get('warm_start') and Path('models/feature_pipeline.joblib').exists():
+        pipeline.init_centroids = FeaturePipeline.load(Path('models')).centroids_
+    return pipeline
+
+
+def run_feature_engineering(df: pd.DataFrame, copy: bool = True, use_csv: bool = False,
+                            parallel: dict = None, export_csv: bool = True,
+                            features: dict = None) -> pd.DataFrame:
+    # 基础特征 → 高级特征 → 相关性选择，统一由 FeaturePipeline 拟合；
+    # 拟合状态（编码类别、分箱、质心、PCA、选中列）保存到 models/，新批次直接 transform
+    pipeline = build_feature_pipeline(features)
+    if _parallel_enabled(parallel):
+        df_selected = partitioned.fit_transform_features(df, pipeline, **parallel)
+    else:
+        df_selected = pipeline.fit_transform(df, copy=copy)
+    logging.info(f"[特征] 基础+高级特征完成，列数：{len(pipeline.output_columns_)}")
+    pipeline.save(Path('models'))
+
+    if pipeline.selected_columns_ is not None:
         logging.info(f"[特征] 相关性选择完成，列数：{df_selected.shape[1]}")
         # 保存
-        out_path = Path('data/engineered.csv')
-        df_selected.to_csv(out_path, index=False)
+        out_path = save_dataset(df_selected, 'engineered', use_csv, export_csv)
         logging.info(f"[特征] 已保存特征工程结果 -> {out_path}")
-        return df_selected
 
-    return df_adv
+    return df_selected
+
+# ---------- 5. 模型训练 ----------
+def run_search(df_clean: pd.DataFrame, config: dict = None) -> dict:
+    """config['modeling']['search']：按行子样本预算的 Hyperband / 连续减半，可断点续跑；
+    特征按 config['features'] 在各折训练行上拟合
+    """
+    try:
+        return search_mod.run_search(df_clean, config)
+    except search_mod.CheckpointMismatch as e:
+        # 阶段重跑多半是数据 / 配置变了，旧检查点的试验已不可比，清空后重新搜索
+        logging.warning(f"[搜索] {e.path} 的 {', '.join(e.changed)} 已变化，丢弃旧检查点重新搜索")
+        return search_mod.run_search(df_clean, config, restart=True)
+
+
+def load_search_result(config: dict = None) -> dict:
+    return json.loads(Path(search_mod.search_config(config)['result']).read_text(encoding='utf-8'))
+
+
+def run_training(df_clean: pd.DataFrame, config: dict = None, search: dict = None) -> dict:
+    """config['modeling']：留出比例、折数、候选模型等；折并行，模型与各折耗时写到 models/
+
+    特征流水线按 config['features'] 在各折（及留出评估的）训练行上拟合，不使用 features 阶段的全量结果
+
+    search：超参搜索结果，给出时搜索的模型改用最优参数
+    """
+    overrides = {search['model']: search['best']['params']} if search else None
+    report = train_mod.train_model(df_clean, config, model_dir=Path('models'), overrides=overrides)
+    logging.info(f"[训练] 最优模型 {report['best_model']}，留出集 roc_auc {report['holdout']['roc_auc']:.4f}")
+    return report
+
 
 def generate_feature_documentation_report(engineered_data: pd.DataFrame):
     """生成特征文档"""
@@ -106,38 +214,219 @@ def generate_feature_documentation_report(engineered_data: pd.DataFrame):
         logging.error(f"生成特征文档失败: {e}")
 
 
+# ---------- 阶段图 ----------
+RAW_CSV = Path('data/WA_Fn-UseC_-Telco-Customer-Churn.csv')
+
+
+def build_graph(copy: bool = True, use_csv: bool = False, plot_workers: int = None,
+                optimize_dtypes: bool = False, max_memory=None, backend: str = 'pandas',
+                parallel: dict = None, config: dict = None, use_search: bool = False) -> StageGraph:
+    """把各阶段声明为节点：指纹 = 代码 + 参数 + 上游产物，未变化的节点直接跳过
+
+    code 只需列出阶段入口函数，其调用的本文件函数与传递导入的 src 模块由 StageGraph 自动计入
+
+    backend：clean 阶段的执行后端（pandas / polars）；features 阶段始终由 FeaturePipeline 拟合
+    parallel：{'workers', 'partitions', 'partition_by'}，workers > 1 时清洗与特征工程分区并行
+    config：save_cleaned_data / save_engineered_data 控制 CSV 导出，
+            data_cleaning.remove_duplicates 控制去重
+    use_search：search 阶段在本次所选阶段中时，训练依赖它并改用搜索出的参数
+    """
+    config = config or {}
+    graph = StageGraph()
+    parallel = parallel if _parallel_enabled(parallel) else None
+    if parallel and (optimize_dtypes or max_memory):
+        raise ValueError("--optimize-dtypes / --max-memory 不支持分区并行（各分区会得到不同的类型计划）")
+    drop_duplicates = (config.get('data_cleaning') or {}).get('remove_duplicates', True)
+    export_cleaned = config.get('save_cleaned_data', True)
+    export_engineered = config.get('save_engineered_data', True)
+    features = config.get('features')
+
+    if backend == 'polars':
+        if optimize_dtypes or max_memory:
+            raise ValueError("--optimize-dtypes / --max-memory 目前只支持 pandas 后端")
+        clean_run = lambda: run_clean_polars(use_csv, drop_duplicates, export_cleaned)
+        clean_code = [run_clean_polars]
+    elif backend == 'pandas':
+        clean_run = lambda: run_clean(load_data(use_csv), copy=copy, use_csv=use_csv,
+                                      optimize_dtypes=optimize_dtypes, max_memory=max_memory,
+                                      parallel=parallel, drop_duplicates=drop_duplicates,
+                                      export_csv=export_cleaned)
+        clean_code = [load_data, run_clean]
+    else:
+        raise ValueError(f"未知后端：{backend}，可选 pandas / polars")
+
+    graph.add(Stage(
+        'clean', clean_run,
+        sources=[RAW_CSV],
+        outputs=dataset_outputs('cleaned', use_csv, export_cleaned),
+        code=[save_dataset] + clean_code,
+        params={'use_csv': use_csv, 'optimize_dtypes': optimize_dtypes, 'max_memory': max_memory,
+                'backend': backend, 'parallel': parallel if backend == 'pandas' else None,
+                'drop_duplicates': drop_duplicates, 'export_csv': export_cleaned},
+        load=lambda: load_dataset('cleaned', use_csv)))
+    graph.add(Stage(
+        'eda', lambda df: run_eda(df, workers=plot_workers), deps=['clean'],
+        outputs=[Path(p) for _, _, p in PLOT_TASKS],
+        code=[run_eda]))
+    graph.add(Stage(
+        'features', lambda df: run_feature_engineering(df, copy=copy, use_csv=use_csv, parallel=parallel,
+                                                       export_csv=export_engineered, features=features),
+        deps=['clean'],
+        outputs=dataset_outputs('engineered', use_csv, export_engineered)
+                + [Path('models/feature_pipeline.joblib'), Path('models/feature_pipeline.json')],
+        code=[save_dataset, run_feature_engineering],
+        params={'use_csv': use_csv, 'parallel': parallel, 'export_csv': export_engineered,
+                'features': features},
+        load=lambda: load_dataset('engineered', use_csv)))
+
+    modeling_params = {'modeling': train_mod.modeling_config(config),
+                       'features': train_mod.feature_config(config),
+                       'random_seed': config.get('random_seed', 42)}
+    search = search_mod.search_config(config)
+    graph.add(Stage(
+        'search', lambda df_clean: run_search(df_clean, config),
+        deps=['clean'],
+        outputs=[Path(search['result']), Path(search['checkpoint'])],
+        code=[run_search, load_search_result],
+        params=modeling_params,
+        load=lambda: load_search_result(config)))
+    graph.add(Stage(
+        'train', lambda *inputs: run_training(inputs[0], config, *inputs[1:]),
+        deps=['clean'] + (['search'] if use_search else []),
+        outputs=[Path('models/churn_model.joblib'), Path(f'models/{train_mod.REPORT_NAME}')],
+        code=[run_training],
+        params=modeling_params))
+    graph.add(Stage(
+        'documentation', generate_feature_documentation_report, deps=['features'],
+        outputs=[Path('reports/feature_documentation.md'), Path('reports/feature_info.json')],
+        code=[generate_feature_documentation_report]))
+    graph.add(Stage(
+        'quality', quality_report, deps=['clean'],
+        outputs=[Path('reports/data_quality_report.md'), Path('reports/tables/outlier_detail.csv')],
+        code=[quality_report]))
+    graph.add(Stage(
+        'numerical', numerical_report, deps=['clean'],
+        outputs=[Path('reports/numerical_feature_report.md')],
+        code=[numerical_report]))
+    return graph
+
+
+# 结束时按阶段列出产物
+STAGE_LABELS = {
+    'clean': '清洗数据', 'eda': '图表', 'features': '特征数据', 'search': '超参搜索',
+    'train': '模型 / 训练报告', 'documentation': '特征文档', 'quality': '质量报告', 'numerical': '数值报告',
+}
+STAGES = list(STAGE_LABELS)   # 注册顺序
+
+
+# ---------- 阶段选择 ----------
+# 配置开关 → 受控阶段；未列出的阶段（clean / features）只要被需要就执行
+STAGE_SWITCHES = {
+    'eda': ('generate_plots', True),
+    'search': ('run_search', False),
+    'train': ('train_model', True),
+    'documentation': ('generate_reports', True),
+    'quality': ('generate_reports', True),
+    'numerical': ('generate_reports', True),
+}
+
+
+def select_stages(config: dict, only=(), skip=()) -> list:
+    """本次要产出的阶段：--only 指定时只取这些，否则取配置开关打开的阶段；再去掉 --skip
+
+    返回的是目标阶段，执行时由 StageGraph 补齐其上游（如 --only documentation 会带上 clean、features）
+    """
+    if only:
+        targets = [name for name in STAGES if name in set(only)]
+    else:
+        targets = [name for name in STAGES if config.get(*STAGE_SWITCHES.get(name, (None, True)))]
+    return [name for name in targets if name not in set(skip)]
+
+
+# ---------- 命令行参数 ----------
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='电信客户流失分析')
+    parser.add_argument('--config', default='config.yaml',
+                        help='YAML 配置文件（不存在时使用 config.get_config 的默认配置）')
+    parser.add_argument('--chunksize', type=int, default=None,
+                        help='按块流式清洗大 CSV（仅执行清洗阶段，结果写入 data/cleaned.csv）')
+    parser.add_argument('--approx-error', type=float, default=None,
+                        help='配合 --chunksize：填充用的中位数 / 众数改用概要近似，取值为误差上限'
+                             '（如 0.001）；默认精确计算')
+    parser.add_argument('--no-copy', action='store_true',
+                        help='清洗/特征各步骤不整表复制，只加列（Copy-on-Write 下不影响上游数据）')
+    parser.add_argument('--track-memory', action='store_true',
+                        help='逐步骤记录峰值 RSS 与分配字节数')
+    parser.add_argument('--optimize-dtypes', action='store_true',
+                        help='清洗后按取值范围收窄列类型（int8/int16、float32、Arrow 字符串 / category）')
+    parser.add_argument('--max-memory', default=None,
+                        help="清洗结果的内存预算（如 512MB），预计超出时在类型转换前报错并列出逐列明细")
+    parser.add_argument('--csv', action='store_true',
+                        help='不使用列式缓存，直接解析原始 CSV、只写出 CSV')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='清洗与特征工程分区并行的进程数（覆盖配置 parallel.workers，1 为串行）')
+    parser.add_argument('--plot-workers', type=int, default=None,
+                        help='EDA 图表并行渲染的进程数（默认串行）')
+    parser.add_argument('--metrics-dir', default=None,
+                        help='开启阶段/子步骤埋点，结束后导出 metrics.json 与 Prometheus textfile 到该目录')
+    parser.add_argument('--profile-stage', action='append', default=[], metavar='NAME',
+                        help='对指定阶段或子步骤（如 features、create_cluster_features）做 cProfile，'
+                             '结果写到 <metrics-dir>/profiles/（可重复）')
+    parser.add_argument('--force', action='append', default=[], metavar='STAGE', choices=STAGES + ['all'],
+                        help='强制重跑指定阶段（可重复；all 表示全部），可选：' + ' / '.join(STAGES))
+    parser.add_argument('--only', action='append', default=[], metavar='STAGE', choices=STAGES,
+                        help='只产出指定阶段（可重复，忽略配置开关），上游依赖自动补齐，'
+                             '如 --only features 只执行 clean、features')
+    parser.add_argument('--skip', action='append', default=[], metavar='STAGE', choices=STAGES,
+                        help='不产出指定阶段（可重复）；被其它所选阶段依赖时仍会执行')
+    return parser.parse_args(argv)
+
+
 # ---------- 主流程 ----------
-def main():
+def main(argv=None):
+    args = parse_args(argv)
+    set_memory_tracking(args.track_memory)
+    if args.metrics_dir or args.profile_stage:
+        metrics_dir = Path(args.metrics_dir or 'reports/metrics')
+        set_instrumentation(True, profile_stages=args.profile_stage, profile_dir=metrics_dir / 'profiles')
     init_dirs()
     logging.info("=" * 60)
     logging.info("电信客户流失分析开始")
     logging.info("=" * 60)
 
-    # 1. 加载
-    df_raw = load_data()
-    # 2. 清洗
-    df_clean = run_clean(df_raw)
-    # 3. 可视化
-    run_eda(df_clean)
-    # 4. 特征工程
-    df_engineered = run_feature_engineering(df_clean)
-    # 5. 生成特征文档
-    generate_feature_documentation_report(df_engineered)
+    config = get_config(args.config)
+    drop_duplicates = (config.get('data_cleaning') or {}).get('remove_duplicates', True)
+
+    # 超大文件：只做分块清洗，后续阶段需整表入内存，不在此模式下执行
+    if args.chunksize:
+        stats = run_clean_chunked(args.chunksize, args.approx_error, drop_duplicates)
+        logging.info(f"[清洗] 分块清洗完成：{stats}")
+        return
+
+    # 加载 → 清洗 → 可视化 → 特征工程 → (超参搜索) → 模型训练 → 特征文档 → 质量/数值报告
+    # 只执行所选阶段及其上游，未变化的阶段自动跳过
+    parallel = dict(config.get('parallel') or {})
+    if args.workers is not None:
+        parallel['workers'] = args.workers
+    targets = select_stages(config, only=args.only, skip=args.skip)
+    graph = build_graph(copy=not args.no_copy, use_csv=args.csv, plot_workers=args.plot_workers,
+                        optimize_dtypes=args.optimize_dtypes, max_memory=args.max_memory,
+                        backend=config.get('backend', 'pandas'), parallel=parallel, config=config,
+                        use_search='search' in targets)
+    logging.info(f"[阶段] 目标阶段：{targets}")
+    status = graph.run(force=args.force, targets=targets)
+    if args.metrics_dir or args.profile_stage:
+        export_metrics(metrics_dir)
 
     logging.info("=" * 60)
-    logging.info("全部完成！查看：")
+    logging.info(f"全部完成！阶段状态：{status}，查看：")
     logging.info("- 日志：telco_churn_analysis.log")
-    logging.info("- 图表：reports/plots/")
-    logging.info("- 清洗数据：data/cleaned.csv")
-    logging.info("- 特征数据：data/engineered.csv")
-    logging.info("- 特征文档：reports/feature_documentation.md")
+    for name, label in STAGE_LABELS.items():
+        if name in status:
+            outputs = ', '.join(str(p) for p in graph.stages[name].outputs)
+            logging.info(f"- {label}：{outputs}")
     logging.info("=" * 60)
 
-    quality_report(df_clean)          # 清洗后数据
-    numerical_report(df_clean) 
-    
-
 
 if __name__ == '__main__':
     main()
-    
\ No newline at end of file
@@ -0,0 +1,128 @@
+"""列式（Arrow）磁盘缓存：原始 CSV 与中间结果统一存为 Feather/Parquet
+
+- 原始 CSV 按文件内容哈希建缓存，内容不变时直接读列式文件，跳过 CSV 解析
+- 列式文件保留 category 等 dtype，支持列裁剪
+- 只有显式传 use_csv=True 时才回退为直接解析 CSV
+"""
+import hashlib
+import json
+import logging
+from pathlib import Path
+
+import pandas as pd
+
+try:
+    import pyarrow
+    from pyarrow import feather, parquet
+except ImportError:
+    pyarrow = None
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIR = Path('data/cache')
+FORMATS = {'feather': '.feather', 'parquet': '.parquet'}
+
+
+def _require_pyarrow():
+    if pyarrow is None:
+        raise ImportError("列式缓存需要 pyarrow：pip install pyarrow；或显式传 use_csv=True 回退为 CSV")
+
+
+def file_hash(path, block_size: int = 1 << 20) -> str:
+    """文件内容的 sha256（取前 16 位作缓存键）"""
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            h.update(block)
+    return h.hexdigest()[:16]
+
+
+def _cached_file_hash(path: Path, cache_dir: Path) -> str:
+    """按 (大小, 修改时间) 记住上次的内容哈希，文件未动过时不必重新读全文件"""
+    index_path = cache_dir / 'index.json'
+    index = json.loads(index_path.read_text(encoding='utf-8')) if index_path.exists() else {}
+    stat = path.stat()
+    key = str(path.resolve())
+    entry = index.get(key)
+    if entry and entry['size'] == stat.st_size and entry['mtime_ns'] == stat.st_mtime_ns:
+        return entry['sha']
+
+    sha = file_hash(path)
+    index[key] = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha': sha}
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    index_path.write_text(json.dumps(index, indent=2), encoding='utf-8')
+    return sha
+
+
+def write_frame(df: pd.DataFrame, path, fmt: str = None) -> Path:
+    """写列式文件（格式由 fmt 或后缀决定），保留 dtype"""
+    _require_pyarrow()
+    path = Path(path)
+    fmt = fmt or path.suffix.lstrip('.')
+    if fmt not in FORMATS:
+        raise ValueError(f"不支持的格式：{fmt}，可选 {list(FORMATS)}")
+    path = path.with_suffix(FORMATS[fmt])
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    # 与 CSV 的 index=False 一致，不保存行索引
+    df = df.reset_index(drop=True)
+    if fmt == 'feather':
+        # 不压缩：读取时省去解压，按列裁剪只读所需列
+        df.to_feather(path, compression='uncompressed')
+    else:
+        df.to_parquet(path, index=False)
+    logger.info(f"[缓存] 已写入 {path}")
+    return path
+
+
+def read_frame(path, columns: list = None) -> pd.DataFrame:
+    """读列式文件，columns 做列裁剪
+
+    不做内存映射：to_pandas 总会物化一份 pandas 数据，映射读取的峰值 RSS 与直接读取相同
+    """
+    _require_pyarrow()
+    path = Path(path)
+    if path.suffix == FORMATS['feather']:
+        table = feather.read_table(path, columns=columns)
+    else:
+        table = parquet.read_table(path, columns=columns)
+    # 表内带 pandas 元数据，category 等 dtype 会原样恢复
+    return table.to_pandas()
+
+
+def _options_key(read_csv_kwargs: dict) -> str:
+    """解析参数的指纹：参数不同的调用各自缓存，不会读到别人参数解析出的结果"""
+    if not read_csv_kwargs:
+        return ''
+    text = json.dumps(read_csv_kwargs, sort_keys=True, default=str)
+    return '-' + hashlib.sha256(text.encode('utf-8')).hexdigest()[:8]
+
+
+def read_csv_cached(csv_path, columns: list = None, fmt: str = 'feather',
+                    cache_dir=CACHE_DIR, use_csv: bool = False, **read_csv_kwargs) -> pd.DataFrame:
+    """读取 CSV：命中内容哈希缓存时直接读列式文件，否则解析一次并写入缓存
+
+    use_csv=True 时不使用缓存，直接 pd.read_csv；
+    read_csv_kwargs（dtype、na_values、parse_dates 等）参与缓存键
+    """
+    csv_path = Path(csv_path)
+    if use_csv:
+        return pd.read_csv(csv_path, usecols=columns, **read_csv_kwargs)
+
+    _require_pyarrow()
+    cache_dir = Path(cache_dir)
+    sha = _cached_file_hash(csv_path, cache_dir)
+    cache_path = cache_dir / f"{csv_path.stem}-{sha}{_options_key(read_csv_kwargs)}{FORMATS[fmt]}"
+
+    if cache_path.exists():
+        logger.info(f"[缓存] 命中 {cache_path}")
+        return read_frame(cache_path, columns=columns)
+
+    logger.info(f"[缓存] 未命中，解析 {csv_path}")
+    df = pd.read_csv(csv_path, **read_csv_kwargs)
+    # 同一源文件的旧版本缓存已失效，顺手清掉（当前内容下其它解析参数的缓存保留）
+    for stale in cache_dir.glob(f"{csv_path.stem}-*{FORMATS[fmt]}"):
+        if not stale.name.startswith(f"{csv_path.stem}-{sha}"):
+            stale.unlink()
+    write_frame(df, cache_path, fmt)
+    return df[columns] if columns is not None else df
@@ -2,6 +2,11 @@ import pandas as pd
 import numpy as np
 from sklearn.impute import SimpleImputer
 import logging
+from pathlib import Path
+from src.utils.memory import track_memory, copy_on_write_enabled
+from src.utils.instrumentation import instrument
+from src.utils.sketches import KLLSketch, SpaceSaving
+from src.data_processing import dtype_optimizer
 
 # 全局日志配置（只配置一次，由主程序统一控制格式）
 logging.basicConfig(
@@ -11,9 +16,12 @@ logging.basicConfig(
 
 
 # 1. 处理 TotalCharges -------------------------------------------------------
-def handle_total_charges(df: pd.DataFrame) -> pd.DataFrame:
+@instrument()
+@track_memory
+def handle_total_charges(df: pd.DataFrame, copy: bool = True) -> pd.DataFrame:
     """TotalCharges 转数值 + 缺失用月费*在网时长填充"""
-    df = df.copy()
+    if copy:
+        df = df.copy()
     # 转数值，非法变 NaN
     df['TotalCharges'] = pd.to_numeric(df['TotalCharges'], errors='coerce')
     na_count = df['TotalCharges'].isna().sum()
@@ -27,9 +35,25 @@ def handle_total_charges(df: pd.DataFrame) -> pd.DataFrame:
 
 
 # 2. 缺失值处理 --------------------------------------------------------------
-def handle_missing_values(df: pd.DataFrame) -> pd.DataFrame:
-    """数值列用中位数，分类列用众数"""
-    df = df.copy()
+@instrument()
+@track_memory
+def handle_missing_values(df: pd.DataFrame, fill_values: dict = None,
+                          copy: bool = True) -> pd.DataFrame:
+    """数值列用中位数，分类列用众数
+
+    fill_values: 预先算好的全局填充值 {列名: 值}（分块清洗时由第一遍扫描给出），
+                 传入后不再在当前 df 上重新统计
+    """
+    if copy:
+        df = df.copy()
+
+    if fill_values is not None:
+        fill = {c: v for c, v in fill_values.items() if c in df.columns}
+        num_cols = df.select_dtypes(include=np.number).columns
+        # 与 SimpleImputer 保持一致：数值列统一为 float64
+        df[num_cols] = df[num_cols].astype('float64')
+        df.fillna(fill, inplace=True)
+        return df
 
     # 数值列
     num_cols = df.select_dtypes(include=np.number).columns
@@ -43,25 +67,36 @@ def handle_missing_values(df: pd.DataFrame) -> pd.DataFrame:
     for col in cat_cols:
         if df[col].isna().any():
             mode_val = df[col].mode()[0] if not df[col].mode().empty else 'Unknown'
-            df[col].fillna(mode_val, inplace=True)
+            df[col] = df[col].fillna(mode_val)
             logging.info(f"[清洗] 分类缺失已用众数填充：{col} -> {mode_val}")
 
     return df
 
 
 # 3. 类型转换 ----------------------------------------------------------------
-def convert_data_types(df: pd.DataFrame) -> pd.DataFrame:
-    """按需把列转 category / int / float"""
-    df = df.copy()
-
-    category_cols = [
-        'gender', 'Partner', 'Dependents', 'PhoneService', 'MultipleLines',
-        'InternetService', 'OnlineSecurity', 'OnlineBackup', 'DeviceProtection',
-        'TechSupport', 'StreamingTV', 'StreamingMovies', 'Contract',
-        'PaperlessBilling', 'PaymentMethod', 'Churn'
-    ]
+CATEGORY_COLS = [
+    'gender', 'Partner', 'Dependents', 'PhoneService', 'MultipleLines',
+    'InternetService', 'OnlineSecurity', 'OnlineBackup', 'DeviceProtection',
+    'TechSupport', 'StreamingTV', 'StreamingMovies', 'Contract',
+    'PaperlessBilling', 'PaymentMethod', 'Churn'
+]
+
+
+@instrument()
+@track_memory
+def convert_data_types(df: pd.DataFrame, copy: bool = True, optimize: bool = False,
+                       max_memory=None) -> pd.DataFrame:
+    """按需把列转 category / int / float
+
+    optimize=True：再按实际取值收窄类型（int8/int16、可无损时 float32、Arrow 字符串 / category），
+                   并记录逐列前后内存；默认关闭，保持 int64 / float64 以免下游运算结果变化
+    max_memory：内存预算（字节数或 '512MB'），预计占用超出时在转换前抛 MemoryBudgetError
+    """
+    if copy:
+        df = df.copy()
+
     # 只保留存在的列
-    category_cols = [c for c in category_cols if c in df.columns]
+    category_cols = [c for c in CATEGORY_COLS if c in df.columns]
     df[category_cols] = df[category_cols].astype('category')
 
     if 'SeniorCitizen' in df.columns:
@@ -73,11 +108,19 @@ def convert_data_types(df: pd.DataFrame) -> pd.DataFrame:
     float_cols = [c for c in float_cols if c in df.columns]
     df[float_cols] = df[float_cols].astype('float64')
 
+    if optimize:
+        df, _ = dtype_optimizer.optimize_dtypes(df, max_memory=max_memory)
+    elif max_memory is not None:
+        dtype_optimizer.check_budget(dtype_optimizer.plan_dtypes(df, keep=list(df.columns)), max_memory,
+                                     index_bytes=int(df.index.memory_usage(deep=True)))
+
     logging.info(f"[清洗] 类型转换完成")
     return df
 
 
 # 4. 去重 --------------------------------------------------------------------
+@instrument()
+@track_memory
 def remove_duplicates(df: pd.DataFrame) -> pd.DataFrame:
     """物理去重"""
     old_rows = len(df)
@@ -91,18 +134,239 @@ def remove_duplicates(df: pd.DataFrame) -> pd.DataFrame:
 
 
 # 5. 一键清洗入口 ------------------------------------------------------------
-def clean_data(df: pd.DataFrame) -> pd.DataFrame:
-    """顺序执行所有清洗步骤"""
+@instrument()
+def clean_data(df: pd.DataFrame, copy: bool = True, optimize_dtypes: bool = False,
+               max_memory=None, drop_duplicates: bool = True) -> pd.DataFrame:
+    """顺序执行所有清洗步骤
+
+    copy=False：各步骤不再整表复制，只在原表上改列/加列。
+    Copy-on-Write 开启时入口做一次浅拷贝，调用方的 df 不受影响；否则直接原地修改传入的 df
+    optimize_dtypes / max_memory：见 convert_data_types
+    drop_duplicates=False：保留重复行（对应配置 data_cleaning.remove_duplicates）
+    """
     logging.info("[清洗] 开始数据清洗")
-    df = handle_total_charges(df)
-    df = handle_missing_values(df)
-    df = convert_data_types(df)
-    df = remove_duplicates(df)
+    if not copy and copy_on_write_enabled():
+        df = df.copy(deep=False)
+    df = handle_total_charges(df, copy=copy)
+    df = handle_missing_values(df, copy=copy)
+    df = convert_data_types(df, copy=copy, optimize=optimize_dtypes, max_memory=max_memory)
+    if drop_duplicates:
+        df = remove_duplicates(df)
     logging.info(f"[清洗] 清洗完成，最终形状：{df.shape}")
     return df
 
 
-# 6. 兼容原接口的壳（可选，主程序已改函数调用时可删除） ------------------------
+# 6. 分块（out-of-core）清洗 ----------------------------------------------
+# 两遍扫描：
+#   第一遍：逐块做 TotalCharges 修正，累计 FillStats → 全局中位数 / 众数
+#   第二遍：逐块 填充 → 类型转换 → 基于行哈希的跨块去重 → 追加写出
+# 默认精确（内存随数值列不同取值个数增长）；approx_error 给定时改用概要，内存只与 chunksize 有关。
+# 去重哈希每行 8 字节，按有序段归并维护
+def _median_from_counts(counts: pd.Series) -> float:
+    """由取值频数求精确中位数（与 np.median 口径一致）"""
+    counts = counts.sort_index()
+    cum = counts.cumsum().to_numpy()
+    total = cum[-1]
+    values = counts.index.to_numpy(dtype='float64')
+    lo = values[np.searchsorted(cum, (total - 1) // 2, side='right')]
+    hi = values[np.searchsorted(cum, total // 2, side='right')]
+    return (lo + hi) / 2
+
+
+def _mode_from_counts(counts: pd.Series):
+    """由取值频数求众数，并列时取排序最小值（与 Series.mode()[0] 一致）"""
+    top = counts[counts == counts.max()]
+    return sorted(top.index)[0]
+
+
+def _merge_counts(acc: dict, col: str, counts: pd.Series):
+    acc[col] = counts if col not in acc else acc[col].add(counts, fill_value=0)
+
+
+def _column_kind(s: pd.Series):
+    """'num' | 'cat'；整块为空时 dtype 不可信（全 NaN 会被读成 float），返回 None 留待后续块判定"""
+    if not s.notna().any():
+        return None
+    if pd.api.types.is_numeric_dtype(s) and not pd.api.types.is_bool_dtype(s):
+        return 'num'
+    return 'cat'
+
+
+class FillStats:
+    """填充值所需的可合并统计：分块清洗逐块 update，分区并行各分区 update 后 merge，两者口径一致
+
+    默认精确：数值列累计取值频数求中位数（与 clean_data 的 SimpleImputer 一致），
+    分类列累计取值频数求众数，取值个数超过 max_categories 的列（如 ID）不再累计，有缺失时填 'Unknown'。
+    approx_error 给定时数值列改用 KLL（秩误差 ≤ approx_error）、分类列改用 SpaceSaving
+    （计数误差占比 ≤ approx_error），内存与行数、取值个数无关。
+    列类型在首次出现非空值的块中确定，之后不再随块的 dtype 变化。
+    """
+
+    def __init__(self, approx_error: float = None, max_categories: int = 100_000):
+        self.approx_error = approx_error
+        self.max_categories = max_categories
+        self.kinds, self.na_counts = {}, {}
+        self.num_counts, self.cat_counts, self.dropped = {}, {}, set()
+        self.quantiles, self.frequent = {}, {}
+
+    def update(self, chunk: pd.DataFrame) -> 'FillStats':
+        for col, n in chunk.isna().sum().items():
+            self.na_counts[col] = self.na_counts.get(col, 0) + int(n)
+        for col in chunk.columns:
+            s = chunk[col]
+            kind = self.kinds.get(col)
+            if kind is None:
+                kind = _column_kind(s)
+                if kind is None:
+                    continue
+                self.kinds[col] = kind
+            if kind == 'num':
+                values = pd.to_numeric(s, errors='coerce')
+                if self.approx_error is None:
+                    _merge_counts(self.num_counts, col, values.value_counts())
+                else:
+                    self.quantiles.setdefault(col, KLLSketch.from_error(self.approx_error)).update(
+                        values.to_numpy(dtype='float64', na_value=np.nan))
+            elif self.approx_error is not None:
+                self.frequent.setdefault(col, SpaceSaving.from_error(self.approx_error)).update(s)
+            else:
+                self._count(col, s.value_counts())
+        return self
+
+    def _count(self, col: str, counts: pd.Series):
+        if col in self.dropped:
+            return
+        _merge_counts(self.cat_counts, col, counts)
+        if len(self.cat_counts[col]) > self.max_categories:
+            self.dropped.add(col)
+            del self.cat_counts[col]
+
+    def merge(self, other: 'FillStats') -> 'FillStats':
+        for col, kind in other.kinds.items():
+            self.kinds.setdefault(col, kind)
+        for col, n in other.na_counts.items():
+            self.na_counts[col] = self.na_counts.get(col, 0) + n
+        for col, counts in other.num_counts.items():
+            _merge_counts(self.num_counts, col, counts)
+        for col in other.dropped:
+            self.dropped.add(col)
+            self.cat_counts.pop(col, None)
+        for col, counts in other.cat_counts.items():
+            self._count(col, counts)
+        for mine, theirs in ((self.quantiles, other.quantiles), (self.frequent, other.frequent)):
+            for col, sk in theirs.items():
+                if col in mine:
+                    mine[col].merge(sk)
+                else:
+                    mine[col] = sk
+        return self
+
+    def fill_values(self) -> dict:
+        """数值列中位数（全部数值列，打分服务据此补任意缺失字段）+ 含缺失分类列的众数"""
+        fill_values = {}
+        for col, kind in self.kinds.items():
+            if kind != 'num':
+                continue
+            if col in self.quantiles and self.quantiles[col].n:
+                fill_values[col] = float(self.quantiles[col].quantile(0.5))
+            elif col in self.num_counts and len(self.num_counts[col]):
+                fill_values[col] = float(_median_from_counts(self.num_counts[col]))
+        for col, n in self.na_counts.items():
+            if n == 0 or self.kinds.get(col) == 'num':
+                continue
+            if col in self.frequent and self.frequent[col].counts:
+                fill_values[col] = self.frequent[col].top(1).index[0]
+            elif col in self.cat_counts and len(self.cat_counts[col]):
+                fill_values[col] = _mode_from_counts(self.cat_counts[col])
+            else:
+                fill_values[col] = 'Unknown'
+                logging.warning(f"[分块清洗] {col} 取值过多或全为空，缺失填 'Unknown'")
+        return fill_values
+
+
+def compute_fill_values(csv_path, chunksize: int = 100_000, max_categories: int = 100_000,
+                        approx_error: float = None) -> dict:
+    """第一遍扫描：计算全局填充值（数值列中位数，含缺失分类列的众数），口径见 FillStats
+
+    approx_error：给定时中位数 / 众数改用概要近似（误差上限），默认精确
+    """
+    stats = FillStats(approx_error, max_categories)
+    for chunk in pd.read_csv(csv_path, chunksize=chunksize):
+        stats.update(handle_total_charges(chunk, copy=False))
+    fill_values = stats.fill_values()
+    logging.info(f"[分块清洗] 第一遍完成，全局填充值：{fill_values}")
+    return fill_values
+
+
+class _HashRuns:
+    """已写出行哈希的有序段（LSM 式）：新段与不长于它的末段逐级归并，段数保持 O(log(行数 / 块大小))
+
+    每块的查重与插入摊还为 O(块大小 · log)，不必每块重建整个有序数组
+    """
+
+    def __init__(self):
+        self.runs = []
+
+    def contains(self, hashes: np.ndarray) -> np.ndarray:
+        found = np.zeros(len(hashes), dtype=bool)
+        for run in self.runs:
+            pos = np.searchsorted(run, hashes).clip(max=len(run) - 1)
+            found |= run[pos] == hashes
+        return found
+
+    def add(self, hashes: np.ndarray):
+        """hashes：有序且与已有段不重复"""
+        run = hashes
+        while self.runs and len(self.runs[-1]) <= len(run):
+            # 两个有序段拼接后 timsort 只做一次线性归并
+            run = np.sort(np.concatenate([self.runs.pop(), run]), kind='stable')
+        if len(run):
+            self.runs.append(run)
+
+
+def clean_data_chunked(csv_path, out_path='data/cleaned.csv', chunksize: int = 100_000,
+                       fill_values: dict = None, approx_error: float = None,
+                       drop_duplicates: bool = True) -> dict:
+    """分块清洗大 CSV，结果逐块追加写入 out_path（approx_error 见 compute_fill_values）
+
+    Returns:
+        dict: 行数统计 {'rows_in', 'rows_out', 'duplicates'}
+    """
+    logging.info(f"[分块清洗] 开始：{csv_path}，chunksize={chunksize}")
+    if fill_values is None:
+        fill_values = compute_fill_values(csv_path, chunksize, approx_error=approx_error)
+
+    out_path = Path(out_path)
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    seen = _HashRuns()  # 已写出行的哈希
+    rows_in = rows_out = 0
+
+    for i, chunk in enumerate(pd.read_csv(csv_path, chunksize=chunksize)):
+        rows_in += len(chunk)
+        # 块是 read_csv 新建的局部对象，各步骤无需再复制
+        chunk = handle_total_charges(chunk, copy=False)
+        chunk = handle_missing_values(chunk, fill_values=fill_values, copy=False)
+        chunk = convert_data_types(chunk, copy=False)
+
+        # 块内 + 跨块去重：保留首次出现的行
+        if drop_duplicates:
+            hashes = pd.util.hash_pandas_object(chunk, index=False).to_numpy()
+            uniq, first = np.unique(hashes, return_index=True)
+            new = ~seen.contains(uniq)
+            keep = np.zeros(len(chunk), dtype=bool)
+            keep[first[new]] = True
+            chunk = chunk[keep]
+            seen.add(uniq[new])
+
+        chunk.to_csv(out_path, mode='w' if i == 0 else 'a', header=(i == 0), index=False)
+        rows_out += len(chunk)
+
+    stats = {'rows_in': rows_in, 'rows_out': rows_out, 'duplicates': rows_in - rows_out}
+    logging.info(f"[分块清洗] 完成：{rows_in} -> {rows_out} 行 -> {out_path}")
+    return stats
+
+
+# 7. 兼容原接口的壳（可选，主程序已改函数调用时可删除） ------------------------
 class DataCleaner:
     """壳，保持原 new DataCleaner().clean_data(df) 调用方式"""
     def clean_data(self, df: pd.DataFrame) -> pd.DataFrame:
@@ -0,0 +1,171 @@
+"""按内存预算规划列类型：根据实际取值范围选最窄的安全类型
+
+- 整数：按 [min, max] 选 int8 / int16 / int32（如 tenure、SeniorCitizen → int8）
+- 浮点：转 float32 后按 float_decimals 位小数比对，全部一致才降精度（金额默认保留到分）
+- 字符串：唯一值占比 ≤ category_max_ratio 转 category，否则用 Arrow 字符串（如 customerID）
+- 已是 category / bool 的列保持不变
+
+先出计划（每列当前字节数与预计字节数），给了 max_memory 时在真正转换前比对预算，
+超出则抛 MemoryBudgetError 并附逐列明细；转换后再按实际占用给出前后对比。
+"""
+import logging
+import re
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow  # noqa: F401
+    ARROW_STRING = pd.StringDtype('pyarrow', na_value=np.nan)
+except ImportError:
+    ARROW_STRING = None
+
+logger = logging.getLogger(__name__)
+
+INT_TYPES = ['int8', 'int16', 'int32', 'int64']
+_UNITS = {'': 1, 'B': 1, 'KB': 1024, 'MB': 1024 ** 2, 'GB': 1024 ** 3, 'TB': 1024 ** 4}
+
+
+class MemoryBudgetError(MemoryError):
+    """预计内存超出预算；breakdown 为逐列明细（按预计字节数降序）"""
+
+    def __init__(self, message: str, breakdown: pd.DataFrame):
+        super().__init__(message)
+        self.breakdown = breakdown
+
+
+def parse_bytes(value) -> int:
+    """512 / '512MB' / '1.5 GB' → 字节数"""
+    if isinstance(value, (int, np.integer)):
+        return int(value)
+    m = re.fullmatch(r'\s*([\d.]+)\s*([KMGT]?B?)\s*', str(value).upper())
+    if not m:
+        raise ValueError(f"无法解析内存大小：{value!r}（示例：536870912、'512MB'、'1.5GB'）")
+    unit = m.group(2) if m.group(2).endswith('B') or not m.group(2) else m.group(2) + 'B'
+    return int(float(m.group(1)) * _UNITS[unit])
+
+
+def _fmt_bytes(n: float) -> str:
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if abs(n) < 1024 or unit == 'GB':
+            return f"{n:,.0f} {unit}" if unit == 'B' else f"{n:,.1f} {unit}"
+        n /= 1024
+
+
+def narrowest_int(lo, hi) -> str:
+    for name in INT_TYPES:
+        info = np.iinfo(name)
+        if info.min <= lo and hi <= info.max:
+            return name
+    return 'int64'
+
+
+def float32_safe(s: pd.Series, decimals: int) -> bool:
+    """转 float32 后，按 decimals 位小数取整的结果与原值完全一致"""
+    x = s.to_numpy(dtype='float64', na_value=np.nan)
+    finite = np.isfinite(x)
+    if np.abs(x[finite]).max(initial=0) > np.finfo('float32').max:
+        return False
+    x32 = x.astype('float32').astype('float64')
+    return bool(np.array_equal(np.round(x32[finite], decimals), np.round(x[finite], decimals))
+                and np.array_equal(np.isnan(x32), np.isnan(x)))
+
+
+def _estimate_bytes(s: pd.Series, target: str) -> int:
+    """目标类型下的预计字节数（不做实际转换）"""
+    n = len(s)
+    if target == 'category':
+        uniques = pd.Series(s.dropna().unique())
+        k = len(uniques)
+        code_size = 1 if k < 2 ** 7 else 2 if k < 2 ** 15 else 4
+        return n * code_size + int(uniques.memory_usage(deep=True, index=False))
+    if target == 'arrow_string':
+        # 数据（按字符数估算 UTF-8 字节）+ int64 偏移（pandas 用 large_string）+ 有效位图
+        return int(s.str.len().sum()) + 8 * (n + 1) + (n + 7) // 8
+    return n * np.dtype(target).itemsize
+
+
+def plan_dtypes(df: pd.DataFrame, float_decimals: int = 2, category_max_ratio: float = 0.5,
+                keep: list = ()) -> pd.DataFrame:
+    """逐列给出目标类型与预计字节数；keep 中的列不动"""
+    rows = []
+    for col in df.columns:
+        s = df[col]
+        before = int(s.memory_usage(deep=True, index=False))
+        target, reason = None, '保持'
+        if col in keep:
+            reason = '指定保留'
+        elif isinstance(s.dtype, pd.CategoricalDtype) or pd.api.types.is_bool_dtype(s):
+            reason = '已是 category / bool'
+        elif pd.api.types.is_integer_dtype(s) and len(s):
+            name = narrowest_int(s.min(), s.max())
+            if np.dtype(name).itemsize < s.dtype.itemsize:
+                target, reason = name, f"取值范围 [{s.min()}, {s.max()}]"
+        elif pd.api.types.is_float_dtype(s) and s.dtype.itemsize > 4:
+            if float32_safe(s, float_decimals):
+                target, reason = 'float32', f"float32 保留 {float_decimals} 位小数无损"
+            else:
+                reason = f"float32 无法保留 {float_decimals} 位小数"
+        elif pd.api.types.is_string_dtype(s) or s.dtype == object:
+            ratio = s.nunique(dropna=True) / max(len(s), 1)
+            if ratio <= category_max_ratio:
+                target, reason = 'category', f"唯一值占比 {ratio:.2%}"
+            elif ARROW_STRING is not None and s.dtype != ARROW_STRING:
+                target, reason = 'arrow_string', f"唯一值占比 {ratio:.2%}，转 Arrow 字符串"
+            else:
+                reason = '已是 Arrow 字符串' if ARROW_STRING is not None else '无 pyarrow，保持'
+        after = _estimate_bytes(s, target) if target else before
+        rows.append({'column': col, 'dtype': str(s.dtype), 'target': target or str(s.dtype),
+                     'bytes_before': before, 'bytes_after_est': after, 'reason': reason})
+    return pd.DataFrame(rows).set_index('column')
+
+
+def check_budget(plan: pd.DataFrame, max_memory, index_bytes: int = 0):
+    """预计总字节数超过 max_memory 时抛 MemoryBudgetError（在转换之前调用，尽早失败）"""
+    budget = parse_bytes(max_memory)
+    total = int(plan['bytes_after_est'].sum()) + index_bytes
+    if total <= budget:
+        return total
+    breakdown = plan.sort_values('bytes_after_est', ascending=False)
+    table = breakdown[['dtype', 'target', 'bytes_before', 'bytes_after_est']].head(10).to_string()
+    raise MemoryBudgetError(
+        f"[类型优化] 预计占用 {_fmt_bytes(total)}，超出预算 {_fmt_bytes(budget)} "
+        f"（{_fmt_bytes(total - budget)}）；占用最大的列：\n{table}", breakdown)
+
+
+def apply_plan(df: pd.DataFrame, plan: pd.DataFrame) -> pd.DataFrame:
+    """按计划原地改列类型（调用方负责是否先复制）"""
+    changes = plan[plan['target'] != plan['dtype']]
+    for col, target in changes['target'].items():
+        df[col] = df[col].astype(ARROW_STRING if target == 'arrow_string' else target)
+    return df
+
+
+def memory_report(before: pd.Series, before_dtypes: pd.Series, df: pd.DataFrame) -> pd.DataFrame:
+    """逐列前后对比（实际占用）"""
+    after = df.memory_usage(deep=True, index=False)
+    report = pd.DataFrame({
+        'dtype_before': before_dtypes.astype(str),
+        'dtype_after': df.dtypes.astype(str),
+        'bytes_before': before,
+        'bytes_after': after,
+    })
+    report['saved_pct'] = (1 - report['bytes_after'] / report['bytes_before'].where(report['bytes_before'] > 0)) * 100
+    return report
+
+
+def optimize_dtypes(df: pd.DataFrame, max_memory=None, float_decimals: int = 2,
+                    category_max_ratio: float = 0.5, keep: list = ()):
+    """规划 → 预算检查 → 转换 → 报告；返回 (df, report)"""
+    before = df.memory_usage(deep=True, index=False)
+    before_dtypes = df.dtypes
+    plan = plan_dtypes(df, float_decimals, category_max_ratio, keep)
+    if max_memory is not None:
+        check_budget(plan, max_memory, index_bytes=int(df.index.memory_usage(deep=True)))
+    df = apply_plan(df, plan)
+    report = memory_report(before, before_dtypes, df)
+    total_before, total_after = report['bytes_before'].sum(), report['bytes_after'].sum()
+    logger.info(f"[类型优化] {_fmt_bytes(total_before)} -> {_fmt_bytes(total_after)}"
+                f"（节省 {(1 - total_after / max(total_before, 1)):.1%}）\n"
+                f"{report[report['dtype_before'] != report['dtype_after']].to_string(float_format=lambda v: f'{v:.1f}')}")
+    return df, report
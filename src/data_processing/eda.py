@@ -1,14 +1,51 @@
 # src/data_processing/eda.py - 简化版，只负责可视化
 import logging
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
 from src.visualization.eda_plots import EDAPlots
 
 logger = logging.getLogger(__name__)
 
+# (结果键, EDAPlots 方法名, 保存路径)
+PLOT_TASKS = [
+    # 基础分布图表
+    ('target_dist', 'plot_target_distribution', 'reports/plots/target_distribution.png'),
+    ('numerical_dist', 'plot_numerical_distributions', 'reports/plots/numerical_distributions.png'),
+    ('categorical_dist', 'plot_categorical_distributions', 'reports/plots/categorical_distributions.png'),
+    # 高级分析图表
+    ('churn_rates', 'plot_churn_rates_by_features', 'reports/plots/churn_rates_by_features.png'),
+    ('tenure_vs_churn', 'plot_tenure_vs_churn', 'reports/plots/tenure_vs_churn.png'),
+    ('charges_vs_churn', 'plot_charges_vs_churn', 'reports/plots/charges_vs_churn.png'),
+    ('services_usage', 'plot_services_usage', 'reports/plots/services_usage.png'),
+]
+
+# ---------- 并行渲染：子进程 ----------
+# 每个子进程只从列式文件读一次数据，之后的任务复用，不逐任务 pickle DataFrame
+_worker_df = None
+
+
+def _init_worker(data_path: str):
+    global _worker_df
+    import matplotlib
+    matplotlib.use('Agg')  # 子进程无界面，强制使用 Agg 后端
+    from src.data_processing.data_cache import read_frame
+    _worker_df = read_frame(data_path)
+
+
+def _render(method: str, save_path: str):
+    return getattr(EDAPlots(), method)(_worker_df, save_path)
+
+
 class EDA:
     """探索性数据分析类 - 只负责可视化"""
     
-    def __init__(self):
+    def __init__(self, max_workers: int = None):
+        """max_workers：>1 时用进程池并行渲染各图；None/0/1 为串行"""
         self.plotter = EDAPlots()
+        self.max_workers = max_workers
     
     def perform_visual_analysis(self, df):
         """
@@ -17,36 +54,43 @@ class EDA:
         Returns:dict: 图表文件路径信息
         """
         logger.info("开始可视化分析")
-        
+
+        if self.max_workers and self.max_workers > 1:
+            return self._perform_parallel(df)
+
         plot_paths = {}
         
         try:
-            # 基础分布图表
-            plot_paths['target_dist'] = self.plotter.plot_target_distribution(
-                df, 'reports/plots/target_distribution.png')
-            
-            plot_paths['numerical_dist'] = self.plotter.plot_numerical_distributions(
-                df, 'reports/plots/numerical_distributions.png')
-            
-            plot_paths['categorical_dist'] = self.plotter.plot_categorical_distributions(
-                df, 'reports/plots/categorical_distributions.png')
-            
-            # 高级分析图表
-            plot_paths['churn_rates'] = self.plotter.plot_churn_rates_by_features(
-                df, 'reports/plots/churn_rates_by_features.png')
-            
-            plot_paths['tenure_vs_churn'] = self.plotter.plot_tenure_vs_churn(
-                df, 'reports/plots/tenure_vs_churn.png')
-            
-            plot_paths['charges_vs_churn'] = self.plotter.plot_charges_vs_churn(
-                df, 'reports/plots/charges_vs_churn.png')
-            
-            plot_paths['services_usage'] = self.plotter.plot_services_usage(
-                df, 'reports/plots/services_usage.png')
+            for key, method, save_path in PLOT_TASKS:
+                plot_paths[key] = getattr(self.plotter, method)(df, save_path)
             
             logger.info("可视化分析完成")
             return plot_paths
             
         except Exception as e:
             logger.error(f"可视化分析失败: {e}")
-            return {}
\ No newline at end of file
+            return {}
+
+    def _perform_parallel(self, df):
+        """每张图一个任务，单张失败只记日志，不影响其余图"""
+        from src.data_processing.data_cache import write_frame
+
+        plot_paths = {}
+        workers = min(self.max_workers, len(PLOT_TASKS), os.cpu_count() or 1)
+        with tempfile.TemporaryDirectory() as tmp:
+            data_path = str(write_frame(df, Path(tmp) / 'eda_input.feather'))
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                     initargs=(data_path,)) as pool:
+                futures = {pool.submit(_render, method, save_path): key
+                           for key, method, save_path in PLOT_TASKS}
+                for fut in as_completed(futures):
+                    key = futures[fut]
+                    try:
+                        plot_paths[key] = fut.result()
+                    except Exception as e:
+                        logger.error(f"可视化分析失败（{key}）: {e}")
+
+        # 保持与串行一致的键顺序
+        plot_paths = {key: plot_paths[key] for key, _, _ in PLOT_TASKS if key in plot_paths}
+        logger.info(f"可视化分析完成（并行 {workers} 进程，成功 {len(plot_paths)}/{len(PLOT_TASKS)}）")
+        return plot_paths
@@ -0,0 +1,320 @@
+"""Polars 惰性执行后端：清洗 + 基础特征构建为一个 LazyFrame 查询计划
+
+与 pandas 参考实现（data_cleaner.clean_data / basic_features.create_basic_features）逐列等价：
+- TotalCharges 去空白转数值，缺失用 MonthlyCharges × tenure 填充
+- 数值列中位数、字符串列众数填充（众数并列时取最小值，同 Series.mode()[0]）
+- 分类列转 Enum（类别按取值排序，同 astype('category')），整数 / 浮点列统一为 Int64 / Float64
+- 整行去重（保留首次出现）
+- Churn_numeric（同 LabelEncoder，即排序后的类别序号）、customer_value、num_services、contract_numeric
+- tenure / MonthlyCharges 分箱（右闭区间，首个区间左端不含，同 pd.cut）
+- 除 customerID / Churn 外的分类列 one-hot（drop_first，列按列名排序，同 pd.get_dummies）
+
+整个计划在 collect 时一次性多线程执行，开启谓词 / 投影下推。需要提前物化的只有一次小查询：
+各列缺失数与分类列频数（得到 Enum 类别全集和众数，只给有缺失的列加填充表达式）。
+去重作用于全部列，因此投影下推止于去重之前；去重之后的筛选 / 选列照常下推。
+
+通过 config.get_config()['backend'] = 'polars' 选用；check_parity 对比两条路径的输出。
+main.py 中该开关只切换 clean 阶段：features 阶段由 FeaturePipeline 拟合（基础特征的类别 / 分箱状态
+随流水线保存，供新批次 transform），仍走 pandas 参考实现；basic_features_lazy / clean_and_featurize
+供一次性批处理与一致性校验使用。
+"""
+import argparse
+import logging
+
+import numpy as np
+import pandas as pd
+
+try:
+    import polars as pl
+except ImportError:
+    pl = None
+
+from src.data_processing.data_cleaner import CATEGORY_COLS
+from src.feature_engineering.basic_features import (
+    TENURE_BINS, TENURE_LABELS, CHARGE_BINS, CHARGE_LABELS, CONTRACT_MAPPING, SERVICE_KEYWORDS,
+    ONEHOT_EXCLUDE,
+)
+
+logger = logging.getLogger(__name__)
+
+INT_COLS = ['SeniorCitizen', 'tenure']
+FLOAT_COLS = ['MonthlyCharges', 'TotalCharges']
+
+
+def _require_polars():
+    if pl is None:
+        raise ImportError("polars 后端需要 polars：pip install polars；或在配置中改回 backend: pandas")
+
+
+def _lazy(source) -> 'pl.LazyFrame':
+    """CSV 路径 → scan_csv（TotalCharges / customerID 按字符串读）；DataFrame → LazyFrame"""
+    if isinstance(source, pl.LazyFrame):
+        return source
+    if isinstance(source, pl.DataFrame):
+        return source.lazy()
+    if isinstance(source, pd.DataFrame):
+        # category 列按 pandas 的类别全集（含未出现的类别）转 Enum
+        enum_casts = [pl.col(c).cast(pl.String).cast(pl.Enum([str(v) for v in source[c].cat.categories]))
+                      for c in source.columns if isinstance(source[c].dtype, pd.CategoricalDtype)]
+        return pl.from_pandas(source).lazy().with_columns(enum_casts)
+    return pl.scan_csv(source, schema_overrides={'customerID': pl.String, 'TotalCharges': pl.String})
+
+
+def _is_numeric(dtype) -> bool:
+    return dtype.is_numeric() and dtype != pl.Boolean
+
+
+def _column_stats(lf: 'pl.LazyFrame', columns: list, count_cols: list) -> tuple:
+    """各列缺失数 + count_cols 的取值频数 {值: 次数}，一次查询"""
+    exprs = ([pl.col(c).null_count().alias(f"null:{c}") for c in columns]
+             + [pl.col(c).drop_nulls().value_counts().implode().alias(f"vc:{c}") for c in count_cols])
+    row = lf.select(exprs).collect().row(0, named=True)
+    nulls = {c: row[f"null:{c}"] for c in columns}
+    counts = {c: {d[c]: d['count'] for d in row[f"vc:{c}"]} for c in count_cols}
+    return nulls, counts
+
+
+def _mode(counts: dict):
+    """众数；并列取最小值（同 Series.mode()[0]），无非空值时为 None"""
+    if not counts:
+        return None
+    top = max(counts.values())
+    return min(v for v, n in counts.items() if n == top)
+
+
+def _category_levels(lf: 'pl.LazyFrame', columns: list) -> dict:
+    """分类列的类别全集（排序后的非空取值）；全空列与 pandas 一致填 'Unknown'"""
+    if not columns:
+        return {}
+    row = lf.select([pl.col(c).drop_nulls().unique().sort().implode() for c in columns]).collect().row(0)
+    return {c: (list(v) if len(v) else ['Unknown']) for c, v in zip(columns, row)}
+
+
+# ---------- 清洗 ----------
+def clean_lazy(source, drop_duplicates: bool = True) -> 'pl.LazyFrame':
+    """清洗查询计划（等价于 clean_data）"""
+    _require_polars()
+    lf = _lazy(source)
+    schema = lf.collect_schema()
+
+    # 1. TotalCharges
+    if 'TotalCharges' in schema:
+        total = pl.col('TotalCharges')
+        if schema['TotalCharges'] == pl.String:
+            total = total.str.strip_chars().cast(pl.Float64, strict=False)
+        total = total.cast(pl.Float64)
+        if 'MonthlyCharges' in schema and 'tenure' in schema:
+            total = total.fill_null(pl.col('MonthlyCharges') * pl.col('tenure'))
+        lf = lf.with_columns(total.alias('TotalCharges'))
+        schema = lf.collect_schema()
+
+    # 2. 缺失值：数值列中位数（SimpleImputer 输出 float64），字符串列众数；
+    #    一次小查询拿到各列缺失数与分类列频数（即类别全集与众数），只给有缺失的列加填充
+    cats = [c for c in CATEGORY_COLS if c in schema and not isinstance(schema[c], pl.Enum)]
+    nulls, counts = _column_stats(lf, list(schema), cats)
+    num_cols = [c for c, t in schema.items() if _is_numeric(t)]
+    fills = [pl.col(c).cast(pl.Float64).fill_null(pl.col(c).cast(pl.Float64).median()) if nulls[c]
+             else pl.col(c).cast(pl.Float64) for c in num_cols]
+    for c, t in schema.items():
+        if t != pl.String or not nulls[c]:
+            continue
+        mode = _mode(counts[c]) if c in counts else pl.col(c).drop_nulls().mode().sort().first()
+        fills.append(pl.col(c).fill_null(pl.lit('Unknown') if mode is None else mode))
+    lf = lf.with_columns(fills)
+
+    # 3. 类型转换
+    levels = {c: sorted(counts[c]) or ['Unknown'] for c in cats}
+    lf = lf.with_columns(
+        [pl.col(c).cast(pl.String).cast(pl.Enum(levels[c])) for c in levels]
+        + [pl.col(c).cast(pl.Int64) for c in INT_COLS if c in schema]
+        + [pl.col(c).cast(pl.Float64) for c in FLOAT_COLS if c in schema]
+    )
+
+    # 4. 去重
+    return lf.unique(keep='first', maintain_order=True) if drop_duplicates else lf
+
+
+# ---------- 基础特征 ----------
+def _cut(col: str, bins: list, labels: list) -> 'pl.Expr':
+    """同 pd.cut(right=True)：(b_i, b_{i+1}]，落在首个左端点及以外为空"""
+    expr = pl.lit(None, dtype=pl.String)
+    for lo, hi, label in reversed(list(zip(bins[:-1], bins[1:], labels))):
+        cond = pl.col(col) > lo
+        if np.isfinite(hi):
+            cond = cond & (pl.col(col) <= hi)
+        expr = pl.when(cond).then(pl.lit(label)).otherwise(expr)
+    return expr.cast(pl.Enum(labels))
+
+
+def basic_features_lazy(source) -> 'pl.LazyFrame':
+    """基础特征查询计划（等价于 create_basic_features(encoding='dense')）；输入为已清洗数据"""
+    _require_polars()
+    lf = _lazy(source)
+    schema = lf.collect_schema()
+    to_enum = [c for c, t in schema.items() if t == pl.Categorical]
+    if to_enum:
+        levels = _category_levels(lf, to_enum)
+        lf = lf.with_columns([pl.col(c).cast(pl.String).cast(pl.Enum(levels[c])) for c in to_enum])
+        schema = lf.collect_schema()
+    enums = {c: list(t.categories) for c, t in schema.items() if isinstance(t, pl.Enum)}
+
+    new = []
+    # 目标编码：Enum 的物理编码即排序后的类别序号
+    if 'Churn' in schema:
+        new.append(pl.col('Churn').to_physical().cast(pl.Int64).alias('Churn_numeric'))
+    # 客户价值 / 服务数 / 合约等级
+    if 'MonthlyCharges' in schema and 'tenure' in schema:
+        new.append((pl.col('MonthlyCharges') * pl.col('tenure')).alias('customer_value'))
+    service_cols = [c for c in schema if any(svc in c for svc in SERVICE_KEYWORDS)]
+    if service_cols:
+        numeric_svc = [c for c in service_cols if _is_numeric(schema[c])]
+        if numeric_svc:
+            total = pl.sum_horizontal([pl.col(c).cast(pl.Float64) for c in numeric_svc])
+            any_valid = pl.any_horizontal([pl.col(c).is_not_null() for c in numeric_svc])
+            new.append(pl.when(any_valid).then(total).otherwise(None).alias('num_services'))
+        else:
+            new.append(pl.lit(None, dtype=pl.Float64).alias('num_services'))
+    onehot_levels = {}
+    if 'Contract' in schema:
+        new.append(pl.col('Contract').cast(pl.String).replace_strict(CONTRACT_MAPPING, default=None,
+                                                                     return_dtype=pl.Int64)
+                   .alias('contract_numeric'))
+        contract_levels = enums.get('Contract')
+        if contract_levels is not None:
+            # Categorical.map：类别按原类别顺序映射，未映射的类别丢弃
+            onehot_levels['contract_numeric'] = [CONTRACT_MAPPING[c] for c in contract_levels
+                                                 if c in CONTRACT_MAPPING]
+    # 分箱
+    if 'tenure' in schema:
+        new.append(_cut('tenure', TENURE_BINS, TENURE_LABELS).alias('tenure_group'))
+        onehot_levels['tenure_group'] = TENURE_LABELS
+    if 'MonthlyCharges' in schema:
+        new.append(_cut('MonthlyCharges', CHARGE_BINS, CHARGE_LABELS).alias('monthly_charges_group'))
+        onehot_levels['monthly_charges_group'] = CHARGE_LABELS
+    lf = lf.with_columns(new)
+
+    # one-hot：分类列（Enum / 字符串 / 上面的派生类别列），按列名排序，drop_first
+    for c, t in lf.collect_schema().items():
+        if c in onehot_levels or c in ONEHOT_EXCLUDE:
+            continue
+        if isinstance(t, pl.Enum):
+            onehot_levels[c] = enums[c]
+        elif t == pl.String:
+            onehot_levels.update(_category_levels(lf, [c]))
+    cats = sorted(onehot_levels)
+    if not cats:
+        return lf
+    dummies = [(pl.col(c).cast(pl.String) == str(level)).fill_null(False).alias(f"{c}_{level}")
+               if c != 'contract_numeric' else
+               (pl.col(c) == level).fill_null(False).alias(f"{c}_{level}")
+               for c in cats for level in onehot_levels[c][1:]]
+    keep = [c for c in lf.collect_schema() if c not in set(cats)]
+    return lf.select([pl.col(c) for c in keep] + dummies)
+
+
+# ---------- 与 pandas 路径相同签名的入口 ----------
+def to_pandas(df: 'pl.DataFrame') -> pd.DataFrame:
+    """转回 pandas：Enum → category，字符串 → str，与参考实现的 dtype 一致"""
+    out = df.to_pandas()
+    for c, t in df.schema.items():
+        if t == pl.String:
+            out[c] = out[c].astype('str')
+    return out
+
+
+def clean_data(df, copy: bool = True, drop_duplicates: bool = True) -> pd.DataFrame:
+    """copy 参数仅为与 pandas 版签名一致（polars 不修改输入）"""
+    logger.info("[polars] 开始数据清洗")
+    out = to_pandas(clean_lazy(df, drop_duplicates).collect())
+    logger.info(f"[polars] 清洗完成，最终形状：{out.shape}")
+    return out
+
+
+def create_basic_features(df, copy: bool = True) -> pd.DataFrame:
+    logger.info("[polars] 开始基础特征工程")
+    out = to_pandas(basic_features_lazy(df).collect())
+    logger.info(f"[polars] 基础特征完成，当前列数：{out.shape[1]}")
+    return out
+
+
+def clean_and_featurize(source) -> tuple:
+    """清洗 + 基础特征作为一个计划执行，返回 (cleaned, basic)；清洗结果只物化一次"""
+    cleaned = clean_lazy(source).collect()
+    basic = basic_features_lazy(cleaned).collect()
+    return to_pandas(cleaned), to_pandas(basic)
+
+
+# ---------- 一致性校验 ----------
+def _compare(expected: pd.DataFrame, actual: pd.DataFrame) -> list:
+    """逐列比对，返回差异描述列表（空表示一致）"""
+    problems = []
+    if list(expected.columns) != list(actual.columns):
+        missing = [c for c in expected.columns if c not in actual.columns]
+        extra = [c for c in actual.columns if c not in expected.columns]
+        problems.append(f"列不一致：缺少 {missing}，多出 {extra}" if missing or extra else "列顺序不一致")
+        return problems
+    if len(expected) != len(actual):
+        return [f"行数不一致：{len(expected)} vs {len(actual)}"]
+    for c in expected.columns:
+        e, a = expected[c].reset_index(drop=True), actual[c].reset_index(drop=True)
+        if str(e.dtype) != str(a.dtype):
+            problems.append(f"{c}: dtype {e.dtype} vs {a.dtype}")
+            continue
+        if isinstance(e.dtype, pd.CategoricalDtype) and list(e.cat.categories) != list(a.cat.categories):
+            problems.append(f"{c}: 类别 {list(e.cat.categories)} vs {list(a.cat.categories)}")
+            continue
+        if pd.api.types.is_float_dtype(e):
+            same = np.allclose(e.to_numpy(dtype='float64'), a.to_numpy(dtype='float64'),
+                               rtol=1e-12, atol=0, equal_nan=True)
+        else:
+            same = e.astype(object).where(e.notna(), None).equals(a.astype(object).where(a.notna(), None))
+        if not same:
+            problems.append(f"{c}: 取值不一致")
+    return problems
+
+
+def check_parity(raw: pd.DataFrame) -> dict:
+    """同一份原始数据分别走 pandas / polars，比对清洗结果与基础特征结果"""
+    from src.data_processing import data_cleaner
+    from src.feature_engineering import basic_features
+    logging.disable(logging.INFO)
+    try:
+        ref_clean = data_cleaner.clean_data(raw)
+        ref_basic = basic_features.create_basic_features(ref_clean)
+        pl_clean, pl_basic = clean_and_featurize(raw)
+    finally:
+        logging.disable(logging.NOTSET)
+    return {'cleaned': _compare(ref_clean, pl_clean), 'basic': _compare(ref_basic, pl_basic)}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="polars 后端与 pandas 参考实现的一致性校验")
+    parser.add_argument('--csv', default='data/WA_Fn-UseC_-Telco-Customer-Churn.csv')
+    parser.add_argument('--synthetic-rows', type=int, default=50_000,
+                        help="另用合成数据（含空白 TotalCharges 与重复行）校验，0 表示跳过")
+    args = parser.parse_args(argv)
+
+    datasets = {'source': pd.read_csv(args.csv)}
+    if args.synthetic_rows:
+        from src.data_processing.synthetic import fit_profile, generate_frame
+        datasets['synthetic'] = generate_frame(args.synthetic_rows, fit_profile(datasets['source']),
+                                               blank_rate=0.01, duplicate_rate=0.01)
+        # 额外注入数值 / 字符串缺失，覆盖中位数 / 众数填充
+        rng = np.random.default_rng(0)
+        syn = datasets['synthetic']
+        for col in ['tenure', 'MonthlyCharges', 'PaymentMethod', 'gender']:
+            syn.loc[rng.random(len(syn)) < 0.01, col] = np.nan
+    failed = False
+    for name, raw in datasets.items():
+        result = check_parity(raw)
+        for stage, problems in result.items():
+            status = '一致' if not problems else f"{len(problems)} 处不一致"
+            print(f"[parity] {name:<10} {stage:<8} {status}")
+            for p in problems:
+                print(f"    - {p}")
+            failed |= bool(problems)
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,413 @@
+"""合成 Telco 数据生成器：在原始 CSV 上拟合联合结构，按需生成任意行数
+
+真实客户数据不能拿来压测，而样本只有 7,043 行。这里从原始数据拟合一份可 JSON 保存的画像，
+再按条件链逐列采样，保留下游代码依赖的结构：
+
+- 服务依赖：无电话 → MultipleLines='No phone service'；无网络 → 6 项增值服务 'No internet service'
+- 在网时长 | 合同、网络类型 | 合同、增值服务 | (网络类型, 合同)、账单方式 / 支付方式 | 合同
+- MonthlyCharges：按所订服务的线性定价 + 残差噪声（0.05 取整，截断到原始范围）
+- TotalCharges ≈ MonthlyCharges × tenure × 比例噪声；tenure=0 为空白 ' '（与原始数据一致）
+- Churn | (合同, 网络类型, 在网时长分段)，向合同级流失率收缩，再按合同校准，保证按合同的流失率与原始一致
+
+另可配置额外的空白 TotalCharges 比例和整行重复比例，覆盖清洗器的对应分支。
+生成按块并行，每块的随机流由 (seed, 块号) 派生，结果与并行度无关、可复现。
+
+用法（项目根目录）：
+    python -m src.data_processing.synthetic --rows 1000000 --out data/synthetic_1m.parquet \\
+        --seed 42 --blank-rate 0.001 --duplicate-rate 0.002 --check
+"""
+import argparse
+import json
+import logging
+import shutil
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed
+
+logger = logging.getLogger(__name__)
+
+RAW_CSV = Path('data/WA_Fn-UseC_-Telco-Customer-Churn.csv')
+PROFILE_VERSION = 1
+
+COLUMNS = [
+    'customerID', 'gender', 'SeniorCitizen', 'Partner', 'Dependents', 'tenure', 'PhoneService',
+    'MultipleLines', 'InternetService', 'OnlineSecurity', 'OnlineBackup', 'DeviceProtection',
+    'TechSupport', 'StreamingTV', 'StreamingMovies', 'Contract', 'PaperlessBilling', 'PaymentMethod',
+    'MonthlyCharges', 'TotalCharges', 'Churn',
+]
+ADDON_SERVICES = ['OnlineSecurity', 'OnlineBackup', 'DeviceProtection', 'TechSupport',
+                  'StreamingTV', 'StreamingMovies']
+NO_PHONE, NO_INTERNET = 'No phone service', 'No internet service'
+
+# 采样顺序：(列, 条件列)；条件列必须先于该列生成
+CHAIN = [
+    ('Contract', []),
+    ('tenure', ['Contract']),
+    ('gender', []),
+    ('SeniorCitizen', []),
+    ('Partner', []),
+    ('Dependents', ['Partner']),
+    ('PhoneService', []),
+    ('MultipleLines', ['PhoneService']),
+    ('InternetService', ['Contract']),
+] + [(s, ['InternetService', 'Contract']) for s in ADDON_SERVICES] + [
+    ('PaperlessBilling', ['Contract']),
+    ('PaymentMethod', ['Contract']),
+]
+TENURE_BINS = [0, 12, 24, 48, 72]
+CHURN_SMOOTHING = 20.0   # 流失率向合同级流失率收缩的伪样本数
+
+
+# ---------- 拟合 ----------
+def _fit_conditional(df: pd.DataFrame, col: str, given: list, levels: dict) -> dict:
+    """经验条件分布表：每个条件组合一行概率；空组合回退为边际分布"""
+    codes = pd.Categorical(df[col], categories=levels[col]).codes
+    marginal = np.bincount(codes, minlength=len(levels[col])).astype('float64')
+    marginal /= marginal.sum()
+    if not given:
+        return {'given': [], 'probs': [marginal.tolist()]}
+    shape = [len(levels[g]) for g in given]
+    group = np.ravel_multi_index([pd.Categorical(df[g], categories=levels[g]).codes for g in given], shape)
+    counts = np.zeros((int(np.prod(shape)), len(levels[col])))
+    np.add.at(counts, (group, codes), 1)
+    totals = counts.sum(axis=1, keepdims=True)
+    probs = np.where(totals > 0, counts / np.maximum(totals, 1), marginal)
+    return {'given': list(given), 'probs': probs.tolist()}
+
+
+def _tenure_bin(tenure) -> np.ndarray:
+    return np.digitize(tenure, TENURE_BINS[1:-1], right=True)
+
+
+def _price_design(frame: pd.DataFrame, internet_levels: list) -> np.ndarray:
+    """月费线性定价的设计矩阵：网络类型（各自截距）+ 电话 + 多线 + 各增值服务"""
+    cols = [(frame['InternetService'] == lvl) for lvl in internet_levels]
+    cols.append(frame['PhoneService'] == 'Yes')
+    cols.append(frame['MultipleLines'] == 'Yes')
+    cols += [frame[s] == 'Yes' for s in ADDON_SERVICES]
+    return np.column_stack([np.asarray(c, dtype='float64') for c in cols])
+
+
+def _calibrate_churn(rate: np.ndarray, contract_rate: np.ndarray, levels: dict, conditionals: dict) -> np.ndarray:
+    """按合同做 logit 平移，使生成器自身的（网络, 时长分段 | 合同）分布下的期望流失率等于合同级流失率
+
+    生成时网络类型与时长在给定合同下相互独立采样，与原始数据的联合分布不同，不校准会整体偏移
+    """
+    p_internet = np.asarray(conditionals['InternetService']['probs'])           # 合同 × 网络
+    p_tenure = np.asarray(conditionals['tenure']['probs'])                      # 合同 × 时长
+    bins = _tenure_bin(np.asarray(levels['tenure']))
+    p_bin = np.stack([np.bincount(bins, weights=row, minlength=rate.shape[2]) for row in p_tenure])
+    weight = p_internet[:, :, None] * p_bin[:, None, :]
+    logit = np.log(np.clip(rate, 1e-6, 1 - 1e-6) / (1 - np.clip(rate, 1e-6, 1 - 1e-6)))
+    out = np.empty_like(rate)
+    for c in range(rate.shape[0]):
+        lo, hi = -10.0, 10.0
+        for _ in range(60):
+            mid = (lo + hi) / 2
+            expected = (weight[c] / (1 + np.exp(-(logit[c] + mid)))).sum()
+            lo, hi = (mid, hi) if expected < contract_rate[c] else (lo, mid)
+        out[c] = 1 / (1 + np.exp(-(logit[c] + (lo + hi) / 2)))
+    return out
+
+
+def fit_profile(df: pd.DataFrame) -> dict:
+    """从原始（未清洗）数据拟合生成画像，返回可 JSON 序列化的 dict"""
+    total = pd.to_numeric(df['TotalCharges'], errors='coerce')
+    levels = {col: sorted(df[col].dropna().unique().tolist()) for col, _ in CHAIN if col != 'tenure'}
+    levels['tenure'] = list(range(int(df['tenure'].max()) + 1))
+    levels['SeniorCitizen'] = [int(v) for v in levels['SeniorCitizen']]
+    conditionals = {col: _fit_conditional(df, col, given, levels) for col, given in CHAIN}
+
+    # 月费：最小二乘定价 + 残差
+    X = _price_design(df, levels['InternetService'])
+    y = df['MonthlyCharges'].to_numpy(dtype='float64')
+    coef, *_ = np.linalg.lstsq(X, y, rcond=None)
+    resid_std = float(np.std(y - X @ coef))
+
+    # 累计费用 / (月费 × 时长) 的比例分布
+    paid = df['tenure'] > 0
+    ratio = (total[paid] / (df.loc[paid, 'MonthlyCharges'] * df.loc[paid, 'tenure'])).dropna()
+
+    # 流失率：合同级 + (合同, 网络, 时长分段) 单元格计数
+    churn = (df['Churn'] == 'Yes').to_numpy()
+    contract = pd.Categorical(df['Contract'], categories=levels['Contract']).codes
+    internet = pd.Categorical(df['InternetService'], categories=levels['InternetService']).codes
+    shape = (len(levels['Contract']), len(levels['InternetService']), len(TENURE_BINS) - 1)
+    cell = np.ravel_multi_index([contract, internet, _tenure_bin(df['tenure'])], shape)
+    n_cell = np.bincount(cell, minlength=int(np.prod(shape)))
+    k_cell = np.bincount(cell, weights=churn, minlength=int(np.prod(shape)))
+    contract_rate = (np.bincount(contract, weights=churn, minlength=shape[0])
+                     / np.maximum(np.bincount(contract, minlength=shape[0]), 1))
+    prior = np.repeat(contract_rate, shape[1] * shape[2])
+    churn_rate = (k_cell + CHURN_SMOOTHING * prior) / (n_cell + CHURN_SMOOTHING)
+    churn_rate = _calibrate_churn(churn_rate.reshape(shape), contract_rate, levels, conditionals).ravel()
+
+    return {
+        'version': PROFILE_VERSION,
+        'source_rows': int(len(df)),
+        'levels': levels,
+        'conditionals': conditionals,
+        'monthly': {
+            'coef': coef.tolist(),
+            'resid_std': resid_std,
+            'min': float(y.min()),
+            'max': float(y.max()),
+        },
+        'total_ratio': {
+            'mean': float(ratio.mean()),
+            'std': float(ratio.std()),
+            'low': float(ratio.quantile(0.01)),
+            'high': float(ratio.quantile(0.99)),
+        },
+        'churn': {'shape': list(shape), 'rate': churn_rate.tolist(), 'by_contract': contract_rate.tolist()},
+    }
+
+
+def save_profile(profile: dict, path) -> Path:
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(profile, indent=2, ensure_ascii=False), encoding='utf-8')
+    logger.info(f"[合成] 画像已保存 -> {path}")
+    return path
+
+
+def load_profile(path) -> dict:
+    profile = json.loads(Path(path).read_text(encoding='utf-8'))
+    if profile.get('version') != PROFILE_VERSION:
+        raise ValueError(f"画像版本 {profile.get('version')} 与当前 {PROFILE_VERSION} 不一致，请重新拟合")
+    return profile
+
+
+# ---------- 采样 ----------
+def _sample_codes(rng, probs: np.ndarray, group: np.ndarray) -> np.ndarray:
+    """按每行所在条件组的概率表逆 CDF 采样"""
+    cum = np.cumsum(probs, axis=1)
+    cum[:, -1] = 1.0
+    u = rng.random(len(group))
+    return (u[:, None] > cum[group]).sum(axis=1)
+
+
+def _customer_ids(start: int, n: int) -> np.ndarray:
+    """与原始格式一致的 'dddd-AAAAA' 编号，由全局行号唯一确定"""
+    idx = np.arange(start, start + n, dtype='int64')
+    digits = idx % 10_000
+    rest = idx // 10_000
+    letters = []
+    for _ in range(5):
+        letters.append(rest % 26)
+        rest //= 26
+    letter_arr = np.column_stack(letters[::-1]).astype('uint8') + ord('A')
+    suffix = letter_arr.view('S5').ravel().astype(str)
+    return np.char.add(np.char.add(np.char.zfill(digits.astype(str), 4), '-'), suffix)
+
+
+def _enforce_dependencies(out: dict):
+    """服务依赖兜底（空条件组回退为边际分布时也不会破坏）"""
+    no_phone = out['PhoneService'] == 'No'
+    out['MultipleLines'] = np.where(no_phone, NO_PHONE,
+                                    np.where(out['MultipleLines'] == NO_PHONE, 'No', out['MultipleLines']))
+    no_net = out['InternetService'] == 'No'
+    for s in ADDON_SERVICES:
+        out[s] = np.where(no_net, NO_INTERNET, np.where(out[s] == NO_INTERNET, 'No', out[s]))
+
+
+def generate_chunk(profile: dict, n: int, rng: np.random.Generator, start: int = 0,
+                   blank_rate: float = 0.0, duplicate_rate: float = 0.0) -> pd.DataFrame:
+    """生成 n 行原始格式（与 read_csv 原始 CSV 同 dtype）的合成数据
+
+    blank_rate：tenure>0 的行中额外把 TotalCharges 置空白的比例（tenure=0 的行总是空白）
+    duplicate_rate：用块内其它行整行覆盖（含 customerID）的比例，得到物理重复行
+    """
+    levels = profile['levels']
+    codes = {}
+    for col, given in CHAIN:
+        spec = profile['conditionals'][col]
+        probs = np.asarray(spec['probs'])
+        if given:
+            shape = [len(levels[g]) for g in given]
+            group = np.ravel_multi_index([codes[g] for g in given], shape)
+        else:
+            group = np.zeros(n, dtype='int64')
+        codes[col] = _sample_codes(rng, probs, group)
+
+    out = {col: np.asarray(levels[col], dtype=object)[codes[col]] for col, _ in CHAIN
+           if col not in ('tenure', 'SeniorCitizen')}
+    out['tenure'] = codes['tenure'].astype('int64')
+    out['SeniorCitizen'] = np.asarray(levels['SeniorCitizen'], dtype='int64')[codes['SeniorCitizen']]
+    _enforce_dependencies(out)
+
+    # 月费
+    m = profile['monthly']
+    frame = pd.DataFrame({c: out[c] for c in ['InternetService', 'PhoneService', 'MultipleLines']
+                          + ADDON_SERVICES})
+    monthly = _price_design(frame, levels['InternetService']) @ np.asarray(m['coef'])
+    monthly += rng.normal(scale=m['resid_std'], size=n)
+    monthly = np.clip(np.round(monthly * 20) / 20, m['min'], m['max'])
+
+    # 累计费用
+    r = profile['total_ratio']
+    ratio = np.clip(rng.normal(r['mean'], r['std'], size=n), r['low'], r['high'])
+    tenure = out['tenure']
+    total = np.round(monthly * tenure * np.where(tenure == 1, 1.0, ratio), 2)
+    blank = (tenure == 0) | (rng.random(n) < blank_rate)
+    total_str = np.where(blank, ' ', np.char.mod('%.2f', total))
+
+    # 流失
+    c = profile['churn']
+    cell = np.ravel_multi_index([codes['Contract'], codes['InternetService'], _tenure_bin(tenure)], c['shape'])
+    churn = np.where(rng.random(n) < np.asarray(c['rate'])[cell], 'Yes', 'No')
+
+    df = pd.DataFrame({
+        **{k: v for k, v in out.items()},
+        'customerID': _customer_ids(start, n),
+        'MonthlyCharges': monthly,
+        'TotalCharges': total_str,
+        'Churn': churn,
+    })[COLUMNS]
+
+    n_dup = int(round(n * duplicate_rate))
+    if n_dup and n > 1:
+        target = rng.choice(n, size=min(n_dup, n - 1), replace=False)
+        pool = np.setdiff1d(np.arange(n), target)
+        source = pool[rng.integers(len(pool), size=len(target))]
+        df.iloc[target] = df.iloc[source].to_numpy()
+    str_cols = [col for col in COLUMNS if col not in ('SeniorCitizen', 'tenure', 'MonthlyCharges')]
+    df[str_cols] = df[str_cols].astype('str')
+    return df
+
+
+# ---------- 写出 ----------
+def _write_part(profile: dict, n: int, seed_seq, start: int, path: Path, fmt: str,
+                blank_rate: float, duplicate_rate: float) -> Path:
+    df = generate_chunk(profile, n, np.random.default_rng(seed_seq), start, blank_rate, duplicate_rate)
+    if fmt == 'csv':
+        df.to_csv(path, index=False)
+    else:
+        df.to_parquet(path, index=False)
+    return path
+
+
+def _merge_parts(parts: list, out_path: Path, fmt: str):
+    """按块号顺序合并：CSV 直接拼接字节（只保留首块表头），Parquet 逐块追加 row group"""
+    if fmt == 'csv':
+        with open(out_path, 'wb') as out:
+            for i, part in enumerate(parts):
+                with open(part, 'rb') as f:
+                    if i:
+                        f.readline()
+                    shutil.copyfileobj(f, out, 1 << 20)
+        return
+    from pyarrow import parquet
+    writer = None
+    try:
+        for part in parts:
+            table = parquet.read_table(part)
+            if writer is None:
+                writer = parquet.ParquetWriter(out_path, table.schema)
+            writer.write_table(table)
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+def generate(n_rows: int, out_path, profile: dict = None, seed: int = 42, chunksize: int = 100_000,
+             n_jobs: int = -1, blank_rate: float = 0.0, duplicate_rate: float = 0.0) -> Path:
+    """并行生成 n_rows 行写到 out_path（后缀 .csv / .parquet 决定格式）
+
+    每块用 SeedSequence(seed).spawn 派生的独立随机流，输出与 n_jobs 无关
+    """
+    out_path = Path(out_path)
+    fmt = out_path.suffix.lstrip('.').lower()
+    if fmt not in ('csv', 'parquet'):
+        raise ValueError(f"不支持的输出格式：{out_path.suffix}，可选 .csv / .parquet")
+    if profile is None:
+        profile = fit_profile(pd.read_csv(RAW_CSV))
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+
+    starts = list(range(0, n_rows, chunksize))
+    seeds = np.random.SeedSequence(seed).spawn(len(starts))
+    with tempfile.TemporaryDirectory(dir=out_path.parent, prefix='.synthetic_') as tmp:
+        parts = Parallel(n_jobs=n_jobs)(
+            delayed(_write_part)(profile, min(chunksize, n_rows - start), seq, start,
+                                 Path(tmp) / f'part_{i:05d}.{fmt}', fmt, blank_rate, duplicate_rate)
+            for i, (start, seq) in enumerate(zip(starts, seeds))
+        )
+        _merge_parts(parts, out_path, fmt)
+    logger.info(f"[合成] 已生成 {n_rows:,} 行 -> {out_path}")
+    return out_path
+
+
+def generate_frame(n_rows: int, profile: dict = None, seed: int = 42, chunksize: int = 100_000,
+                   blank_rate: float = 0.0, duplicate_rate: float = 0.0) -> pd.DataFrame:
+    """内存版：与 generate 相同的分块随机流，直接返回 DataFrame"""
+    if profile is None:
+        profile = fit_profile(pd.read_csv(RAW_CSV))
+    starts = list(range(0, n_rows, chunksize))
+    seeds = np.random.SeedSequence(seed).spawn(len(starts))
+    chunks = [generate_chunk(profile, min(chunksize, n_rows - start), np.random.default_rng(seq), start,
+                             blank_rate, duplicate_rate)
+              for start, seq in zip(starts, seeds)]
+    return pd.concat(chunks, ignore_index=True)
+
+
+# ---------- 校验 ----------
+def structure_report(df: pd.DataFrame) -> dict:
+    """关键结构指标，用于对比原始与合成数据"""
+    total = pd.to_numeric(df['TotalCharges'], errors='coerce')
+    paid = (df['tenure'] > 0) & total.notna()
+    ratio = total[paid] / (df.loc[paid, 'MonthlyCharges'] * df.loc[paid, 'tenure'])
+    no_net = df['InternetService'] == 'No'
+    return {
+        'rows': int(len(df)),
+        'churn_rate': float((df['Churn'] == 'Yes').mean()),
+        'churn_by_contract': {k: round(float(v), 4) for k, v in
+                              (df['Churn'] == 'Yes').groupby(df['Contract']).mean().items()},
+        'phone_violations': int(((df['PhoneService'] == 'No') != (df['MultipleLines'] == NO_PHONE)).sum()),
+        'internet_violations': int(sum(((df[s] == NO_INTERNET) != no_net).sum() for s in ADDON_SERVICES)),
+        'total_ratio_median': float(ratio.median()),
+        'total_monthly_tenure_corr': float(np.corrcoef(total[paid], (df['MonthlyCharges'] * df['tenure'])[paid])[0, 1]),
+        'blank_total_rate': float((df['TotalCharges'].str.strip() == '').mean()),
+        'duplicate_rate': float(df.duplicated().mean()),
+        'monthly_mean': float(df['MonthlyCharges'].mean()),
+        'tenure_mean': float(df['tenure'].mean()),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="合成 Telco 数据生成器")
+    parser.add_argument('--rows', type=int, required=True)
+    parser.add_argument('--out', required=True, help="输出路径，.csv 或 .parquet")
+    parser.add_argument('--source', default=str(RAW_CSV), help="拟合画像用的原始 CSV")
+    parser.add_argument('--profile', help="已保存的画像 JSON（给出则不重新拟合）")
+    parser.add_argument('--save-profile', help="把拟合出的画像保存到该路径")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--chunksize', type=int, default=100_000)
+    parser.add_argument('--n-jobs', type=int, default=-1)
+    parser.add_argument('--blank-rate', type=float, default=0.0)
+    parser.add_argument('--duplicate-rate', type=float, default=0.0)
+    parser.add_argument('--check', action='store_true', help="生成后与原始数据对比结构指标")
+    args = parser.parse_args(argv)
+
+    source = pd.read_csv(args.source)
+    profile = load_profile(args.profile) if args.profile else fit_profile(source)
+    if args.save_profile:
+        save_profile(profile, args.save_profile)
+    out = generate(args.rows, args.out, profile, seed=args.seed, chunksize=args.chunksize,
+                   n_jobs=args.n_jobs, blank_rate=args.blank_rate, duplicate_rate=args.duplicate_rate)
+    if args.check:
+        synth = pd.read_csv(out) if out.suffix == '.csv' else pd.read_parquet(out)
+        real, fake = structure_report(source), structure_report(synth)
+        print(f"{'metric':<28} {'source':>16} {'synthetic':>16}")
+        for key in real:
+            if isinstance(real[key], dict):
+                for level in real[key]:
+                    print(f"{f'{key}[{level}]':<28} {real[key][level]:>16.4f} {fake[key].get(level, np.nan):>16.4f}")
+            else:
+                print(f"{key:<28} {real[key]:>16.4f} {fake[key]:>16.4f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -4,10 +4,15 @@ import numpy as np
 from sklearn.decomposition import PCA
 from sklearn.cluster import KMeans
 import logging
+from src.utils.memory import track_memory, copy_on_write_enabled
+from src.utils.instrumentation import instrument
 
-def create_interaction_features(df: pd.DataFrame) -> pd.DataFrame:
+@instrument()
+@track_memory
+def create_interaction_features(df: pd.DataFrame, copy: bool = True) -> pd.DataFrame:
     """交互特征：月费×在网时长、平均月费"""
-    df = df.copy()
+    if copy:
+        df = df.copy()
     if all(c in df.columns for c in ['MonthlyCharges', 'tenure']):
         df['monthly_tenure_interaction'] = df['MonthlyCharges'] * df['tenure']
 
@@ -19,9 +24,19 @@ def create_interaction_features(df: pd.DataFrame) -> pd.DataFrame:
     return df
 
 
-def create_cluster_features(df: pd.DataFrame, n_clusters: int = 4) -> pd.DataFrame:
-    """KMeans 聚类，默认 4 类"""
-    df = df.copy()
+@instrument()
+@track_memory
+def create_cluster_features(df: pd.DataFrame, n_clusters: int = 4, copy: bool = True,
+                            mode: str = 'full', init_centroids: np.ndarray = None,
+                            chunksize: int = 100_000) -> pd.DataFrame:
+    """KMeans 聚类，默认 4 类
+
+    mode='full'     ：全量 KMeans(n_init=10)（原实现）
+    mode='minibatch'：抽样 k-means++ 选种子 + MiniBatchKMeans，分块分配（见 clustering.py）
+    init_centroids  ：minibatch 模式下的热启动质心；主流程的质心随 FeaturePipeline.save 持久化
+    """
+    if copy:
+        df = df.copy()
     cols = ['tenure', 'MonthlyCharges', 'TotalCharges']
     avail = [c for c in cols if c in df.columns]
     if len(avail) < 2:
@@ -29,42 +44,92 @@ def create_cluster_features(df: pd.DataFrame, n_clusters: int = 4) -> pd.DataFra
         return df
 
     try:
-        kmeans = KMeans(n_clusters=n_clusters, random_state=42, n_init=10)
-        df['customer_cluster'] = kmeans.fit_predict(df[avail])
-        logging.info(f"[高级特征] 聚类完成，类别数：{n_clusters}")
+        if mode == 'minibatch':
+            from src.feature_engineering import clustering
+            X = df[avail].to_numpy(dtype='float64')
+            centroids = clustering.fit_minibatch(X, n_clusters=n_clusters, init=init_centroids)
+            df['customer_cluster'] = clustering.predict_chunked(X, centroids, chunksize)
+            logging.info(f"[高级特征] 聚类完成（minibatch{'，热启动' if init_centroids is not None else ''}），"
+                         f"类别数：{n_clusters}")
+        elif mode == 'full':
+            kmeans = KMeans(n_clusters=n_clusters, random_state=42, n_init=10)
+            df['customer_cluster'] = kmeans.fit_predict(df[avail])
+            logging.info(f"[高级特征] 聚类完成，类别数：{n_clusters}")
+        else:
+            raise ValueError(f"未知聚类模式：{mode}")
     except Exception as e:
         logging.warning(f"[高级特征] 聚类失败：{e}")
 
     return df
 
 
-def create_pca_features(df: pd.DataFrame, n_components: int = 2) -> pd.DataFrame:
-    """PCA 降维，默认保留 2 维"""
-    df = df.copy()
+@instrument()
+@track_memory
+def create_pca_features(df: pd.DataFrame, n_components: int = 2, copy: bool = True,
+                        mode: str = 'exact', components_path=None,
+                        chunksize: int = 100_000) -> pd.DataFrame:
+    """PCA 降维，默认保留 2 维
+
+    mode='exact'      ：全量 PCA（原实现）
+    mode='incremental'：分块 IncrementalPCA（见 decomposition.py）；df 已在内存中，分块只限制拟合时的临时矩阵，
+                       大数据的核外拟合用 FeaturePipeline(pca_mode='incremental')
+    components_path   ：incremental 模式下的主成分文件，存在则直接复用，否则拟合后写出
+    """
+    if copy:
+        df = df.copy()
     cols = ['tenure', 'MonthlyCharges', 'TotalCharges', 'num_services']
-    avail = [c for c in cols if c in df.columns]
+    # 全为缺失的列（如服务列均非数值时的 num_services）不参与，与 FeaturePipeline 一致
+    avail = [c for c in cols if c in df.columns and df[c].notna().any()]
     if len(avail) < 2:
         logging.warning("[高级特征] PCA 所需字段不足，跳过")
         return df
 
     try:
-        pca = PCA(n_components=n_components, random_state=42)
-        pca_result = pca.fit_transform(df[avail])
+        if mode == 'incremental':
+            from src.feature_engineering import decomposition
+            X = df[avail]
+            saved = decomposition.load_pca(components_path, avail) if components_path else None
+            if saved is None or len(saved['components']) != n_components:
+                chunks = (X.iloc[i:i + chunksize].to_numpy(dtype='float64')
+                          for i in range(0, len(X), chunksize))
+                ipca = decomposition.fit_incremental_pca(chunks, n_components)
+                if components_path:
+                    decomposition.save_pca(ipca, components_path, avail)
+                mean, components, ratio = ipca.mean_, ipca.components_, ipca.explained_variance_ratio_
+            else:
+                mean, components, ratio = saved['mean'], saved['components'], saved['explained_variance_ratio']
+                logging.info(f"[高级特征] 复用已保存的主成分：{components_path}")
+            pca_result = decomposition.transform_chunked(X, mean, components, chunksize)
+        elif mode == 'exact':
+            pca = PCA(n_components=n_components, random_state=42)
+            pca_result = pca.fit_transform(df[avail])
+            ratio = pca.explained_variance_ratio_
+        else:
+            raise ValueError(f"未知 PCA 模式：{mode}")
         for i in range(n_components):
             df[f'pca_{i + 1}'] = pca_result[:, i]
-        logging.info(f"[高级特征] PCA 完成，累计解释方差：{pca.explained_variance_ratio_.sum():.3f}")
+        logging.info(f"[高级特征] PCA 完成，累计解释方差：{ratio.sum():.3f}")
     except Exception as e:
         logging.warning(f"[高级特征] PCA 失败：{e}")
 
     return df
 
 
-def create_advanced_features(df: pd.DataFrame) -> pd.DataFrame:
-    """一键高级特征工程入口"""
+@instrument()
+def create_advanced_features(df: pd.DataFrame, copy: bool = True, cluster_mode: str = 'full',
+                             init_centroids: np.ndarray = None, pca_mode: str = 'exact',
+                             components_path=None) -> pd.DataFrame:
+    """一键高级特征工程入口（copy=False：只加列不整表复制，语义同 clean_data）
+
+    cluster_mode / init_centroids 透传给 create_cluster_features，
+    pca_mode / components_path 透传给 create_pca_features
+    """
     logging.info("[高级特征] 开始高级特征工程")
-    df = create_interaction_features(df)
-    df = create_cluster_features(df)
-    df = create_pca_features(df)
+    if not copy and copy_on_write_enabled():
+        df = df.copy(deep=False)
+    df = create_interaction_features(df, copy=copy)
+    df = create_cluster_features(df, copy=copy, mode=cluster_mode, init_centroids=init_centroids)
+    df = create_pca_features(df, copy=copy, mode=pca_mode, components_path=components_path)
     logging.info("[高级特征] 高级特征工程完成")
     return df
 
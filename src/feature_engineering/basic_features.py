@@ -3,11 +3,26 @@ import pandas as pd
 import numpy as np
 from sklearn.preprocessing import LabelEncoder
 import logging
-
-
-def encode_target(df: pd.DataFrame) -> pd.DataFrame:
+from src.utils.memory import track_memory, copy_on_write_enabled
+from src.utils.instrumentation import instrument
+
+# 分箱 / 映射常量（与 FeaturePipeline 共用）
+TENURE_BINS = [0, 12, 24, 36, 60, np.inf]
+TENURE_LABELS = ['0-1年', '1-2年', '2-3年', '3-5年', '5年以上']
+CHARGE_BINS = [0, 35, 70, 100, np.inf]
+CHARGE_LABELS = ['低消费', '中消费', '高消费', '极高消费']
+CONTRACT_MAPPING = {'Month-to-month': 1, 'One year': 2, 'Two year': 3}
+SERVICE_KEYWORDS = ['OnlineSecurity', 'OnlineBackup', 'DeviceProtection',
+                    'TechSupport', 'StreamingTV', 'StreamingMovies']
+ONEHOT_EXCLUDE = ['customerID', 'Churn']
+
+
+@instrument()
+@track_memory
+def encode_target(df: pd.DataFrame, copy: bool = True) -> pd.DataFrame:
     """目标变量 Churn -> Churn_numeric"""
-    df = df.copy()
+    if copy:
+        df = df.copy()
     if 'Churn' in df.columns:
         le = LabelEncoder()
         df['Churn_numeric'] = le.fit_transform(df['Churn'])
@@ -15,31 +30,42 @@ def encode_target(df: pd.DataFrame) -> pd.DataFrame:
     return df
 
 
-def bin_numerical(df: pd.DataFrame) -> pd.DataFrame:
+@instrument()
+@track_memory
+def bin_numerical(df: pd.DataFrame, copy: bool = True) -> pd.DataFrame:
     """数值分箱：tenure / MonthlyCharges"""
-    df = df.copy()
+    if copy:
+        df = df.copy()
 
     if 'tenure' in df.columns:
-        df['tenure_group'] = pd.cut(
-            df['tenure'],
-            bins=[0, 12, 24, 36, 60, np.inf],
-            labels=['0-1年', '1-2年', '2-3年', '3-5年', '5年以上']
-        )
+        df['tenure_group'] = pd.cut(df['tenure'], bins=TENURE_BINS, labels=TENURE_LABELS)
 
     if 'MonthlyCharges' in df.columns:
-        df['monthly_charges_group'] = pd.cut(
-            df['MonthlyCharges'],
-            bins=[0, 35, 70, 100, np.inf],
-            labels=['低消费', '中消费', '高消费', '极高消费']
-        )
+        df['monthly_charges_group'] = pd.cut(df['MonthlyCharges'], bins=CHARGE_BINS, labels=CHARGE_LABELS)
 
     logging.info("[基础特征] 数值分箱完成")
     return df
 
 
-def onehot_categorical(df: pd.DataFrame) -> pd.DataFrame:
-    """one-hot 编码分类字段（除 ID 和目标）"""
-    cats = df.select_dtypes(['object', 'category']).columns.difference(['customerID', 'Churn'])
+@instrument()
+@track_memory
+def onehot_categorical(df: pd.DataFrame, encoding: str = 'dense', max_categories: int = None,
+                       overflow: str = 'hash'):
+    """one-hot 编码分类字段（除 ID 和目标）
+
+    encoding='dense'  ：pd.get_dummies，返回 DataFrame
+    encoding='sparse' ：返回 SparseFeatures（one-hot 块为 CSR）
+    encoding='codes'  ：每个分类字段一列整数编码，返回 DataFrame
+    max_categories / overflow：非 dense 模式下的高基数回退（见 encoding.CategoricalEncoder）
+    """
+    if encoding != 'dense':
+        from src.feature_engineering.encoding import CategoricalEncoder
+        encoder = CategoricalEncoder(max_categories=max_categories, overflow=overflow)
+        out = encoder.fit_transform(df, output=encoding)
+        logging.info(f"[基础特征] 分类编码完成（{encoding}），one-hot 列数：{len(encoder.onehot_columns_)}")
+        return out
+
+    cats = df.select_dtypes(['object', 'category']).columns.difference(ONEHOT_EXCLUDE)
     if cats.empty:
         return df
 
@@ -48,19 +74,19 @@ def onehot_categorical(df: pd.DataFrame) -> pd.DataFrame:
     return df
 
 
-def create_value_and_service(df: pd.DataFrame) -> pd.DataFrame:
+@instrument()
+@track_memory
+def create_value_and_service(df: pd.DataFrame, copy: bool = True) -> pd.DataFrame:
     """客户价值 & 开通服务数量"""
-    df = df.copy()
+    if copy:
+        df = df.copy()
 
     # 1. 客户价值
     if all(c in df.columns for c in ['MonthlyCharges', 'tenure']):
         df['customer_value'] = df['MonthlyCharges'] * df['tenure']
 
     # 2. 服务数量
-    service_cols = [c for c in df.columns if
-                    any(svc in c for svc in
-                        ['OnlineSecurity', 'OnlineBackup', 'DeviceProtection',
-                         'TechSupport', 'StreamingTV', 'StreamingMovies'])]
+    service_cols = [c for c in df.columns if any(svc in c for svc in SERVICE_KEYWORDS)]
     if service_cols:
         # 只统计 0/1 数值列，避免非数值报错
         numeric_svc = [c for c in service_cols if pd.api.types.is_numeric_dtype(df[c])]
@@ -68,8 +94,7 @@ def create_value_and_service(df: pd.DataFrame) -> pd.DataFrame:
 
     # 3. 合约等级
     if 'Contract' in df.columns:
-        mapping = {'Month-to-month': 1, 'One year': 2, 'Two year': 3}
-        df['contract_numeric'] = df['Contract'].map(mapping)
+        df['contract_numeric'] = df['Contract'].map(CONTRACT_MAPPING)
 
     logging.info("[基础特征] 新特征完成（价值/服务数/合约）")
     return df
@@ -79,12 +104,18 @@ def create_value_and_service(df: pd.DataFrame) -> pd.DataFrame:
 # 先只做目标编码（不碰其他分类列）
 # 再做手工特征（contract_numeric、num_services 等）
 # 最后统一 one-hot 剩余所有分类字段
-def create_basic_features(df: pd.DataFrame) -> pd.DataFrame:
+# copy=False：各步骤只加列不整表复制（语义同 clean_data）
+# encoding='sparse' / 'codes'：分类字段改用稀疏 one-hot / 整数编码（见 onehot_categorical）
+@instrument()
+def create_basic_features(df: pd.DataFrame, copy: bool = True, encoding: str = 'dense',
+                          max_categories: int = None, overflow: str = 'hash'):
     logging.info("[基础特征] 开始基础特征工程")
-    df = encode_target(df)
-    df = create_value_and_service(df)
-    df = bin_numerical(df)
-    df = onehot_categorical(df)
+    if not copy and copy_on_write_enabled():
+        df = df.copy(deep=False)
+    df = encode_target(df, copy=copy)
+    df = create_value_and_service(df, copy=copy)
+    df = bin_numerical(df, copy=copy)
+    df = onehot_categorical(df, encoding=encoding, max_categories=max_categories, overflow=overflow)
     logging.info(f"[基础特征] 完成，当前列数：{df.shape[1]}")
     return df
 
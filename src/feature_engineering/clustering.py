@@ -0,0 +1,157 @@
+"""可扩展聚类：mini-batch / 流式 KMeans
+
+全量 KMeans(n_init=10) 每次执行都要在全部行上跑 10 轮 Lloyd 迭代；这里改为：
+- 种子：在抽样（默认 1 万行）上做 k-means++
+- 拟合：MiniBatchKMeans.partial_fit 随机小批量更新（提前停止），再分块做少量 Lloyd 修正；
+        分块数据流则单遍 partial_fit
+- 热启动：已保存的质心直接作为初始值，只做少量 mini-batch 更新
+- FeaturePipeline(cluster_mode='minibatch')：fit_streaming 逐块拟合 + refine_streaming 修正，
+  数据可以来自分块或分区，主进程不必拼出整表
+- 分配：分块计算最近质心，峰值内存只与 chunksize 有关
+"""
+import json
+import logging
+from pathlib import Path
+
+import numpy as np
+from sklearn.cluster import MiniBatchKMeans, kmeans_plusplus
+
+from src.feature_engineering.pipeline import assign_clusters
+
+logger = logging.getLogger(__name__)
+
+
+def seed_centroids(X: np.ndarray, n_clusters: int, sample_size: int = 10_000,
+                   random_state: int = 42) -> np.ndarray:
+    """在最多 sample_size 行的随机抽样上做 k-means++ 选种子"""
+    rng = np.random.default_rng(random_state)
+    if len(X) > sample_size:
+        X = X[rng.choice(len(X), size=sample_size, replace=False)]
+    centers, _ = kmeans_plusplus(np.asarray(X, dtype='float64'), n_clusters, random_state=random_state)
+    return centers
+
+
+def lloyd_step(X: np.ndarray, centroids: np.ndarray, chunksize: int = 100_000) -> np.ndarray:
+    """分块做一轮 Lloyd 更新（分配 → 求均值）；空簇保留原质心"""
+    return lloyd_step_chunks((X[start:start + chunksize] for start in range(0, len(X), chunksize)),
+                             centroids)
+
+
+def lloyd_step_chunks(chunks, centroids: np.ndarray) -> np.ndarray:
+    """lloyd_step 的数据流版本：逐块累加各簇的和与计数"""
+    k, p = centroids.shape
+    sums = np.zeros((k, p))
+    counts = np.zeros(k)
+    for block in chunks:
+        block = np.asarray(block, dtype='float64')
+        labels = assign_clusters(block, centroids)
+        counts += np.bincount(labels, minlength=k)
+        for j in range(p):
+            sums[:, j] += np.bincount(labels, weights=block[:, j], minlength=k)
+    return np.where(counts[:, None] > 0, sums / np.maximum(counts, 1)[:, None], centroids)
+
+
+def refine_streaming(chunks_fn, centroids: np.ndarray, max_iter: int = 10,
+                     tol: float = 1e-3) -> np.ndarray:
+    """在可重复读取的数据流上做至多 max_iter 轮 Lloyd 修正，质心相对位移低于 tol 即停
+
+    chunks_fn：每次调用都从头返回数据块迭代器
+    """
+    for _ in range(max_iter):
+        new = lloyd_step_chunks(chunks_fn(), centroids)
+        shift = np.linalg.norm(new - centroids) / (np.linalg.norm(centroids) or 1.0)
+        centroids = new
+        if shift < tol:
+            break
+    return centroids
+
+
+def fit_minibatch(X: np.ndarray, n_clusters: int = 4, init: np.ndarray = None,
+                  batch_size: int = 4096, max_steps: int = 200, tol: float = 1e-4,
+                  n_refine: int = 2, sample_size: int = 10_000,
+                  random_state: int = 42) -> np.ndarray:
+    """内存中的矩阵上拟合，返回质心；init 给定时热启动
+
+    随机小批量 partial_fit，质心相对位移连续 10 步低于 tol 即停，
+    最后在全量数据上分块做 n_refine 轮 Lloyd 更新修正小批量带来的偏差
+    """
+    X = np.asarray(X, dtype='float64')
+    if init is None:
+        init = seed_centroids(X, n_clusters, sample_size, random_state)
+    elif init.shape != (n_clusters, X.shape[1]):
+        raise ValueError(f"热启动质心形状 {init.shape} 与 ({n_clusters}, {X.shape[1]}) 不符")
+    km = MiniBatchKMeans(n_clusters=n_clusters, init=init, n_init=1, batch_size=batch_size,
+                         random_state=random_state)
+    rng = np.random.default_rng(random_state)
+    centers, quiet = np.asarray(init, dtype='float64'), 0
+    for _ in range(max_steps):
+        km.partial_fit(X[rng.integers(len(X), size=min(batch_size, len(X)))])
+        shift = np.linalg.norm(km.cluster_centers_ - centers) / (np.linalg.norm(centers) or 1.0)
+        centers = km.cluster_centers_.copy()
+        quiet = quiet + 1 if shift < tol else 0
+        if quiet >= 10:
+            break
+    for _ in range(n_refine):
+        centers = lloyd_step(X, centers)
+    return centers
+
+
+def fit_streaming(chunks, n_clusters: int = 4, init: np.ndarray = None, batch_size: int = 4096,
+                  random_state: int = 42) -> np.ndarray:
+    """分块数据流上单遍拟合，返回质心：第一块用于选种子（未给 init 时），之后逐块 partial_fit"""
+    km = None
+    for chunk in chunks:
+        chunk = np.asarray(chunk, dtype='float64')
+        if km is None:
+            if init is None:
+                init = seed_centroids(chunk, n_clusters, random_state=random_state)
+            km = MiniBatchKMeans(n_clusters=n_clusters, init=init, n_init=1,
+                                 batch_size=batch_size, random_state=random_state)
+        for start in range(0, len(chunk), batch_size):
+            km.partial_fit(chunk[start:start + batch_size])
+    if km is None:
+        raise ValueError("数据流为空")
+    return km.cluster_centers_
+
+
+def predict_chunked(X: np.ndarray, centroids: np.ndarray, chunksize: int = 100_000) -> np.ndarray:
+    """分块最近质心分配（与 FeaturePipeline 同一计算核）"""
+    out = np.empty(len(X), dtype='int32')
+    for start in range(0, len(X), chunksize):
+        block = np.asarray(X[start:start + chunksize], dtype='float64')
+        out[start:start + chunksize] = assign_clusters(block, centroids)
+    return out
+
+
+def inertia(X: np.ndarray, centroids: np.ndarray, labels: np.ndarray = None,
+            chunksize: int = 100_000) -> float:
+    """簇内平方和（分块计算）"""
+    total = 0.0
+    for start in range(0, len(X), chunksize):
+        block = np.asarray(X[start:start + chunksize], dtype='float64')
+        lab = (assign_clusters(block, centroids) if labels is None
+               else labels[start:start + chunksize])
+        total += float(((block - centroids[lab]) ** 2).sum())
+    return total
+
+
+# ---------- 质心持久化 ----------
+def save_centroids(centroids: np.ndarray, path, columns: list) -> Path:
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps({'columns': list(columns), 'centroids': centroids.tolist()},
+                               indent=2), encoding='utf-8')
+    logger.info(f"[聚类] 质心已保存 -> {path}")
+    return path
+
+
+def load_centroids(path, columns: list = None):
+    """读取质心；列不一致时返回 None（不做热启动）"""
+    path = Path(path)
+    if not path.exists():
+        return None
+    saved = json.loads(path.read_text(encoding='utf-8'))
+    if columns is not None and saved['columns'] != list(columns):
+        logger.warning(f"[聚类] {path} 的列 {saved['columns']} 与当前 {list(columns)} 不一致，忽略热启动")
+        return None
+    return np.asarray(saved['centroids'], dtype='float64')
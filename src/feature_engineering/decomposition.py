@@ -0,0 +1,87 @@
+"""核外（out-of-core）PCA：分块流式 IncrementalPCA
+
+全量 PCA 需要把整个 (行数 × 特征数) 矩阵放进内存；IncrementalPCA 逐块 partial_fit，
+内存只与 chunksize 有关，拟合结果（均值 / 主成分 / 解释方差）保存为 JSON 以便复用。
+主流程经 FeaturePipeline(pca_mode='incremental') 使用：数据块来自分块切片或各分区的数值列文件，
+主成分随流水线一起保存。
+"""
+import json
+import logging
+from pathlib import Path
+
+import numpy as np
+from sklearn.decomposition import IncrementalPCA
+
+logger = logging.getLogger(__name__)
+
+
+def check_no_nan(block: np.ndarray):
+    """PCA 不接受缺失值：发现 NaN 时报出个数，由调用方先填充"""
+    n_nan = int(np.isnan(block).sum())
+    if n_nan:
+        raise ValueError(f"PCA 输入含 {n_nan} 个缺失值（NaN），请先填充或去掉含缺失的列")
+
+
+def fit_incremental_pca(chunks, n_components: int = 2, batch_size: int = None) -> IncrementalPCA:
+    """逐块 partial_fit；块内行数少于 n_components 的尾块并入下一块（或丢弃末尾不足的部分）"""
+    ipca = IncrementalPCA(n_components=n_components, batch_size=batch_size)
+    carry = None
+    for chunk in chunks:
+        chunk = np.asarray(chunk, dtype='float64')
+        check_no_nan(chunk)
+        if carry is not None:
+            chunk, carry = np.vstack([carry, chunk]), None
+        if len(chunk) < n_components:
+            carry = chunk
+            continue
+        ipca.partial_fit(chunk)
+    if not hasattr(ipca, 'components_'):
+        raise ValueError("数据流为空或行数不足以拟合 PCA")
+    if carry is not None:
+        logger.warning(f"[PCA] 末尾 {len(carry)} 行不足 n_components，未参与拟合")
+    return ipca
+
+
+def transform_chunked(X: np.ndarray, mean: np.ndarray, components: np.ndarray,
+                      chunksize: int = 100_000) -> np.ndarray:
+    """分块投影 (X - mean) @ components.T"""
+    out = np.empty((len(X), len(components)))
+    for start in range(0, len(X), chunksize):
+        block = np.asarray(X[start:start + chunksize], dtype='float64')
+        check_no_nan(block)
+        out[start:start + chunksize] = (block - mean) @ components.T
+    return out
+
+
+def iter_chunks(X: np.ndarray, chunksize: int = 100_000):
+    for start in range(0, len(X), chunksize):
+        yield X[start:start + chunksize]
+
+
+# ---------- 持久化 ----------
+def save_pca(ipca, path, columns: list) -> Path:
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps({
+        'columns': list(columns),
+        'n_samples_seen': int(ipca.n_samples_seen_),
+        'mean': ipca.mean_.tolist(),
+        'components': ipca.components_.tolist(),
+        'explained_variance_ratio': ipca.explained_variance_ratio_.tolist(),
+    }, indent=2), encoding='utf-8')
+    logger.info(f"[PCA] 主成分已保存 -> {path}")
+    return path
+
+
+def load_pca(path, columns: list = None):
+    """读取已保存的 PCA；文件不存在或列不一致时返回 None"""
+    path = Path(path)
+    if not path.exists():
+        return None
+    saved = json.loads(path.read_text(encoding='utf-8'))
+    if columns is not None and saved['columns'] != list(columns):
+        logger.warning(f"[PCA] {path} 的列 {saved['columns']} 与当前 {list(columns)} 不一致，重新拟合")
+        return None
+    for key in ('mean', 'components', 'explained_variance_ratio'):
+        saved[key] = np.asarray(saved[key], dtype='float64')
+    return saved
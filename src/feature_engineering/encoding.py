@@ -0,0 +1,228 @@
+"""分类字段编码引擎：稀疏 one-hot / 整数编码 + 高基数回退
+
+pd.get_dummies 会把每个分类取值展开成一列稠密 bool，列数和内存随类别数线性增长。
+这里提供两种紧凑表示：
+- 'sparse'：one-hot 块为 scipy.sparse CSR（列索引固定，列名 <列>_<取值>，
+            与 get_dummies(drop_first=True) 的列名 / 顺序一致），其余列保持原样
+- 'codes' ：每个分类字段一列最小宽度整数编码（int8 / int16 / int32，-1 表示缺失或未见过）
+取值个数超过 max_categories 的字段按 overflow 回退：
+- 'hash'     ：哈希到 n_buckets 个桶，one-hot 成 <列>_hash_<k>（codes 模式下为桶号）
+- 'frequency'：替换成训练集中的出现频率 <列>_freq（float）
+"""
+import logging
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+from src.feature_engineering.basic_features import ONEHOT_EXCLUDE
+
+logger = logging.getLogger(__name__)
+
+
+def _code_dtype(n: int) -> str:
+    """能容纳 [-1, n) 的最窄有符号整数类型"""
+    for dtype in ('int8', 'int16', 'int32'):
+        if n <= np.iinfo(dtype).max:
+            return dtype
+    return 'int64'
+
+
+def _hash_buckets(values: pd.Series, n_buckets: int) -> np.ndarray:
+    """取值 → 桶号（按字符串哈希，跨进程 / 跨批次稳定），缺失为 -1"""
+    out = np.full(len(values), -1, dtype='int64')
+    mask = values.notna().to_numpy()
+    if mask.any():
+        h = pd.util.hash_array(values[mask].astype(str).to_numpy(dtype=object))
+        out[mask] = (h % np.uint64(n_buckets)).astype('int64')
+    return out
+
+
+@dataclass
+class SparseFeatures:
+    """未编码列（DataFrame）+ one-hot 块（CSR），行顺序一致"""
+    frame: pd.DataFrame
+    onehot: sp.csr_matrix
+    onehot_columns: list
+
+    @property
+    def shape(self):
+        return len(self.frame), self.frame.shape[1] + len(self.onehot_columns)
+
+    @property
+    def columns(self) -> list:
+        return list(self.frame.columns) + list(self.onehot_columns)
+
+    @property
+    def numeric_columns(self) -> list:
+        """可参与数值计算的列：frame 中的数值 / 布尔列 + 全部 one-hot 列"""
+        num = self.frame.select_dtypes(include=['number', 'bool']).columns
+        return list(num) + list(self.onehot_columns)
+
+    def to_csr(self, columns=None, dtype='float64') -> sp.csr_matrix:
+        """按 columns（默认全部数值列）顺序拼成一个 CSR 矩阵"""
+        columns = self.numeric_columns if columns is None else list(columns)
+        onehot_pos = {c: i for i, c in enumerate(self.onehot_columns)}
+        blocks = []
+        for c in columns:
+            if c in onehot_pos:
+                blocks.append(self.onehot[:, onehot_pos[c]])
+            else:
+                blocks.append(sp.csr_matrix(self.frame[c].to_numpy(dtype='float64').reshape(-1, 1)))
+        if not blocks:
+            return sp.csr_matrix((len(self.frame), 0), dtype=dtype)
+        return sp.hstack(blocks, format='csr', dtype=dtype)
+
+    def select(self, columns) -> 'SparseFeatures':
+        """按列名取子集（frame 列与 one-hot 列各自保持原相对顺序）"""
+        keep = set(columns)
+        frame_cols = [c for c in self.frame.columns if c in keep]
+        idx = [i for i, c in enumerate(self.onehot_columns) if c in keep]
+        return SparseFeatures(self.frame[frame_cols], self.onehot[:, idx],
+                              [self.onehot_columns[i] for i in idx])
+
+    def to_frame(self) -> pd.DataFrame:
+        """展开成与 pd.get_dummies 相同布局的稠密 DataFrame（one-hot 列为 bool）"""
+        dense = pd.DataFrame(self.onehot.toarray().astype(bool), columns=self.onehot_columns,
+                             index=self.frame.index)
+        return pd.concat([self.frame, dense], axis=1)
+
+    def memory_usage(self) -> int:
+        return int(self.frame.memory_usage(deep=True).sum() + self.onehot.data.nbytes
+                   + self.onehot.indices.nbytes + self.onehot.indptr.nbytes)
+
+
+class CategoricalEncoder:
+    """分类字段编码器：fit 记下每列的类别全集 / 回退策略，transform 只套用"""
+
+    def __init__(self, max_categories: int = None, overflow: str = 'hash', n_buckets: int = 32,
+                 drop_first: bool = True, exclude=ONEHOT_EXCLUDE):
+        if overflow not in ('hash', 'frequency'):
+            raise ValueError(f"overflow 只支持 'hash' / 'frequency'，收到 {overflow!r}")
+        self.max_categories = max_categories
+        self.overflow = overflow
+        self.n_buckets = n_buckets
+        self.drop_first = drop_first
+        self.exclude = list(exclude)
+
+    def fit(self, df: pd.DataFrame) -> 'CategoricalEncoder':
+        cats = df.select_dtypes(['object', 'category', 'string']).columns.difference(self.exclude)
+        self.columns_ = []   # (列, 策略, 状态)
+        for col in cats:
+            s = df[col]
+            categories = (list(s.cat.categories) if isinstance(s.dtype, pd.CategoricalDtype)
+                          else sorted(s.dropna().unique()))
+            if self.max_categories is None or len(categories) <= self.max_categories:
+                self.columns_.append((col, 'onehot', categories))
+            elif self.overflow == 'hash':
+                self.columns_.append((col, 'hash', self.n_buckets))
+                logger.info(f"[编码] {col} 取值 {len(categories)} 个，超过上限，哈希到 {self.n_buckets} 个桶")
+            else:
+                freq = s.value_counts(normalize=True)
+                self.columns_.append((col, 'frequency', freq))
+                logger.info(f"[编码] {col} 取值 {len(categories)} 个，超过上限，改用频率编码")
+        self.onehot_columns_ = []
+        for col, strategy, state in self.columns_:
+            if strategy == 'onehot':
+                start = 1 if self.drop_first else 0
+                self.onehot_columns_ += [f"{col}_{c}" for c in state[start:]]
+            elif strategy == 'hash':
+                self.onehot_columns_ += [f"{col}_hash_{k}" for k in range(state)]
+        return self
+
+    def _codes(self, df: pd.DataFrame, col: str, strategy: str, state) -> np.ndarray:
+        if strategy == 'onehot':
+            return pd.Categorical(df[col], categories=state).codes.astype('int64')
+        return _hash_buckets(df[col], state)
+
+    def _passthrough(self, df: pd.DataFrame) -> pd.DataFrame:
+        encoded = {col for col, _, _ in self.columns_}
+        frame = df[[c for c in df.columns if c not in encoded]]
+        freq = {f"{col}_freq": df[col].map(state).astype('float64').fillna(0.0)
+                for col, strategy, state in self.columns_ if strategy == 'frequency'}
+        return frame.assign(**freq) if freq else frame
+
+    def transform_sparse(self, df: pd.DataFrame) -> SparseFeatures:
+        n = len(df)
+        rows, cols = [], []
+        offset = 0
+        for col, strategy, state in self.columns_:
+            if strategy == 'frequency':
+                continue
+            codes = self._codes(df, col, strategy, state)
+            if strategy == 'onehot':
+                start = 1 if self.drop_first else 0
+                width = len(state) - start
+                codes = codes - start
+            else:
+                width = state
+            hit = np.flatnonzero(codes >= 0)
+            rows.append(hit)
+            cols.append(codes[hit] + offset)
+            offset += width
+        rows = np.concatenate(rows) if rows else np.empty(0, dtype='int64')
+        cols = np.concatenate(cols) if cols else np.empty(0, dtype='int64')
+        onehot = sp.csr_matrix((np.ones(len(rows), dtype='float32'), (rows, cols)), shape=(n, offset))
+        return SparseFeatures(self._passthrough(df), onehot, list(self.onehot_columns_))
+
+    def transform_codes(self, df: pd.DataFrame) -> pd.DataFrame:
+        """每个分类字段一列整数编码（原列名），其余列保持原样"""
+        out = self._passthrough(df)
+        codes = {}
+        for col, strategy, state in self.columns_:
+            if strategy == 'frequency':
+                continue
+            n = len(state) if strategy == 'onehot' else state
+            codes[col] = self._codes(df, col, strategy, state).astype(_code_dtype(n))
+        return out.assign(**codes)
+
+    def fit_transform(self, df: pd.DataFrame, output: str = 'sparse'):
+        self.fit(df)
+        return self.transform(df, output)
+
+    def transform(self, df: pd.DataFrame, output: str = 'sparse'):
+        if output == 'sparse':
+            return self.transform_sparse(df)
+        if output == 'codes':
+            return self.transform_codes(df)
+        raise ValueError(f"output 只支持 'sparse' / 'codes'，收到 {output!r}")
+
+
+# ---------- 稀疏矩阵上的统计 ----------
+def target_correlation(features: SparseFeatures, target_col: str) -> pd.Series:
+    """各数值列与目标列的皮尔逊相关系数，只用列和 / 平方和 / 与目标的交叉积（O(nnz)）
+
+    含 NaN 的列按 pandas corr 的成对删除口径单独计算
+    """
+    y = features.frame[target_col].to_numpy(dtype='float64')
+    columns = [c for c in features.numeric_columns if c != target_col]
+    X = features.to_csr(columns).tocsc()
+    out = pd.Series(np.nan, index=columns + [target_col], dtype='float64')
+    out[target_col] = 1.0
+
+    has_nan = np.zeros(X.shape[1], dtype=bool)
+    if np.isnan(X.data).any():
+        col_of = np.repeat(np.arange(X.shape[1]), np.diff(X.indptr))
+        has_nan[np.unique(col_of[np.isnan(X.data)])] = True
+
+    n = len(y)
+    y_valid = ~np.isnan(y)
+    if y_valid.all():
+        sx = np.asarray(X.sum(axis=0)).ravel()
+        sxx = np.asarray(X.multiply(X).sum(axis=0)).ravel()
+        yc = y - y.mean()
+        # Σ(x-x̄)(y-ȳ) = Σx(y-ȳ)：目标列中心化后交叉积不会丢精度
+        cov = X.T @ yc
+        var_x = sxx - sx * sx / n
+        var_y = (yc * yc).sum()
+        with np.errstate(divide='ignore', invalid='ignore'):
+            corr = cov / np.sqrt(var_x * var_y)
+        corr[(var_x <= 0) | (var_y <= 0)] = np.nan
+        out[columns] = np.clip(corr, -1, 1)
+    else:
+        has_nan[:] = True
+    for j in np.flatnonzero(has_nan):
+        x = X[:, j].toarray().ravel()
+        out[columns[j]] = pd.Series(x).corr(pd.Series(y))
+    return out
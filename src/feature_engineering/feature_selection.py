@@ -1,40 +1,189 @@
-"""特征选择"""
+"""特征选择
+
+X / df 可以是 DataFrame，也可以是 encoding.SparseFeatures（稀疏 one-hot），
+后者直接在 CSR 上计算，不展开成稠密表，返回同类型的列子集。
+
+select_rfe / select_importance 共用同一个随机森林缓存（按数据摘要 + 参数），
+同一份数据上先后调用时只拟合一次；森林用 n_jobs 多核拟合。
+"""
+import hashlib
+import math
+from collections import OrderedDict
+
+import numpy as np
 import pandas as pd
-from sklearn.feature_selection import RFE, SelectFromModel
+import scipy.sparse as sp
+from sklearn.feature_selection import SelectFromModel
 from sklearn.ensemble import RandomForestClassifier
 import logging
+from src.feature_engineering.encoding import SparseFeatures, target_correlation as sparse_target_correlation
+from src.utils.correlation import target_correlation
+from src.utils.instrumentation import instrument
+
+
+# 树模型在稀疏输入上明显慢于稠密输入（本数据约 5 倍），
+# 非零比例不低于该值时先转成 float32 稠密数组再拟合；宽而稀的高基数 one-hot 保持 CSR
+DENSE_FOR_TREES = 0.1
+# 几何消除：每轮去掉「剩余特征数 - 目标数」的这一比例（至少 1 个）
+ELIMINATION_RATIO = 0.5
+FOREST_CACHE_SIZE = 8
+
+_forest_cache = OrderedDict()
+
+
+def _matrix(X):
+    """(模型输入, 列名)：SparseFeatures 取数值列拼成 CSR（足够稠密时转数组），DataFrame 转 float32 数组"""
+    if isinstance(X, SparseFeatures):
+        columns = X.numeric_columns
+        M = X.to_csr(columns, dtype='float32')
+        if M.shape[0] * M.shape[1] and M.nnz / (M.shape[0] * M.shape[1]) >= DENSE_FOR_TREES:
+            M = M.toarray()
+        return M, pd.Index(columns)
+    # 与树模型内部的转换一致（float32），只转一次，后续各轮按列切片
+    return X.to_numpy(dtype='float32'), X.columns
+
+
+def _subset(X, selected: list):
+    return X.select(selected) if isinstance(X, SparseFeatures) else X[selected]
+
+
+def _digest(M) -> str:
+    h = hashlib.blake2b(digest_size=16)
+    if sp.issparse(M):
+        M = M.tocsr()
+        h.update(str(M.shape).encode())
+        for part in (M.data, M.indices, M.indptr):
+            h.update(np.ascontiguousarray(part).view(np.uint8))
+    else:
+        M = np.ascontiguousarray(M)
+        h.update(f"{M.shape}{M.dtype}".encode())
+        h.update(M.view(np.uint8))
+    return h.hexdigest()
 
-def select_rfe(X: pd.DataFrame, y: pd.Series, n_features: int = 15) -> pd.DataFrame:
-    """递归特征消除"""
-    if n_features >= X.shape[1]:
-        return X
 
-    estimator = RandomForestClassifier(n_estimators=100, random_state=42)
-    selector = RFE(estimator, n_features_to_select=n_features)
-    X_sel = selector.fit_transform(X, y)
-    mask = selector.support_
-    selected = X.columns[mask].tolist()
+def fit_forest(M, y, n_estimators: int = 100, random_state: int = 42,
+               n_jobs: int = -1) -> RandomForestClassifier:
+    """拟合（或从缓存取出）随机森林；结果与 n_jobs 无关，缓存键不含 n_jobs"""
+    y = np.asarray(y)
+    key = (_digest(M), _digest(y), n_estimators, random_state)
+    if key in _forest_cache:
+        _forest_cache.move_to_end(key)
+        logging.info("[特征选择] 复用已拟合的随机森林")
+        return _forest_cache[key]
+    forest = RandomForestClassifier(n_estimators=n_estimators, random_state=random_state,
+                                    n_jobs=n_jobs).fit(M, y)
+    _forest_cache[key] = forest
+    if len(_forest_cache) > FOREST_CACHE_SIZE:
+        _forest_cache.popitem(last=False)
+    return forest
+
+
+def clear_forest_cache():
+    _forest_cache.clear()
+
+
+def _eliminate(M, y, n_features: int, step, n_estimators: int, random_state: int,
+               n_jobs: int) -> np.ndarray:
+    """递归消除，返回排名（1 = 入选，越大越早被淘汰，同 RFE.ranking_）
+
+    step='geometric'：每轮去掉 ceil(ELIMINATION_RATIO ×（剩余 - 目标）) 个
+    step=int       ：每轮固定去掉 step 个（step=1 即 sklearn RFE 默认行为）
+    """
+    remaining = np.arange(M.shape[1])
+    drop_round = np.zeros(M.shape[1], dtype='int64')   # 0 = 入选
+    rounds = 0
+    while len(remaining) > n_features:
+        forest = fit_forest(M[:, remaining], y, n_estimators, random_state, n_jobs)
+        excess = len(remaining) - n_features
+        n_drop = (max(1, math.ceil(ELIMINATION_RATIO * excess)) if step == 'geometric'
+                  else min(int(step), excess))
+        order = np.argsort(forest.feature_importances_, kind='stable')
+        rounds += 1
+        drop_round[remaining[order[:n_drop]]] = rounds
+        remaining = np.sort(remaining[order[n_drop:]])
+    logging.info(f"[特征选择] 消除轮数：{rounds}")
+    # 与 RFE 一致：入选为 1，越早被淘汰排名越大
+    return np.where(drop_round == 0, 1, rounds - drop_round + 2)
+
+
+@instrument()
+def select_rfe(X, y: pd.Series, n_features: int = 15, step='geometric', n_jobs: int = -1,
+               n_estimators: int = 100, random_state: int = 42, subsample: float = None,
+               n_rounds: int = 5, return_report: bool = False):
+    """递归特征消除
+
+    step       ：'geometric'（默认，几何递减）或每轮固定去掉的个数（1 = 原 RFE 行为）
+    subsample  ：给定（0~1）时在 n_rounds 个随机行子样本上各做一次消除，
+                 按入选频率（并列看平均排名）取前 n_features 个，并输出稳定性报告
+    return_report=True 时返回 (选中的 X, 报告 DataFrame)
+    """
+    M, columns = _matrix(X)
+    if n_features >= M.shape[1]:
+        return (X, None) if return_report else X
+    y = np.asarray(y)
+
+    if subsample is None:
+        ranking = _eliminate(M, y, n_features, step, n_estimators, random_state, n_jobs)
+        report = pd.DataFrame({'rank': ranking, 'selected': ranking == 1}, index=columns)
+        selected = columns[ranking == 1].tolist()
+    else:
+        rng = np.random.default_rng(random_state)
+        size = max(n_features + 1, int(round(subsample * len(y))))
+        rankings, sets = [], []
+        for r in range(n_rounds):
+            idx = np.sort(rng.choice(len(y), size=size, replace=False))
+            ranking = _eliminate(M[idx], y[idx], n_features, step, n_estimators,
+                                 random_state + r, n_jobs)
+            rankings.append(ranking)
+            sets.append(set(np.flatnonzero(ranking == 1)))
+        rankings = np.vstack(rankings)
+        freq = (rankings == 1).mean(axis=0)
+        mean_rank = rankings.mean(axis=0)
+        order = np.lexsort((mean_rank, -freq))[:n_features]
+        jaccard = [len(a & b) / len(a | b) for i, a in enumerate(sets) for b in sets[i + 1:]]
+        report = pd.DataFrame({'selected_freq': freq, 'mean_rank': mean_rank,
+                               'selected': np.isin(np.arange(len(columns)), order)}, index=columns)
+        report.attrs['mean_jaccard'] = float(np.mean(jaccard)) if jaccard else 1.0
+        selected = [c for c in columns[np.sort(order)]]
+        logging.info(f"[特征选择] RFE 子样本稳定性：{n_rounds} 轮 × {size} 行，"
+                     f"平均 Jaccard {report.attrs['mean_jaccard']:.3f}，"
+                     f"全部轮次都入选的特征 {int((freq == 1).sum())} 个")
+
     logging.info(f"[特征选择] RFE 完成，选出 {len(selected)} 个特征")
-    return X[selected]
+    out = _subset(X, selected)
+    return (out, report) if return_report else out
 
 
-def select_importance(X: pd.DataFrame, y: pd.Series, threshold: str = 'median') -> pd.DataFrame:
-    """基于随机森林特征重要性"""
-    estimator = RandomForestClassifier(n_estimators=100, random_state=42)
-    selector = SelectFromModel(estimator, threshold=threshold)
-    X_sel = selector.fit_transform(X, y)
+@instrument()
+def select_importance(X, y: pd.Series, threshold: str = 'median', n_jobs: int = -1,
+                      n_estimators: int = 100, random_state: int = 42):
+    """基于随机森林特征重要性（与 select_rfe 第一轮共用同一个森林）"""
+    M, columns = _matrix(X)
+    forest = fit_forest(M, y, n_estimators, random_state, n_jobs)
+    selector = SelectFromModel(forest, threshold=threshold, prefit=True)
     mask = selector.get_support()
-    selected = X.columns[mask].tolist()
+    selected = columns[mask].tolist()
     logging.info(f"[特征选择] 重要性完成，选出 {len(selected)} 个特征")
-    return X[selected]
+    return _subset(X, selected)
+
+
+def correlation_selected(corr: pd.Series, target_col: str, threshold: float = 0.05) -> list:
+    """与目标列的相关系数绝对值超过阈值的列（不含目标列本身）"""
+    corr = corr.abs()
+    return corr[corr > threshold].index.drop(target_col).tolist()
 
 
-def select_correlation(df: pd.DataFrame, target_col: str, threshold: float = 0.05) -> pd.DataFrame:
+@instrument()
+def select_correlation(df, target_col: str, threshold: float = 0.05):
     """皮尔逊相关系数过滤"""
-    corr = df.corr(numeric_only=True)[target_col].abs()
-    selected = corr[corr > threshold].index.drop(target_col).tolist()
+    if isinstance(df, SparseFeatures):
+        corr = sparse_target_correlation(df, target_col).abs()
+    else:
+        # 只算各列与目标列的相关（O(p·n)），不构造完整相关矩阵
+        corr = target_correlation(df, target_col).abs()
+    selected = correlation_selected(corr, target_col, threshold)
     logging.info(f"[特征选择] 相关性完成，选出 {len(selected)} 个特征")
-    return df[selected]
+    return _subset(df, selected)
 
 
 # ---------- 兼容壳 ----------
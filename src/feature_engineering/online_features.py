@@ -0,0 +1,295 @@
+"""单条记录特征计算（在线打分路径）
+
+把已拟合的 FeaturePipeline「编译」成查找表，单个客户（原始 CSV 行的 dict）
+不经过 DataFrame 直接得到特征向量：
+- one-hot / 合约映射：{取值: 输出位置} 字典查表
+- tenure / MonthlyCharges 分箱：np.searchsorted 查分箱边界（与 pd.cut(right=True) 口径一致）
+- 聚类 / PCA：预先展开成 Python float 列表做点积，
+  累加顺序与批量路径的 assign_clusters / project_pca 相同，结果逐位一致
+清洗部分等价于 handle_total_charges + convert_data_types；
+缺失字段用 fill_values（通常为训练集中位数 / 众数）填充。
+"""
+import logging
+import math
+
+import numpy as np
+
+from src.feature_engineering.basic_features import (
+    CHARGE_BINS, CHARGE_LABELS, CONTRACT_MAPPING, TENURE_BINS, TENURE_LABELS)
+from src.feature_engineering.pipeline import FeaturePipeline
+
+logger = logging.getLogger(__name__)
+
+NUMERIC_INPUTS = ['SeniorCitizen', 'tenure', 'MonthlyCharges', 'TotalCharges']
+_INT_INPUTS = {'SeniorCitizen', 'tenure'}
+
+
+def _to_float(value) -> float:
+    """等价于 pd.to_numeric(errors='coerce')：空白 / 非法值 → NaN"""
+    if value is None:
+        return math.nan
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return math.nan
+
+
+def _bin_index(edges: np.ndarray, value: float) -> int:
+    """pd.cut(bins=edges, right=True) 的分箱下标，落在区间外或 NaN 时为 -1"""
+    if value != value:
+        return -1
+    i = int(np.searchsorted(edges, value, side='left'))
+    return i - 1 if 1 <= i < len(edges) else -1
+
+
+def feature_columns(pipeline: FeaturePipeline) -> list:
+    """特征向量的列顺序：流水线输出中的数值 / 布尔列，去掉目标列"""
+    columns = pipeline.selected_columns_ or pipeline.output_columns_
+    dtypes = pipeline.output_dtypes_
+    return [c for c in columns if c != pipeline.target_col
+            and dtypes[c].startswith(('bool', 'int', 'uint', 'float'))]
+
+
+class RecordFeaturizer:
+    """由已拟合的 FeaturePipeline 编译出的单条记录特征计算器"""
+
+    def __init__(self, pipeline: FeaturePipeline, fill_values: dict = None):
+        if not pipeline.fitted_:
+            raise RuntimeError("FeaturePipeline 尚未 fit")
+        self.pipeline = pipeline
+        self.fill_values = dict(fill_values or {})
+        self.feature_names_ = feature_columns(pipeline)
+        self.n_features_ = len(self.feature_names_)
+        pos = {name: i for i, name in enumerate(self.feature_names_)}
+        self._pos = pos
+
+        # 数值直通列（原始输入或可由输入直接算出的派生列）
+        self._numeric_out = [(c, pos[c]) for c in NUMERIC_INPUTS if c in pos]
+        derived = {'customer_value', 'num_services', 'monthly_tenure_interaction',
+                   'avg_monthly_charge', 'customer_cluster'}
+        self._extra_numeric = [(c, pos[c]) for c in self.feature_names_
+                               if c in pipeline.passthrough_ and c not in derived
+                               and c not in NUMERIC_INPUTS]
+
+        # one-hot 查表：原始取值 → 输出位置（基准类别 / 未选中的列不出现在表中）
+        tenure_labels = {i: label for i, label in enumerate(TENURE_LABELS)}
+        charge_labels = {i: label for i, label in enumerate(CHARGE_LABELS)}
+        self._lookup = []     # (原始列, {取值: 位置})
+        self._binned = []     # (原始列, 分箱边界, {分箱下标: 位置})
+        for col, categories, names in pipeline.onehot_:
+            table = {cat: pos[name] for cat, name in zip(categories[1:], names) if name in pos}
+            if not table:
+                continue
+            if col == 'contract_numeric':
+                # Contract 原始取值经 CONTRACT_MAPPING 后再查表，合并成一步
+                self._lookup.append(('Contract', {raw: table[code] for raw, code in CONTRACT_MAPPING.items()
+                                                  if code in table}))
+            elif col == 'tenure_group':
+                self._binned.append(('tenure', np.asarray(TENURE_BINS, dtype='float64'),
+                                     {i: table[label] for i, label in tenure_labels.items() if label in table}))
+            elif col == 'monthly_charges_group':
+                self._binned.append(('MonthlyCharges', np.asarray(CHARGE_BINS, dtype='float64'),
+                                     {i: table[label] for i, label in charge_labels.items() if label in table}))
+            else:
+                self._lookup.append((col, table))
+
+        # 聚类 / PCA 参数展开成 Python float，避免单条计算时的 numpy 调用开销
+        self._centroids = (pipeline.centroids_.tolist() if pipeline.centroids_ is not None else None)
+        self._pca = None
+        if pipeline.pca_components_ is not None:
+            self._pca = (pipeline.pca_mean_.tolist(), pipeline.pca_components_.tolist())
+
+    @classmethod
+    def load(cls, model_dir='models', name: str = 'feature_pipeline',
+             fill_values: dict = None) -> 'RecordFeaturizer':
+        return cls(FeaturePipeline.load(model_dir, name), fill_values=fill_values)
+
+    # ---------- 清洗 ----------
+    def _numeric(self, record: dict) -> dict:
+        v = {c: _to_float(record.get(c)) for c in NUMERIC_INPUTS}
+        # TotalCharges 缺失 → MonthlyCharges × tenure（同 handle_total_charges）
+        if v['TotalCharges'] != v['TotalCharges']:
+            v['TotalCharges'] = v['MonthlyCharges'] * v['tenure']
+        for c in NUMERIC_INPUTS:
+            if v[c] != v[c]:
+                if c not in self.fill_values:
+                    raise ValueError(f"字段 {c} 缺失且未提供填充值")
+                v[c] = float(self.fill_values[c])
+        # convert_data_types：整数列截断为 int64
+        for c in _INT_INPUTS:
+            v[c] = float(int(v[c]))
+        return v
+
+    def _category(self, record: dict, col: str):
+        """空字段与 read_csv 口径一致视为缺失，用 fill_values 中的众数填充"""
+        value = record.get(col)
+        if value is None or value != value or value == '':
+            value = self.fill_values.get(col)
+        return value
+
+    # ---------- 计算 ----------
+    def transform_record(self, record: dict) -> np.ndarray:
+        """原始 CSV 行（dict）→ 特征向量（float64，列顺序见 feature_names_）"""
+        v = self._numeric(record)
+        out = [0.0] * self.n_features_
+        pos = self._pos
+
+        for c, i in self._numeric_out:
+            out[i] = v[c]
+        for c, i in self._extra_numeric:
+            out[i] = _to_float(record.get(c))
+
+        tenure, monthly, total = v['tenure'], v['MonthlyCharges'], v['TotalCharges']
+        if 'customer_value' in pos:
+            out[pos['customer_value']] = monthly * tenure
+        if 'num_services' in pos:
+            out[pos['num_services']] = self._num_services(record)
+        if 'monthly_tenure_interaction' in pos:
+            out[pos['monthly_tenure_interaction']] = monthly * tenure
+        if 'avg_monthly_charge' in pos:
+            out[pos['avg_monthly_charge']] = total / (1.0 if tenure == 0 else tenure)
+
+        for col, table in self._lookup:
+            i = table.get(self._category(record, col))
+            if i is not None:
+                out[i] = 1.0
+        for col, edges, table in self._binned:
+            i = table.get(_bin_index(edges, v[col]))
+            if i is not None:
+                out[i] = 1.0
+
+        if self._centroids is not None and 'customer_cluster' in pos:
+            x = [v[c] for c in self.pipeline.cluster_cols_]
+            out[pos['customer_cluster']] = float(self._nearest(x))
+        if self._pca is not None:
+            values = dict(v, num_services=self._num_services(record))
+            x = [values[c] for c in self.pipeline.pca_cols_]
+            mean, components = self._pca
+            for k, comp in enumerate(components):
+                name = f'pca_{k + 1}'
+                if name in pos:
+                    acc = 0.0
+                    for j, xj in enumerate(x):
+                        acc += (xj - mean[j]) * comp[j]
+                    out[pos[name]] = acc
+        return np.array(out)
+
+    def transform_records(self, records) -> np.ndarray:
+        """多条记录 → (n, n_features) 矩阵
+
+        按列向量化：每个输入字段只取一次成数组，分箱 / 聚类 / PCA 整列计算，
+        逐列累加顺序与 transform_record 相同，结果逐位一致
+        """
+        records = list(records)
+        n = len(records)
+        out = np.zeros((n, self.n_features_))
+        if n == 0:
+            return out
+        v = self._numeric_columns(records)
+        pos = self._pos
+
+        for c, i in self._numeric_out:
+            out[:, i] = v[c]
+        for c, i in self._extra_numeric:
+            out[:, i] = self._float_column(records, c)
+
+        tenure, monthly, total = v['tenure'], v['MonthlyCharges'], v['TotalCharges']
+        if 'customer_value' in pos:
+            out[:, pos['customer_value']] = monthly * tenure
+        if 'num_services' in pos:
+            out[:, pos['num_services']] = self._num_services_column(records)
+        if 'monthly_tenure_interaction' in pos:
+            out[:, pos['monthly_tenure_interaction']] = monthly * tenure
+        if 'avg_monthly_charge' in pos:
+            out[:, pos['avg_monthly_charge']] = total / np.where(tenure == 0, 1.0, tenure)
+
+        rows = np.arange(n)
+        for col, table in self._lookup:
+            idx = np.array([table.get(self._category(r, col), -1) for r in records])
+            hit = idx >= 0
+            out[rows[hit], idx[hit]] = 1.0
+        for col, edges, table in self._binned:
+            lut = np.full(len(edges) + 1, -1)
+            for k, i in table.items():
+                lut[k] = i
+            x = v[col]
+            k = np.searchsorted(edges, x, side='left') - 1
+            k = np.where((k >= 0) & (k < len(edges) - 1) & ~np.isnan(x), k, -1)
+            idx = lut[k]
+            hit = idx >= 0
+            out[rows[hit], idx[hit]] = 1.0
+
+        if self._centroids is not None and 'customer_cluster' in pos:
+            centroids = np.asarray(self._centroids)
+            d = np.zeros((n, len(centroids)))
+            for j, c in enumerate(self.pipeline.cluster_cols_):
+                diff = v[c][:, None] - centroids[None, :, j]
+                d += diff * diff
+            # 与 _nearest 一致：NaN 距离不参与比较，并列取下标最小者
+            out[:, pos['customer_cluster']] = np.argmin(np.where(np.isnan(d), np.inf, d), axis=1)
+        if self._pca is not None:
+            values = dict(v, num_services=self._num_services_column(records))
+            mean, components = self._pca
+            for k, comp in enumerate(components):
+                name = f'pca_{k + 1}'
+                if name in pos:
+                    acc = np.zeros(n)
+                    for j, c in enumerate(self.pipeline.pca_cols_):
+                        acc += (values[c] - mean[j]) * comp[j]
+                    out[:, pos[name]] = acc
+        return out
+
+    @staticmethod
+    def _float_column(records: list, col: str) -> np.ndarray:
+        return np.array([_to_float(r.get(col)) for r in records], dtype='float64')
+
+    def _numeric_columns(self, records: list) -> dict:
+        """_numeric 的整列版本：{字段: float64 数组}"""
+        v = {c: self._float_column(records, c) for c in NUMERIC_INPUTS}
+        missing = np.isnan(v['TotalCharges'])
+        v['TotalCharges'][missing] = (v['MonthlyCharges'] * v['tenure'])[missing]
+        for c in NUMERIC_INPUTS:
+            missing = np.isnan(v[c])
+            if missing.any():
+                if c not in self.fill_values:
+                    raise ValueError(f"字段 {c} 缺失且未提供填充值")
+                v[c][missing] = float(self.fill_values[c])
+        for c in _INT_INPUTS:
+            v[c] = np.trunc(v[c])
+        return v
+
+    def _num_services_column(self, records: list) -> np.ndarray:
+        if not self.pipeline.has_num_services_:
+            return np.full(len(records), math.nan)
+        acc = np.zeros(len(records))
+        seen = np.zeros(len(records), dtype=bool)
+        for c in self.pipeline.service_numeric_:
+            x = self._float_column(records, c)
+            ok = ~np.isnan(x)
+            acc[ok] += x[ok]
+            seen |= ok
+        return np.where(seen, acc, math.nan)
+
+    def _num_services(self, record: dict) -> float:
+        if not self.pipeline.has_num_services_:
+            return math.nan
+        # sum(axis=1, min_count=1)：全缺失为 NaN
+        acc, seen = 0.0, False
+        for c in self.pipeline.service_numeric_:
+            x = _to_float(record.get(c))
+            if x == x:
+                acc += x
+                seen = True
+        return acc if seen else math.nan
+
+    def _nearest(self, x: list) -> int:
+        """最近质心：平方距离按列顺序累加（同 assign_clusters），并列取下标最小者"""
+        best, best_d = 0, math.inf
+        for k, centroid in enumerate(self._centroids):
+            d = 0.0
+            for xj, cj in zip(x, centroid):
+                diff = xj - cj
+                d += diff * diff
+            if d < best_d:
+                best, best_d = k, d
+        return best
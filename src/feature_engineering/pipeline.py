@@ -0,0 +1,354 @@
+"""特征流水线：fit / transform 拆分，拟合结果持久化到 models/
+
+fit 时学习并保存所有依赖数据的状态（目标编码类别、one-hot 类别全集、列布局、
+KMeans 质心、PCA 主成分、相关性筛选结果）；transform 只套用这些状态，
+不再重新拟合，新批次打分时列布局保持稳定。
+cluster_mode='minibatch' 时聚类逐块流式拟合（见 clustering.py），质心随流水线一起保存，
+下次拟合可经 init_centroids 热启动；pca_mode='incremental' 时 PCA 逐块 IncrementalPCA（见 decomposition.py）。
+两者都是流式模式时拟合不需要整表矩阵，分区执行时逐分区读入。
+PCA 只用拟合数据中有取值的列：全为缺失的列（如服务列均非数值时的 num_services）不参与拟合与投影。
+输出与 create_basic_features → create_advanced_features →（可选）select_correlation 一致。
+"""
+import json
+import logging
+from pathlib import Path
+
+import joblib
+import sklearn
+import numpy as np
+import pandas as pd
+from sklearn.cluster import KMeans
+from sklearn.decomposition import PCA
+
+from src.feature_engineering import decomposition
+from src.feature_engineering.basic_features import (
+    CHARGE_BINS, CHARGE_LABELS, CONTRACT_MAPPING, ONEHOT_EXCLUDE, SERVICE_KEYWORDS,
+    TENURE_BINS, TENURE_LABELS, bin_numerical, create_value_and_service, encode_target)
+from src.utils.memory import copy_on_write_enabled
+from src.utils.instrumentation import instrument
+
+logger = logging.getLogger(__name__)
+
+SCHEMA_VERSION = 1
+CLUSTER_COLS = ['tenure', 'MonthlyCharges', 'TotalCharges']
+PCA_COLS = ['tenure', 'MonthlyCharges', 'TotalCharges', 'num_services']
+CLUSTER_MODES = ('full', 'minibatch')
+PCA_MODES = ('exact', 'incremental')
+REFINE_ITER = 10   # minibatch 模式拟合后的分块 Lloyd 修正轮数上限
+CORR_THRESHOLD = 0.05   # 项目流程（特征阶段 / 训练折内）使用的相关性筛选阈值
+
+
+def assign_clusters(X: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    """最近质心（平方欧氏距离，按列顺序逐项累加，批量与单条结果逐位一致）"""
+    dist = np.zeros((X.shape[0], centroids.shape[0]))
+    for j in range(X.shape[1]):
+        dist += (X[:, j:j + 1] - centroids[:, j]) ** 2
+    return dist.argmin(axis=1).astype('int32')
+
+
+def project_pca(X: np.ndarray, mean: np.ndarray, components: np.ndarray) -> np.ndarray:
+    """(X - mean) @ components.T，按列顺序逐项累加（同上，保证逐位一致）"""
+    out = np.zeros((X.shape[0], components.shape[0]))
+    for j in range(X.shape[1]):
+        out += (X[:, j:j + 1] - mean[j]) * components[:, j]
+    return out
+
+
+def layout_stats(df: pd.DataFrame, base: pd.DataFrame) -> dict:
+    """拟合列布局所需的统计：输入 / 基础特征的空 schema、目标类别、各待编码列的类别全集
+
+    category 列取 dtype 的类别（分区间一致），其余分类列取排序后的实际取值
+    """
+    levels = {}
+    for col in base.select_dtypes(['object', 'category']).columns.difference(ONEHOT_EXCLUDE):
+        s = base[col]
+        levels[col] = ((True, list(s.cat.categories)) if isinstance(s.dtype, pd.CategoricalDtype)
+                       else (False, sorted(s.dropna().unique())))
+    return {
+        'schema': df.iloc[:0],
+        'base_schema': base.iloc[:0],
+        'target_classes': list(np.unique(df['Churn'].astype(object))) if 'Churn' in df.columns else None,
+        'levels': levels,
+    }
+
+
+def merge_layout_stats(a: dict, b: dict) -> dict:
+    """合并两个分区的 layout_stats：目标类别与非 category 列的取值取并集"""
+    levels = dict(a['levels'])
+    for col, (is_cat, values) in b['levels'].items():
+        if col not in levels:
+            levels[col] = (is_cat, values)
+        elif not (is_cat and levels[col][0]) or levels[col][1] != values:
+            # 非 category 列或类别不一致：取并集重新排序
+            levels[col] = (False, sorted(set(levels[col][1]) | set(values)))
+    targets = [t for t in (a['target_classes'], b['target_classes']) if t is not None]
+    return {
+        'schema': a['schema'],
+        'base_schema': a['base_schema'],
+        'target_classes': list(np.unique(np.concatenate(targets).astype(object))) if targets else None,
+        'levels': levels,
+    }
+
+
+class FeaturePipeline:
+    """可持久化的特征流水线（基础特征 + 高级特征 + 可选相关性筛选）
+
+    cluster_mode：'full' 全量 KMeans(n_init=10)；'minibatch' 逐块流式 MiniBatchKMeans
+    pca_mode：'exact' 全量 PCA；'incremental' 逐块 IncrementalPCA
+    chunksize：流式拟合的块大小
+    init_centroids：minibatch 模式的热启动质心（通常取上次保存的流水线的 centroids_）
+    """
+
+    def __init__(self, n_clusters: int = 4, n_components: int = 2,
+                 target_col: str = 'Churn_numeric', corr_threshold: float = None,
+                 random_state: int = 42, cluster_mode: str = 'full', pca_mode: str = 'exact',
+                 chunksize: int = 100_000, init_centroids: np.ndarray = None):
+        if cluster_mode not in CLUSTER_MODES:
+            raise ValueError(f"未知聚类模式：{cluster_mode}，可选 {list(CLUSTER_MODES)}")
+        if pca_mode not in PCA_MODES:
+            raise ValueError(f"未知 PCA 模式：{pca_mode}，可选 {list(PCA_MODES)}")
+        self.n_clusters = n_clusters
+        self.n_components = n_components
+        self.target_col = target_col
+        self.corr_threshold = corr_threshold
+        self.random_state = random_state
+        self.cluster_mode = cluster_mode
+        self.pca_mode = pca_mode
+        self.chunksize = chunksize
+        self.init_centroids = init_centroids
+        self.fitted_ = False
+
+    @classmethod
+    def from_config(cls, features: dict = None) -> 'FeaturePipeline':
+        """config['features'] → 未拟合的流水线；warm_start 只对特征阶段有意义，由调用方处理"""
+        params = {k: v for k, v in (features or {}).items() if k != 'warm_start'}
+        return cls(corr_threshold=CORR_THRESHOLD, **params)
+
+    @property
+    def needs_matrix(self) -> bool:
+        """拟合是否需要整表数值矩阵；否则 _fit_state 可直接接收分块数据流"""
+        return self.cluster_mode == 'full' or self.pca_mode == 'exact'
+
+    # ---------- 拟合 ----------
+    def fit(self, df: pd.DataFrame, copy: bool = True) -> 'FeaturePipeline':
+        self.fit_transform(df, copy=copy)
+        return self
+
+    def fit_transform(self, df: pd.DataFrame, copy: bool = True) -> pd.DataFrame:
+        """copy=False：拟合时参考实现的各步骤不整表复制（语义同 create_basic_features）"""
+        logger.info("[特征流水线] 开始拟合")
+        base = self.base_features(df, copy=copy)
+        self._fit_state(layout_stats(df, base), base)
+        out = self.transform(df)
+        self._set_output(out)
+
+        if self.corr_threshold is not None and self.target_col in out.columns:
+            from src.feature_engineering.feature_selection import select_correlation
+            self.selected_columns_ = list(select_correlation(
+                out, target_col=self.target_col, threshold=self.corr_threshold).columns)
+            out = out[self.selected_columns_]
+        logger.info(f"[特征流水线] 拟合完成，输出 {out.shape[1]} 列")
+        return out
+
+    @staticmethod
+    def base_features(df: pd.DataFrame, copy: bool = True) -> pd.DataFrame:
+        """基础特征中与数据相关的部分：直接跑参考实现，供读出类别全集与列布局（逐行步骤，可分区执行）"""
+        base = df if copy else df.copy(deep=not copy_on_write_enabled())
+        base = encode_target(base, copy=copy)
+        base = create_value_and_service(base, copy=copy)
+        return bin_numerical(base, copy=copy)
+
+    def _fit_state(self, stats: dict, X):
+        """由布局统计（layout_stats，可跨分区 merge_layout_stats）与数值矩阵 X 拟合全部状态
+
+        X 至少包含 CLUSTER_COLS / PCA_COLS 中存在的列，KMeans / PCA 在其上拟合；
+        可以是 DataFrame，也可以是每次调用都从头返回 DataFrame 块迭代器的函数（needs_matrix 为假时）
+        """
+        schema, base_schema = stats['schema'], stats['base_schema']
+        self.target_classes_ = stats['target_classes']
+        svc = [c for c in schema.columns if any(k in c for k in SERVICE_KEYWORDS)]
+        self.has_num_services_ = bool(svc)
+        self.service_numeric_ = [c for c in svc if pd.api.types.is_numeric_dtype(schema[c])]
+
+        # drop_first=True：第一个类别作基准，不单独成列
+        self.onehot_ = [(col, categories, [f"{col}_{c}" for c in categories[1:]])
+                        for col, (_, categories) in stats['levels'].items()]
+        self.passthrough_ = [c for c in base_schema.columns if c not in stats['levels']]
+        self.input_columns_ = list(schema.columns)
+
+        # 高级特征：KMeans / PCA 只在此拟合一次
+        self.cluster_cols_ = [c for c in CLUSTER_COLS if c in schema.columns]
+        self.centroids_ = None
+        n_rows = len(X) if isinstance(X, pd.DataFrame) else None
+        if len(self.cluster_cols_) >= 2:
+            try:
+                with instrument('fit_clusters', rows_in=n_rows):
+                    self.centroids_ = self._fit_clusters(X)
+            except Exception as e:
+                logger.warning(f"[特征流水线] 聚类失败：{e}")
+
+        self.pca_cols_ = self._observed([c for c in PCA_COLS if c in base_schema.columns], X)
+        self.pca_mean_ = self.pca_components_ = self.explained_variance_ratio_ = None
+        if len(self.pca_cols_) >= 2:
+            try:
+                with instrument('fit_pca', rows_in=n_rows):
+                    pca = self._fit_pca(X)
+                    self.pca_mean_, self.pca_components_ = pca.mean_, pca.components_
+                    self.explained_variance_ratio_ = pca.explained_variance_ratio_
+            except Exception as e:
+                logger.warning(f"[特征流水线] PCA 失败：{e}")
+
+        self.fitted_ = True
+        self.selected_columns_ = self.output_columns_ = None
+
+    def _blocks(self, X, cols: list):
+        """X 的数值块（float64）：DataFrame 按 chunksize 切片，数据流逐块读出后再切"""
+        frames = [X] if isinstance(X, pd.DataFrame) else X()
+        for frame in frames:
+            for start in range(0, len(frame), self.chunksize):
+                yield frame[cols].iloc[start:start + self.chunksize].to_numpy(dtype='float64')
+
+    def _observed(self, cols: list, X) -> list:
+        """去掉在 X 中全为缺失的列：它们不携带信息，留着只会让 PCA 因 NaN 失败"""
+        if not cols:
+            return cols
+        seen = np.zeros(len(cols), dtype=bool)
+        for block in self._blocks(X, cols):
+            seen |= ~np.isnan(block).all(axis=0)
+        empty = [c for c, ok in zip(cols, seen) if not ok]
+        if empty:
+            logger.info(f"[特征流水线] PCA 跳过全为缺失的列：{empty}")
+        return [c for c, ok in zip(cols, seen) if ok]
+
+    def _matrix(self, X, cols: list) -> np.ndarray:
+        if isinstance(X, pd.DataFrame):
+            return X[cols].to_numpy(dtype='float64')
+        return np.vstack(list(self._blocks(X, cols)))
+
+    def _fit_clusters(self, X) -> np.ndarray:
+        if self.cluster_mode == 'full':
+            km = KMeans(n_clusters=self.n_clusters, random_state=self.random_state, n_init=10)
+            return km.fit(self._matrix(X, self.cluster_cols_)).cluster_centers_
+
+        # clustering 依赖本模块的 assign_clusters，这里再导入
+        from src.feature_engineering import clustering
+        init = self.init_centroids
+        if init is not None and np.shape(init) != (self.n_clusters, len(self.cluster_cols_)):
+            logger.warning(f"[特征流水线] 热启动质心形状 {np.shape(init)} 与 "
+                           f"({self.n_clusters}, {len(self.cluster_cols_)}) 不符，忽略")
+            init = None
+        blocks = lambda: self._blocks(X, self.cluster_cols_)
+        centroids = clustering.fit_streaming(blocks(), self.n_clusters, init=init,
+                                             random_state=self.random_state)
+        centroids = clustering.refine_streaming(blocks, centroids, max_iter=REFINE_ITER)
+        logger.info(f"[特征流水线] 聚类完成（minibatch{'，热启动' if init is not None else ''}）")
+        return centroids
+
+    def _fit_pca(self, X):
+        if self.pca_mode == 'exact':
+            M = self._matrix(X, self.pca_cols_)
+            decomposition.check_no_nan(M)
+            return PCA(n_components=self.n_components, random_state=self.random_state).fit(M)
+        return decomposition.fit_incremental_pca(self._blocks(X, self.pca_cols_), self.n_components)
+
+    def _set_output(self, out: pd.DataFrame):
+        self.output_columns_ = list(out.columns)
+        self.output_dtypes_ = {c: str(t) for c, t in out.dtypes.items()}
+
+    # ---------- 转换 ----------
+    @instrument('pipeline_transform')
+    def transform(self, df: pd.DataFrame) -> pd.DataFrame:
+        """只套用已拟合的状态；目标列缺失（打分场景）时不输出 Churn_numeric"""
+        if not self.fitted_:
+            raise RuntimeError("FeaturePipeline 尚未 fit")
+        cols = {}
+
+        # 基础特征
+        for col in self.passthrough_:
+            if col in df.columns:
+                cols[col] = df[col].array  # 保留 category 等扩展类型
+            elif col == self.target_col and self.target_classes_ is not None and 'Churn' in df.columns:
+                codes = pd.Categorical(df['Churn'], categories=self.target_classes_).codes
+                if (codes < 0).any():
+                    raise ValueError(f"Churn 含未见过的取值，已知：{self.target_classes_}")
+                cols[col] = codes.astype('int64')
+            elif col == 'customer_value':
+                cols[col] = df['MonthlyCharges'].to_numpy(dtype='float64') * df['tenure'].to_numpy()
+            elif col == 'num_services' and self.has_num_services_:
+                cols[col] = df[self.service_numeric_].sum(axis=1, min_count=1).to_numpy(dtype='float64')
+
+        derived = {
+            'contract_numeric': lambda: df['Contract'].map(CONTRACT_MAPPING),
+            'tenure_group': lambda: pd.cut(df['tenure'], bins=TENURE_BINS, labels=TENURE_LABELS),
+            'monthly_charges_group': lambda: pd.cut(df['MonthlyCharges'], bins=CHARGE_BINS,
+                                                    labels=CHARGE_LABELS),
+        }
+        for col, categories, names in self.onehot_:
+            values = df[col] if col in df.columns else derived[col]()
+            # 未见过的类别与缺失一样编码为 -1，对应全 0
+            codes = pd.Categorical(values, categories=categories).codes
+            for k, name in enumerate(names, start=1):
+                cols[name] = codes == k
+
+        # 高级特征
+        if 'MonthlyCharges' in df.columns and 'tenure' in df.columns:
+            cols['monthly_tenure_interaction'] = (df['MonthlyCharges'].to_numpy(dtype='float64')
+                                                  * df['tenure'].to_numpy())
+        if 'TotalCharges' in df.columns and 'tenure' in df.columns:
+            tenure = df['tenure'].to_numpy()
+            cols['avg_monthly_charge'] = df['TotalCharges'].to_numpy(dtype='float64') / np.where(tenure == 0, 1, tenure)
+        if self.centroids_ is not None:
+            X = np.column_stack([np.asarray(cols[c] if c in cols else df[c], dtype='float64')
+                                 for c in self.cluster_cols_])
+            cols['customer_cluster'] = assign_clusters(X, self.centroids_)
+        if self.pca_components_ is not None:
+            X = np.column_stack([np.asarray(cols[c] if c in cols else df[c], dtype='float64')
+                                 for c in self.pca_cols_])
+            proj = project_pca(X, self.pca_mean_, self.pca_components_)
+            for i in range(proj.shape[1]):
+                cols[f'pca_{i + 1}'] = proj[:, i]
+
+        out = pd.DataFrame(cols, index=df.index)
+        if self.output_columns_:
+            out = out[[c for c in self.output_columns_ if c in out.columns]]
+        if self.selected_columns_ is not None:
+            out = out[self.selected_columns_]
+        return out
+
+    # ---------- 持久化 ----------
+    def schema(self) -> dict:
+        return {
+            'schema_version': SCHEMA_VERSION,
+            'sklearn_version': sklearn.__version__,
+            'input_columns': self.input_columns_,
+            'output_columns': self.selected_columns_ or self.output_columns_,
+            'output_dtypes': self.output_dtypes_,
+            'params': {'n_clusters': self.n_clusters, 'n_components': self.n_components,
+                       'target_col': self.target_col, 'corr_threshold': self.corr_threshold,
+                       'random_state': self.random_state,
+                       'cluster_mode': self.cluster_mode, 'pca_mode': self.pca_mode,
+                       'chunksize': self.chunksize},
+        }
+
+    def save(self, model_dir='models', name: str = 'feature_pipeline') -> Path:
+        """保存为 <name>.joblib（拟合状态）+ <name>.json（版本化 schema）"""
+        model_dir = Path(model_dir)
+        model_dir.mkdir(parents=True, exist_ok=True)
+        path = model_dir / f'{name}.joblib'
+        joblib.dump(self, path)
+        (model_dir / f'{name}.json').write_text(
+            json.dumps(self.schema(), indent=2, ensure_ascii=False), encoding='utf-8')
+        logger.info(f"[特征流水线] 已保存 -> {path}")
+        return path
+
+    @classmethod
+    def load(cls, model_dir='models', name: str = 'feature_pipeline') -> 'FeaturePipeline':
+        model_dir = Path(model_dir)
+        schema = json.loads((model_dir / f'{name}.json').read_text(encoding='utf-8'))
+        if schema['schema_version'] != SCHEMA_VERSION:
+            raise ValueError(f"特征流水线 schema 版本不匹配：文件 {schema['schema_version']}，"
+                             f"代码 {SCHEMA_VERSION}，请重新拟合")
+        pipeline = joblib.load(model_dir / f'{name}.joblib')
+        if not isinstance(pipeline, cls):
+            raise TypeError(f"{model_dir / name}.joblib 不是 FeaturePipeline")
+        return pipeline
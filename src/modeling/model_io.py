@@ -0,0 +1,35 @@
+"""模型文件读写：训练（train / search）保存，打分服务加载
+
+文件格式为 joblib 字典：{'model', 'feature_names', **extra}；feature_names 是训练时的
+特征列顺序，打分时据此对齐。
+"""
+import logging
+from pathlib import Path
+
+import joblib
+
+logger = logging.getLogger(__name__)
+
+MODEL_DIR = Path('models')
+MODEL_NAME = 'churn_model'
+
+
+def save_model(model, feature_names: list, model_dir=MODEL_DIR, name: str = MODEL_NAME,
+               **extra) -> Path:
+    """模型连同训练时的特征列顺序一起保存，打分时据此对齐"""
+    model_dir = Path(model_dir)
+    model_dir.mkdir(parents=True, exist_ok=True)
+    path = model_dir / f'{name}.joblib'
+    joblib.dump({'model': model, 'feature_names': list(feature_names), **extra}, path)
+    logger.info(f"[模型] 模型已保存 -> {path}")
+    return path
+
+
+def load_model(model_dir=MODEL_DIR, name: str = MODEL_NAME) -> dict:
+    path = Path(model_dir) / f'{name}.joblib'
+    if not path.exists():
+        raise FileNotFoundError(f"{path} 不存在：请先训练模型，或用 serve --bootstrap-model 拟合基线模型")
+    bundle = joblib.load(path)
+    if not isinstance(bundle, dict) or 'model' not in bundle:
+        raise TypeError(f"{path} 不是 save_model 保存的模型文件")
+    return bundle
@@ -0,0 +1,341 @@
+"""超参搜索：按行子样本预算做连续减半（successive halving）/ Hyperband
+
+- 预算 = 参与交叉验证的训练行数，从 min_rows 起每一轮乘以 eta，直到 max_rows（默认全部训练行）；
+  每轮只保留得分前 1/eta 的候选进入下一轮，大部分候选只在小样本上评估
+- hyperband：多个括号（bracket）分别从不同的起始预算做连续减半，兼顾“多试少评”与“少试多评”
+- 子样本为训练行的固定分层排列的前缀：预算越大行越多，且小预算的行包含在大预算中
+- 只用 train.holdout_split 的训练部分，留出集不参与搜索
+- 输入为清洗结果，特征流水线在每次试验的各折训练行上拟合（train.fold_features），
+  相同行号的折特征在工作进程内缓存，同一预算上的候选共用；各次试验只传行号；
+  同一波次内所有括号的待评估试验一起并行，避免括号末轮候选少时核空闲
+- 每完成一次试验追加一行到 checkpoint（JSONL，fsync），中断后重跑自动跳过已完成的试验；
+  checkpoint 头部记录配置、数据与特征配置的指纹，不一致时需 --restart
+
+配置：config['modeling']['search']（缺省键见 DEFAULT_SEARCH）
+
+用法（项目根目录，需先跑过清洗）：
+    python -m src.modeling.search [--config config.yaml] [--restart] [--train]
+"""
+import argparse
+import hashlib
+import json
+import logging
+import math
+import os
+import time
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed
+from sklearn.base import clone
+from sklearn.model_selection import StratifiedKFold
+
+from src.modeling import train
+from src.reporting.column_profile import frame_fingerprint
+from src.utils.instrumentation import instrument
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SEARCH = {
+    'model': 'hist_gradient_boosting',
+    'method': 'hyperband',        # hyperband | successive_halving
+    'eta': 3,                     # 每轮保留 1/eta，预算乘以 eta
+    'min_rows': 1000,             # 最小预算（行数）
+    'max_rows': None,             # 最大预算，None 为全部训练行
+    'n_candidates': None,         # successive_halving 的初始候选数，None 取 eta ** 轮数
+    'cv_folds': 3,                # 每次试验的交叉验证折数
+    'n_jobs': -1,
+    'param_space': None,          # None 取 PARAM_SPACES[model]
+    'checkpoint': 'models/search_checkpoint.jsonl',
+    'result': 'models/search_result.json',
+}
+
+# 参数空间：列表为离散取值；{'low', 'high'} 为区间，log=True 对数均匀，int=True 取整
+PARAM_SPACES = {
+    'hist_gradient_boosting': {
+        'learning_rate': {'low': 0.01, 'high': 0.3, 'log': True},
+        'max_leaf_nodes': {'low': 8, 'high': 128, 'log': True, 'int': True},
+        'min_samples_leaf': {'low': 5, 'high': 200, 'log': True, 'int': True},
+        'l2_regularization': {'low': 1e-4, 'high': 10.0, 'log': True},
+        'max_features': {'low': 0.5, 'high': 1.0},
+    },
+    'logistic_regression': {
+        'C': {'low': 1e-3, 'high': 100.0, 'log': True},
+    },
+}
+
+# 不影响搜索结果的键，不计入 checkpoint 指纹
+_RUNTIME_KEYS = ('n_jobs', 'checkpoint', 'result')
+_MODELING_RUNTIME_KEYS = ('search', 'n_jobs', 'models', 'cv_folds')
+
+
+def search_config(config: dict = None) -> dict:
+    modeling = train.modeling_config(config)
+    search = {**DEFAULT_SEARCH, **(modeling.get('search') or {})}
+    if search['model'] not in train.MODELS:
+        raise ValueError(f"未知模型：{search['model']}，可选 {list(train.MODELS)}")
+    if search['method'] not in ('hyperband', 'successive_halving'):
+        raise ValueError(f"未知搜索方法：{search['method']}，可选 hyperband / successive_halving")
+    if search['eta'] < 2:
+        raise ValueError("eta 需不小于 2")
+    search['param_space'] = search['param_space'] or PARAM_SPACES[search['model']]
+    return search
+
+
+# ---------- 采样 / 预算 ----------
+def sample_params(space: dict, rng: np.random.Generator) -> dict:
+    params = {}
+    for name, spec in space.items():
+        if isinstance(spec, list):
+            value = spec[rng.integers(len(spec))]
+        elif spec.get('log'):
+            value = math.exp(rng.uniform(math.log(spec['low']), math.log(spec['high'])))
+        else:
+            value = rng.uniform(spec['low'], spec['high'])
+        if isinstance(spec, dict) and spec.get('int'):
+            value = int(round(value))
+        params[name] = value.item() if isinstance(value, np.generic) else value
+    return params
+
+
+def plan_brackets(method: str, max_rows: int, min_rows: int, eta: int, n_candidates: int = None) -> list:
+    """[{'bracket': s, 'n': 初始候选数, 'budgets': [各轮行数]}]"""
+    s_max = max(0, int(math.floor(math.log(max_rows / min_rows, eta) + 1e-9)))
+    if method == 'successive_halving':
+        brackets = [(s_max, n_candidates or eta ** s_max)]
+    else:
+        brackets = [(s, int(math.ceil((s_max + 1) / (s + 1) * eta ** s))) for s in range(s_max, -1, -1)]
+    return [{'bracket': s, 'n': n,
+             'budgets': [min(max_rows, int(round(max_rows * eta ** (i - s)))) for i in range(s + 1)]}
+            for s, n in brackets]
+
+
+def nested_order(y: np.ndarray, seed: int) -> np.ndarray:
+    """行的固定排列：任意长度的前缀都近似保持类别比例（各类内随机排序后按相对秩交错）"""
+    rng = np.random.default_rng(seed)
+    key = np.empty(len(y))
+    for cls in np.unique(y):
+        idx = np.flatnonzero(y == cls)
+        key[idx] = (rng.permutation(len(idx)) + rng.random(len(idx))) / len(idx)
+    return np.argsort(key, kind='stable')
+
+
+# ---------- 单次试验（工作进程） ----------
+def _evaluate(cleaned: pd.DataFrame, y: np.ndarray, rows: np.ndarray, model: str, params: dict,
+              modeling: dict, cv_folds: int, seed: int, features: dict = None, data_key: str = None) -> dict:
+    """在给定行上做分层 K 折（折内拟合特征），返回各指标均值、得分标准差与耗时"""
+    t0 = time.perf_counter()
+    ys = y[rows]
+    prep, estimator = train.build_model(model, modeling, seed, **params)
+    folds = StratifiedKFold(n_splits=cv_folds, shuffle=True, random_state=seed).split(rows, ys)
+    records = []
+    for train_pos, test_pos in folds:
+        feats = train.fold_features(cleaned, rows[train_pos], rows[test_pos], features, data_key)
+        Xt_train, Xt_test, prep_s = train._fit_prep(prep, feats['X_train'], feats['X_test'])
+        record = train.evaluate(clone(estimator), Xt_train, ys[train_pos], Xt_test, ys[test_pos])
+        records.append({**record, 'prep_s': prep_s, 'features_s': feats['features_s']})
+    scores = {m: float(np.mean([r[m] for r in records])) for m in train.METRICS}
+    return {**scores,
+            'score_std': float(np.std([r[modeling['scoring']] for r in records])),
+            'fit_s': float(sum(r['fit_s'] + r['prep_s'] for r in records)),
+            'features_s': float(sum(r['features_s'] for r in records)),
+            'n_iter': (float(np.mean([r['n_iter'] for r in records])) if 'n_iter' in records[0] else None),
+            'wall_s': time.perf_counter() - t0}
+
+
+# ---------- checkpoint ----------
+def _digest(*chunks) -> str:
+    h = hashlib.sha256()
+    for chunk in chunks:
+        h.update(chunk)
+    return h.hexdigest()[:16]
+
+
+def fingerprint(search: dict, modeling: dict, seed: int, data_key: str, features: dict) -> dict:
+    """配置 + 数据 + 特征配置的分项指纹：任一变化时旧的试验结果不再可比；分项记录便于说明是哪一部分变了
+
+    data_key：清洗结果的 frame_fingerprint；features：train.feature_config
+    """
+    def config_digest(d: dict, skip: tuple) -> str:
+        return _digest(json.dumps({k: v for k, v in d.items() if k not in skip},
+                                  sort_keys=True, default=str).encode('utf-8'))
+
+    return {
+        'search': config_digest(search, _RUNTIME_KEYS),
+        'modeling': config_digest(modeling, _MODELING_RUNTIME_KEYS),
+        'random_seed': _digest(str(seed).encode('utf-8')),
+        'data': _digest(data_key.encode('utf-8')),
+        'features': config_digest(features, ()),
+    }
+
+
+class CheckpointMismatch(ValueError):
+    """checkpoint 的指纹与当前配置 / 数据不一致；changed 为变化的分项"""
+
+    def __init__(self, path, changed: list):
+        self.path = Path(path)
+        self.changed = changed
+        super().__init__(f"{self.path} 与当前配置 / 数据不一致（变化：{', '.join(changed)}），"
+                         f"用 --restart 重新开始")
+
+
+class Checkpoint:
+    """JSONL：首行为头（分项指纹），其后每行一个已完成的试验"""
+
+    def __init__(self, path, parts: dict, restart: bool = False):
+        self.path = Path(path)
+        self.trials = {}
+        fp = _digest(json.dumps(parts, sort_keys=True).encode('utf-8'))
+        if self.path.exists() and not restart:
+            lines = self.path.read_text(encoding='utf-8').splitlines()
+            header = json.loads(lines[0]) if lines else {}
+            if header.get('fingerprint') != fp:
+                old = header.get('parts') or {}
+                raise CheckpointMismatch(self.path, [k for k in parts if old.get(k) != parts[k]])
+            for line in lines[1:]:
+                try:
+                    trial = json.loads(line)
+                except json.JSONDecodeError:   # 中断时写了半行
+                    continue
+                self.trials[self.key(trial)] = trial
+            logger.info(f"[超参搜索] 从 {self.path} 恢复 {len(self.trials)} 次已完成的试验")
+            self._rewrite(header)
+        else:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._rewrite({'type': 'header', 'fingerprint': fp, 'parts': parts,
+                           'created_at': datetime.now().isoformat(timespec='seconds')})
+
+    @staticmethod
+    def key(trial: dict) -> tuple:
+        return trial['candidate'], trial['budget']
+
+    def _rewrite(self, header: dict):
+        """重写为 头 + 完整的试验行（去掉可能的半行）"""
+        lines = [header] + list(self.trials.values())
+        self.path.write_text(''.join(json.dumps(r, ensure_ascii=False) + '\n' for r in lines), encoding='utf-8')
+
+    def append(self, trial: dict):
+        self.trials[self.key(trial)] = trial
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(trial, ensure_ascii=False) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+
+
+# ---------- 搜索 ----------
+@instrument()
+def run_search(cleaned: pd.DataFrame, config: dict = None, restart: bool = False) -> dict:
+    """返回 {'best': 最优试验, 'leaderboard': 最大预算上的排名, ...}，并写出 search['result']"""
+    modeling = train.modeling_config(config)
+    search = search_config(config)
+    features = train.feature_config(config)
+    seed = (config or {}).get('random_seed', 42)
+    y, _ = train.target_vector(cleaned)
+    data_key = frame_fingerprint(cleaned)
+    model, eta, scoring = search['model'], search['eta'], modeling['scoring']
+
+    train_idx, _ = train.holdout_split(y, modeling, seed)
+    order = train_idx[nested_order(y[train_idx], seed)]
+    max_rows = min(search['max_rows'] or len(order), len(order))
+    min_rows = min(search['min_rows'], max_rows)
+    if min_rows < search['cv_folds'] * 10:
+        raise ValueError(f"min_rows={min_rows} 过小，至少需 cv_folds × 10 行")
+    brackets = plan_brackets(search['method'], max_rows, min_rows, eta, search['n_candidates'])
+    for b in brackets:
+        rng = np.random.default_rng([seed, b['bracket']])
+        b['alive'] = [f"b{b['bracket']}-c{i:03d}" for i in range(b['n'])]
+        b['params'] = {c: sample_params(search['param_space'], rng) for c in b['alive']}
+        b['rung'] = 0
+    logger.info(f"[超参搜索] {search['method']}（eta={eta}），模型 {model}，预算 {min_rows} ~ {max_rows} 行，"
+                + '，'.join(f"括号 {b['bracket']}: {b['n']} 个候选 × {b['budgets']}" for b in brackets))
+
+    checkpoint = Checkpoint(search['checkpoint'], fingerprint(search, modeling, seed, data_key, features),
+                            restart)
+    t0 = time.perf_counter()
+    n_run = 0
+    with Parallel(n_jobs=search['n_jobs'], return_as='generator_unordered') as parallel:
+        while any(b['rung'] < len(b['budgets']) for b in brackets):
+            # 一个波次：所有未结束括号当前轮的待评估试验一起并行
+            wave = []
+            for b in brackets:
+                if b['rung'] < len(b['budgets']):
+                    budget = b['budgets'][b['rung']]
+                    wave += [(b, c, budget) for c in b['alive'] if (c, budget) not in checkpoint.trials]
+            if wave:
+                tasks = (delayed(_tagged)(i, _evaluate, cleaned, y, order[:budget], model, b['params'][c],
+                                          modeling, search['cv_folds'], seed, features, data_key)
+                         for i, (b, c, budget) in enumerate(wave))
+                for i, result in parallel(tasks):
+                    b, c, budget = wave[i]
+                    checkpoint.append({'type': 'trial', 'bracket': b['bracket'], 'rung': b['rung'],
+                                       'candidate': c, 'budget': budget, 'params': b['params'][c],
+                                       'score': result[scoring], **result})
+                    n_run += 1
+            # 各括号按当前轮得分晋级前 1/eta
+            for b in brackets:
+                if b['rung'] >= len(b['budgets']):
+                    continue
+                budget = b['budgets'][b['rung']]
+                ranked = sorted(b['alive'], key=lambda c: -checkpoint.trials[(c, budget)]['score'])
+                b['rung'] += 1
+                if b['rung'] < len(b['budgets']):
+                    b['alive'] = ranked[:max(1, len(ranked) // eta)]
+                    logger.info(f"[超参搜索] 括号 {b['bracket']} 第 {b['rung']} 轮：{len(ranked)} -> "
+                                f"{len(b['alive'])} 个候选，预算 {b['budgets'][b['rung']]} 行")
+
+    final = [t for t in checkpoint.trials.values() if t['budget'] == max_rows]
+    leaderboard = sorted(final, key=lambda t: -t['score'])
+    best = leaderboard[0]
+    result = {
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'model': model, 'method': search['method'], 'eta': eta, 'scoring': scoring,
+        'budgets': {'min_rows': min_rows, 'max_rows': max_rows},
+        'brackets': [{k: b[k] for k in ('bracket', 'n', 'budgets')} for b in brackets],
+        'trials_total': len(checkpoint.trials), 'trials_run': n_run,
+        'trials_resumed': len(checkpoint.trials) - n_run,
+        'rows_evaluated': int(sum(t['budget'] for t in checkpoint.trials.values())),
+        'wall_s': time.perf_counter() - t0,
+        'best': best,
+        'leaderboard': leaderboard[:20],
+    }
+    Path(search['result']).parent.mkdir(parents=True, exist_ok=True)
+    Path(search['result']).write_text(json.dumps(result, indent=2, ensure_ascii=False), encoding='utf-8')
+    logger.info(f"[超参搜索] 完成：{n_run} 次新试验（恢复 {result['trials_resumed']} 次），"
+                f"{result['wall_s']:.1f}s；最优 {best['candidate']} {scoring} {best['score']:.4f}，"
+                f"参数 {best['params']} -> {search['result']}")
+    return result
+
+
+def _tagged(i: int, func, *args):
+    """结果无序返回时带上任务序号"""
+    return i, func(*args)
+
+
+def main(argv=None):
+    from config import get_config
+    parser = argparse.ArgumentParser(description='连续减半 / Hyperband 超参搜索（需先跑过清洗）')
+    parser.add_argument('--config', default='config.yaml')
+    parser.add_argument('--csv', action='store_true', help='从 CSV 读取清洗结果')
+    parser.add_argument('--restart', action='store_true', help='忽略已有 checkpoint，从头搜索')
+    parser.add_argument('--train', action='store_true',
+                        help='搜索结束后用最优参数重训并保存模型（同 src.modeling.train）')
+    args = parser.parse_args(argv)
+
+    config = get_config(args.config)
+    cleaned = train.load_cleaned(args.csv)
+    result = run_search(cleaned, config, restart=args.restart)
+    if args.train:
+        modeling = train.modeling_config(config)
+        modeling['models'] = [result['model']]
+        train.fit_and_save(cleaned, train.feature_config(config), modeling, config.get('random_seed', 42),
+                           overrides={result['model']: result['best']['params']},
+                           extra={'search': {k: result[k] for k in ('method', 'best', 'trials_total')}})
+    print(json.dumps({'best': result['best']['params'], 'score': result['best']['score']}, indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    raise SystemExit(main())
@@ -0,0 +1,313 @@
+"""模型训练阶段：分层留出 + K 折交叉验证选模型，最优模型重训后保存到 models/
+
+- 输入为清洗结果（data/cleaned.* 或内存中的同一份表），目标取其 Churn
+- 特征流水线（编码类别、KMeans、PCA、相关性选择，见 FeaturePipeline）只在各折训练行上拟合，
+  再变换该折测试行；留出评估同样只在训练部分上拟合，测试行的信息不进入任何拟合状态。
+  折特征按（数据指纹, 行号, config['features']）缓存，同一折的所有候选模型 / 搜索试验复用
+- 各折用 joblib 并行（loky 进程，只传折的行号）
+- 折内特征变换（缺失填充 + 标准化等）按预处理方式只拟合一次，缓存后供该折所有候选模型复用
+- 候选模型由 config['modeling']['models'] 指定，默认直方图梯度提升（早停）+ 逻辑回归基线
+- 产物：models/churn_model.joblib（save_model 格式，连同训练部分上拟合的特征流水线，打分服务可直接加载）
+        models/training_report.json（各折各模型的拟合 / 预处理 / 打分耗时与指标）
+
+用法（项目根目录，需先跑过清洗）：
+    python -m src.modeling.train [--config config.yaml]
+"""
+import argparse
+import hashlib
+import json
+import logging
+import time
+from collections import OrderedDict
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed
+from sklearn.base import clone
+from sklearn.ensemble import HistGradientBoostingClassifier
+from sklearn.impute import SimpleImputer
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import accuracy_score, f1_score, roc_auc_score
+from sklearn.model_selection import StratifiedKFold, train_test_split
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import StandardScaler
+
+from src.feature_engineering.pipeline import FeaturePipeline
+from src.modeling.model_io import MODEL_DIR, save_model
+from src.reporting.column_profile import frame_fingerprint
+from src.utils.instrumentation import instrument
+
+logger = logging.getLogger(__name__)
+
+REPORT_NAME = 'training_report.json'
+FEATURE_CACHE_SIZE = 16
+
+_feature_cache = OrderedDict()
+
+# config['modeling'] 的默认值（配置文件中未给出的键取这里）
+DEFAULT_MODELING = {
+    'test_size': 0.2,
+    'cv_folds': 5,
+    'n_jobs': -1,                 # 交叉验证各折并行的进程数，-1 为全部核
+    'scoring': 'roc_auc',         # 选模型所用指标：roc_auc / accuracy / f1
+    'models': ['hist_gradient_boosting', 'logistic_regression'],
+    'hist_gradient_boosting': {
+        'max_iter': 500, 'learning_rate': 0.1, 'max_leaf_nodes': 31,
+        'early_stopping': True, 'validation_fraction': 0.1, 'n_iter_no_change': 20,
+    },
+    'logistic_regression': {'C': 1.0, 'max_iter': 1000},
+}
+
+# 预处理方式：None 表示原样输入（直方图梯度提升原生支持缺失值，无需缩放）
+PREPROCESSORS = {
+    'passthrough': None,
+    'impute_scale': lambda: make_pipeline(SimpleImputer(strategy='median'), StandardScaler()),
+}
+
+# 候选模型：名称 → (预处理方式, 估计器工厂(params, random_state))
+MODELS = {
+    'hist_gradient_boosting': ('passthrough', lambda params, seed: HistGradientBoostingClassifier(
+        random_state=seed, **params)),
+    'logistic_regression': ('impute_scale', lambda params, seed: LogisticRegression(
+        random_state=seed, **params)),
+}
+
+METRICS = {
+    'roc_auc': lambda y, proba: roc_auc_score(y, proba),
+    'accuracy': lambda y, proba: accuracy_score(y, proba >= 0.5),
+    'f1': lambda y, proba: f1_score(y, proba >= 0.5),
+}
+
+
+def modeling_config(config: dict = None) -> dict:
+    """合并默认值；模型参数按模型名逐项覆盖"""
+    user = dict((config or {}).get('modeling') or {})
+    merged = {**DEFAULT_MODELING, **user}
+    for name in MODELS:
+        merged[name] = {**DEFAULT_MODELING.get(name, {}), **(user.get(name) or {})}
+    unknown = [m for m in merged['models'] if m not in MODELS]
+    if unknown:
+        raise ValueError(f"未知模型：{unknown}，可选 {list(MODELS)}")
+    if merged['scoring'] not in METRICS:
+        raise ValueError(f"未知指标：{merged['scoring']}，可选 {list(METRICS)}")
+    return merged
+
+
+# ---------- 数据 ----------
+def feature_matrix(engineered: pd.DataFrame) -> tuple:
+    """数值 / 布尔特征列 → float64 矩阵（列顺序即模型的 feature_names）"""
+    names = [c for c in engineered.columns
+             if pd.api.types.is_numeric_dtype(engineered[c])
+             and not isinstance(engineered[c].dtype, pd.CategoricalDtype)]
+    return engineered[names].to_numpy(dtype='float64', na_value=np.nan), names
+
+
+def target_vector(cleaned: pd.DataFrame, target: str = 'Churn') -> tuple:
+    """目标编码与 encode_target 一致：类别排序后取序号（No=0, Yes=1）"""
+    classes, y = np.unique(cleaned[target].astype(object), return_inverse=True)
+    if len(classes) != 2:
+        raise ValueError(f"{target} 需为二分类，实际类别：{list(classes)}")
+    return y.astype('int8'), list(classes)
+
+
+def feature_config(config: dict = None) -> dict:
+    """config['features'] 中决定折内特征的部分（warm_start 的质心来自全量拟合，折内不用）"""
+    return {k: v for k, v in ((config or {}).get('features') or {}).items() if k != 'warm_start'}
+
+
+def load_cleaned(use_csv: bool = False) -> pd.DataFrame:
+    """读取 data/cleaned.*（只读一次，供多次训练 / 搜索复用）"""
+    from src.data_processing.data_cache import read_frame
+    if use_csv or not Path('data/cleaned.feather').exists():
+        return pd.read_csv('data/cleaned.csv')
+    return read_frame(Path('data/cleaned.feather'))
+
+
+def _rows_digest(rows: np.ndarray) -> str:
+    return hashlib.blake2b(np.ascontiguousarray(rows, dtype='int64').view(np.uint8), digest_size=16).hexdigest()
+
+
+def fold_features(cleaned: pd.DataFrame, train_rows: np.ndarray, test_rows: np.ndarray,
+                  features: dict = None, data_key: str = None) -> dict:
+    """特征流水线只在 train_rows 上拟合，再变换 test_rows；按（数据指纹, 行号, 特征配置）缓存
+
+    返回 {'X_train', 'X_test', 'names', 'pipeline', 'features_s', 'cached'}；
+    data_key 为 cleaned 的 frame_fingerprint，多折共用时由调用方算一次传入
+    """
+    features = features or {}
+    key = (data_key or frame_fingerprint(cleaned), _rows_digest(train_rows), _rows_digest(test_rows),
+           json.dumps(features, sort_keys=True, default=str))
+    if key in _feature_cache:
+        _feature_cache.move_to_end(key)
+        return {**_feature_cache[key], 'features_s': 0.0, 'cached': True}
+    t0 = time.perf_counter()
+    pipeline = FeaturePipeline.from_config(features)
+    engineered = pipeline.fit_transform(cleaned.iloc[train_rows])
+    X_train, names = feature_matrix(engineered.drop(columns=pipeline.target_col, errors='ignore'))
+    X_test = pipeline.transform(cleaned.iloc[test_rows])[names].to_numpy(dtype='float64', na_value=np.nan)
+    result = {'X_train': X_train, 'X_test': X_test, 'names': names, 'pipeline': pipeline,
+              'features_s': time.perf_counter() - t0, 'cached': False}
+    _feature_cache[key] = result
+    if len(_feature_cache) > FEATURE_CACHE_SIZE:
+        _feature_cache.popitem(last=False)
+    return result
+
+
+def holdout_split(y: np.ndarray, modeling: dict, seed: int = 42) -> tuple:
+    """分层留出：(训练行号, 留出行号)；超参搜索只用训练部分，留出集留给最终评估"""
+    return train_test_split(np.arange(len(y)), test_size=modeling['test_size'],
+                            stratify=y, random_state=seed)
+
+
+def build_model(name: str, modeling: dict, random_state: int = 42, **overrides):
+    """候选模型的（预处理名, 未拟合估计器）；overrides 覆盖配置中的模型参数"""
+    prep, factory = MODELS[name]
+    return prep, factory({**modeling[name], **overrides}, random_state)
+
+
+def full_model(prep: str, estimator):
+    """预处理 + 估计器合成一个可直接 predict_proba 的模型"""
+    return estimator if PREPROCESSORS[prep] is None else make_pipeline(PREPROCESSORS[prep](), estimator)
+
+
+# ---------- 交叉验证 ----------
+def _fit_prep(prep: str, X_train: np.ndarray, X_test: np.ndarray) -> tuple:
+    if PREPROCESSORS[prep] is None:
+        return X_train, X_test, 0.0
+    t0 = time.perf_counter()
+    transformer = PREPROCESSORS[prep]().fit(X_train)
+    Xt_train, Xt_test = transformer.transform(X_train), transformer.transform(X_test)
+    return Xt_train, Xt_test, time.perf_counter() - t0
+
+
+def evaluate(estimator, X_train, y_train, X_test, y_test) -> dict:
+    """拟合一次并在测试集上算全部指标；返回耗时与早停轮数"""
+    t0 = time.perf_counter()
+    estimator.fit(X_train, y_train)
+    fit_s = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    proba = estimator.predict_proba(X_test)[:, 1]
+    record = {'fit_s': fit_s, 'predict_s': time.perf_counter() - t0,
+              **{m: float(f(y_test, proba)) for m, f in METRICS.items()}}
+    if hasattr(estimator, 'n_iter_'):
+        record['n_iter'] = int(np.max(estimator.n_iter_))
+    return record
+
+
+def _run_fold(fold: int, cleaned: pd.DataFrame, y: np.ndarray, train_idx: np.ndarray, test_idx: np.ndarray,
+              candidates: dict, features: dict = None, data_key: str = None) -> list:
+    """单折：特征流水线与每种预处理都只在该折训练集上拟合一次，变换结果供所有候选模型复用"""
+    feats = fold_features(cleaned, train_idx, test_idx, features, data_key)
+    X_train, X_test = feats['X_train'], feats['X_test']
+    y_train, y_test = y[train_idx], y[test_idx]
+    cache, records = {}, []
+    for name, (prep, estimator) in candidates.items():
+        cached = prep in cache
+        if not cached:
+            cache[prep] = _fit_prep(prep, X_train, X_test)
+        Xt_train, Xt_test, prep_s = cache[prep]
+        record = evaluate(clone(estimator), Xt_train, y_train, Xt_test, y_test)
+        records.append({'fold': fold, 'model': name, 'prep': prep,
+                        'features_s': 0.0 if records else feats['features_s'],
+                        'features_cached': bool(records) or feats['cached'],
+                        'prep_s': 0.0 if cached else prep_s, 'prep_cached': cached,
+                        'train_rows': len(train_idx), 'test_rows': len(test_idx), **record})
+    return records
+
+
+@instrument()
+def cross_validate_models(cleaned: pd.DataFrame, y: np.ndarray, rows: np.ndarray, candidates: dict,
+                          features: dict = None, cv_folds: int = 5, n_jobs: int = -1,
+                          random_state: int = 42, data_key: str = None) -> pd.DataFrame:
+    """在 rows 上分层 K 折，各折并行（折内拟合特征）；返回每折每模型一行的记录"""
+    data_key = data_key or frame_fingerprint(cleaned)
+    folds = StratifiedKFold(n_splits=cv_folds, shuffle=True, random_state=random_state).split(rows, y[rows])
+    results = Parallel(n_jobs=n_jobs)(
+        delayed(_run_fold)(k, cleaned, y, rows[train_pos], rows[test_pos], candidates, features, data_key)
+        for k, (train_pos, test_pos) in enumerate(folds))
+    return pd.DataFrame([r for fold in results for r in fold])
+
+
+# ---------- 训练入口 ----------
+@instrument()
+def train_model(cleaned: pd.DataFrame, config: dict = None, model_dir=MODEL_DIR,
+                overrides: dict = None) -> dict:
+    """交叉验证选出最优模型 → 在训练集上重训 → 留出集评估 → 保存模型与报告"""
+    modeling = modeling_config(config)
+    seed = (config or {}).get('random_seed', 42)
+    return fit_and_save(cleaned, feature_config(config), modeling, seed, model_dir, overrides=overrides)
+
+
+def fit_and_save(cleaned: pd.DataFrame, features: dict, modeling: dict, seed: int = 42,
+                 model_dir=MODEL_DIR, overrides: dict = None, extra: dict = None) -> dict:
+    """features：config['features']（见 feature_config），各折与留出评估都在各自训练行上拟合特征；
+    overrides：{模型名: 参数}，覆盖配置中的模型参数（超参搜索的结果由此传入）
+    """
+    overrides = overrides or {}
+    y, classes = target_vector(cleaned)
+    data_key = frame_fingerprint(cleaned)
+    logger.info(f"[训练] 开始：{len(cleaned)} 行，特征流水线折内拟合，候选模型 {modeling['models']}")
+    train_idx, test_idx = holdout_split(y, modeling, seed)
+    candidates = {name: build_model(name, modeling, seed, **overrides.get(name, {}))
+                  for name in modeling['models']}
+
+    t0 = time.perf_counter()
+    folds = cross_validate_models(cleaned, y, train_idx, candidates, features, modeling['cv_folds'],
+                                  modeling['n_jobs'], seed, data_key)
+    cv_s = time.perf_counter() - t0
+    summary = folds.groupby('model')[list(METRICS) + ['fit_s']].agg(['mean', 'std'])
+    scoring = modeling['scoring']
+    best = summary[(scoring, 'mean')].idxmax()
+    for name, row in summary.iterrows():
+        logger.info(f"[训练] {name}: {scoring} {row[(scoring, 'mean')]:.4f} ± {row[(scoring, 'std')]:.4f}，"
+                    f"单折拟合 {row[('fit_s', 'mean')]:.2f}s")
+    logger.info(f"[训练] 交叉验证完成（{modeling['cv_folds']} 折，{cv_s:.2f}s），最优模型：{best}")
+
+    # 特征流水线与最优模型都在整个训练集上重训，留出集只用于最终评估
+    feats = fold_features(cleaned, train_idx, test_idx, features, data_key)
+    names = feats['names']
+    model = full_model(*candidates[best])
+    holdout = evaluate(model, feats['X_train'], y[train_idx], feats['X_test'], y[test_idx])
+    logger.info(f"[训练] 留出集：roc_auc {holdout['roc_auc']:.4f}，accuracy {holdout['accuracy']:.4f}，"
+                f"f1 {holdout['f1']:.4f}")
+
+    report = {
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'rows': int(len(y)), 'features': names, 'feature_config': features, 'classes': classes,
+        'modeling': modeling, 'random_seed': seed, 'overrides': overrides,
+        'best_model': best, 'cv_seconds': cv_s,
+        'cv_summary': {name: {f"{m}_{s}": float(v) for (m, s), v in row.items()}
+                       for name, row in summary.iterrows()},
+        'folds': folds.to_dict('records'),
+        'holdout': holdout,
+        **(extra or {}),
+    }
+    model_dir = Path(model_dir)
+    save_model(model, names, model_dir, kind=best, classes=classes, holdout=holdout,
+               feature_pipeline=feats['pipeline'])
+    report_path = model_dir / REPORT_NAME
+    report_path.write_text(json.dumps(report, indent=2, ensure_ascii=False, default=str), encoding='utf-8')
+    logger.info(f"[训练] 训练报告 -> {report_path}")
+    return report
+
+
+def main(argv=None):
+    from config import get_config
+    parser = argparse.ArgumentParser(description='交叉验证训练流失模型（需先跑过清洗）')
+    parser.add_argument('--config', default='config.yaml')
+    parser.add_argument('--csv', action='store_true', help='从 CSV 读取清洗结果')
+    parser.add_argument('--model-dir', default=str(MODEL_DIR))
+    args = parser.parse_args(argv)
+
+    config = get_config(args.config)
+    report = fit_and_save(load_cleaned(args.csv), feature_config(config), modeling_config(config),
+                          config.get('random_seed', 42), args.model_dir)
+    print(json.dumps({'best_model': report['best_model'], 'holdout': report['holdout']}, indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    raise SystemExit(main())
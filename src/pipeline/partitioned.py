@@ -0,0 +1,321 @@
+"""分区并行执行：清洗 + 特征工程按行分区，扇出到进程池
+
+输入按行区间（partition_by='rows'）或 customerID 哈希（partition_by='hash'）切成若干分区，
+分区以无压缩 feather 文件放在临时目录，工作进程按路径读写（与 EDA 并行渲染相同的交换方式），
+主进程只收发小的统计量。
+
+逐行步骤在各分区独立执行：
+    handle_total_charges、convert_data_types、create_value_and_service、bin_numerical、
+    交互特征 / 聚类分配 / PCA 投影（FeaturePipeline.transform）
+依赖全局状态的步骤拆成显式两阶段：各分区 map 出局部统计 → 主进程 gather 合并 → 再 map 套用
+    - 中位数 / 众数填充：各分区 FillStats → merge → fill_values（与分块清洗同一套统计）
+    - 类别全集：分类列取值的并集，各分区 category 类别对齐，编码一致
+    - 去重：各分区行哈希 → 按原始行号保留首次出现（同 clean_data_chunked 的 64 位哈希去重）
+    - one-hot 类别 / 目标类别：layout_stats → merge_layout_stats
+    - KMeans / PCA：只收集所需数值列，主进程拟合一次（流式模式下逐分区读入，不拼整表）
+    - 相关性筛选：各分区 CorrelationAccumulator → merge
+结果与 clean_data + FeaturePipeline.fit_transform 一致。
+串行部分只剩切分写盘、统计合并、KMeans 拟合与结果拼接。
+"""
+import argparse
+import functools
+import logging
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from src.data_processing import data_cleaner
+from src.data_processing.data_cache import read_frame, write_frame
+from src.feature_engineering.feature_selection import correlation_selected
+from src.feature_engineering.pipeline import (CLUSTER_COLS, PCA_COLS, FeaturePipeline,
+                                              layout_stats, merge_layout_stats)
+from src.utils.correlation import DEFAULT_CHUNKSIZE, CorrelationAccumulator, numeric_columns
+from src.utils.instrumentation import instrument
+
+logger = logging.getLogger(__name__)
+
+PARTITION_BY = ('rows', 'hash')
+
+
+# ---------- 工作进程任务（模块级函数，可 pickle） ----------
+def _clean_scan(src: str, dst: str, level_cols: list) -> dict:
+    """第一遍：TotalCharges 修正，返回填充值统计（FillStats）与分类列的取值集合"""
+    df = data_cleaner.handle_total_charges(read_frame(src), copy=False)
+    write_frame(df, dst)
+    os.remove(src)
+    return {
+        'fill': data_cleaner.FillStats().update(df),
+        'levels': {c: set(df[c].dropna().unique()) for c in level_cols if c in df.columns},
+    }
+
+
+def _clean_apply(src: str, dst: str, fill_values: dict, levels: dict) -> np.ndarray:
+    """第二遍：全局值填充 → 类型转换 → 对齐类别全集，返回行哈希供全局去重"""
+    df = data_cleaner.handle_missing_values(read_frame(src), fill_values=fill_values, copy=False)
+    df = data_cleaner.convert_data_types(df, copy=False)
+    for col, categories in levels.items():
+        if col in df.columns:
+            df[col] = df[col].cat.set_categories(categories)
+    write_frame(df, dst)
+    os.remove(src)
+    return pd.util.hash_pandas_object(df, index=False).to_numpy()
+
+
+def _feature_scan(src: str, dst: str, matrix_cols: list) -> dict:
+    """基础特征（逐行）→ 布局统计；KMeans / PCA 所需的数值列写到 dst"""
+    df = read_frame(src)
+    base = FeaturePipeline.base_features(df, copy=False)
+    write_frame(base[[c for c in matrix_cols if c in base.columns]], dst)
+    return layout_stats(df, base)
+
+
+def _feature_apply(src: str, dst: str, pipeline: FeaturePipeline) -> dict:
+    """套用已拟合的流水线（逐行），返回输出 schema 与目标相关累加器"""
+    out = pipeline.transform(read_frame(src))
+    write_frame(out, dst)
+    acc = None
+    if pipeline.corr_threshold is not None and pipeline.target_col in out.columns:
+        acc = CorrelationAccumulator(numeric_columns(out), targets=[pipeline.target_col])
+        for start in range(0, len(out), DEFAULT_CHUNKSIZE):
+            acc.update(out.iloc[start:start + DEFAULT_CHUNKSIZE])
+    return {'schema': out.iloc[:0], 'corr': acc}
+
+
+# ---------- 执行器 ----------
+class PartitionedExecutor:
+    """分区并行执行器；在 with 块内使用，进程池与分区临时目录随块释放
+
+    workers：进程数（默认 CPU 核数，1 表示在本进程内顺序执行各分区）
+    partitions：分区数（默认等于 workers）
+    partition_by：'rows' 按行区间切分；'hash' 按 key 列哈希切分（同一客户的行落在同一分区）
+    """
+
+    def __init__(self, workers: int = None, partitions: int = None, partition_by: str = 'rows',
+                 key: str = 'customerID'):
+        if partition_by not in PARTITION_BY:
+            raise ValueError(f"未知分区方式：{partition_by}，可选 {list(PARTITION_BY)}")
+        self.workers = workers or os.cpu_count() or 1
+        self.partitions = partitions or self.workers
+        self.partition_by = partition_by
+        self.key = key
+        self._tmp = self._pool = None
+
+    def __enter__(self):
+        self._tmp = tempfile.TemporaryDirectory(prefix='telco-partitions-')
+        if self.workers > 1:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self._pool is not None:
+            self._pool.shutdown()
+        self._tmp.cleanup()
+        self._tmp = self._pool = None
+        return False
+
+    # ----- 基础操作 -----
+    def _map(self, func, *arg_lists) -> list:
+        """对每个分区执行 func，结果按分区顺序返回"""
+        if self._tmp is None:
+            raise RuntimeError("PartitionedExecutor 需在 with 块内使用")
+        if self._pool is None:
+            return [func(*args) for args in zip(*arg_lists)]
+        futures = [self._pool.submit(func, *args) for args in zip(*arg_lists)]
+        return [f.result() for f in futures]
+
+    def _paths(self, stage: str, n: int) -> list:
+        return [str(Path(self._tmp.name) / f'{stage}-{i:05d}.feather') for i in range(n)]
+
+    def _split(self, df: pd.DataFrame, stage: str) -> tuple:
+        """切分并写出分区，返回 (路径, 各分区行在 df 中的位置)；空分区不写"""
+        if self.partition_by == 'rows':
+            positions = np.array_split(np.arange(len(df)), self.partitions)
+        else:
+            if self.key not in df.columns:
+                raise ValueError(f"按哈希分区需要 {self.key} 列")
+            part = pd.util.hash_pandas_object(df[self.key], index=False).to_numpy() % self.partitions
+            positions = [np.flatnonzero(part == i) for i in range(self.partitions)]
+        positions = [p for p in positions if len(p)]
+        paths = self._paths(stage, len(positions))
+        for pos, path in zip(positions, paths):
+            write_frame(df.iloc[pos], path)
+        return paths, positions
+
+    def _assemble(self, frames: list, positions: list, index: pd.Index) -> pd.DataFrame:
+        """按原始行顺序拼接各分区结果，恢复原索引"""
+        out = pd.concat(frames, ignore_index=True)
+        pos = np.concatenate(positions)
+        if self.partition_by == 'hash':
+            order = np.argsort(pos, kind='stable')
+            out, pos = out.take(order), pos[order]
+        out.index = index[pos]
+        return out
+
+    # ----- 清洗 -----
+    @instrument('partitioned_clean')
+    def clean_data(self, df: pd.DataFrame, drop_duplicates: bool = True) -> pd.DataFrame:
+        """与 data_cleaner.clean_data 结果一致（去重为行哈希口径）"""
+        logger.info(f"[分区并行] 开始清洗：{len(df)} 行，{self.partitions} 个分区（{self.partition_by}），"
+                    f"{self.workers} 个进程")
+        raw_paths, positions = self._split(df, 'raw')
+        n = len(raw_paths)
+
+        # map：逐行修正 + 局部统计
+        scan_paths = self._paths('scan', n)
+        scans = self._map(_clean_scan, raw_paths, scan_paths, [data_cleaner.CATEGORY_COLS] * n)
+
+        # gather：合并填充值统计 → 填充值；合并取值集合（含填充值）→ 类别全集
+        stats = functools.reduce(lambda a, b: a.merge(b), [scan['fill'] for scan in scans])
+        fill_values = stats.fill_values()
+        levels = {}
+        for scan in scans:
+            for col, values in scan['levels'].items():
+                levels.setdefault(col, set()).update(values)
+        levels = {col: sorted(values | ({fill_values[col]} if stats.na_counts.get(col) else set()))
+                  for col, values in levels.items()}
+        if fill_values:
+            logger.info(f"[分区并行] 全局填充值：{fill_values}")
+
+        # map：填充 → 类型转换 → 行哈希
+        clean_paths = self._paths('clean', n)
+        hashes = self._map(_clean_apply, scan_paths, clean_paths, [fill_values] * n, [levels] * n)
+
+        # gather：按原始行号保留首次出现的行
+        all_hashes = np.concatenate(hashes)
+        keep = np.ones(len(all_hashes), dtype=bool)
+        if drop_duplicates:
+            order = np.argsort(np.concatenate(positions), kind='stable')
+            _, first = np.unique(all_hashes[order], return_index=True)
+            keep[:] = False
+            keep[order[first]] = True
+        keeps = np.split(keep, np.cumsum([len(p) for p in positions])[:-1])
+
+        out = self._assemble([read_frame(p)[k] for p, k in zip(clean_paths, keeps)],
+                             [p[k] for p, k in zip(positions, keeps)], df.index)
+        if len(out) < len(df):
+            logger.info(f"[分区并行] 去重完成：{len(df)} -> {len(out)}")
+        logger.info(f"[分区并行] 清洗完成，最终形状：{out.shape}")
+        return out
+
+    # ----- 特征工程 -----
+    @instrument('partitioned_features')
+    def fit_transform_features(self, df: pd.DataFrame, pipeline: FeaturePipeline) -> pd.DataFrame:
+        """拟合 pipeline 并返回特征，与 pipeline.fit_transform(df) 一致"""
+        logger.info(f"[分区并行] 开始特征工程：{len(df)} 行，{self.partitions} 个分区，{self.workers} 个进程")
+        paths, positions = self._split(df, 'features-in')
+        n = len(paths)
+
+        # map：基础特征 → 布局统计 + 数值列；gather：合并布局，主进程拟合 KMeans / PCA
+        # 流式拟合（needs_matrix 为假）时逐分区读数值列，主进程不拼整表
+        matrix_cols = list(dict.fromkeys(CLUSTER_COLS + PCA_COLS))
+        matrix_paths = self._paths('features-matrix', n)
+        scans = self._map(_feature_scan, paths, matrix_paths, [matrix_cols] * n)
+        stats = functools.reduce(merge_layout_stats, scans)
+        if pipeline.needs_matrix:
+            X = self._assemble([read_frame(p) for p in matrix_paths], positions, df.index)
+        else:
+            X = lambda: (read_frame(p) for p in matrix_paths)
+        pipeline._fit_state(stats, X)
+        del X, scans
+
+        # map：套用流水线；gather：合并相关累加器，做相关性筛选
+        out_paths = self._paths('features-out', n)
+        results = self._map(_feature_apply, paths, out_paths, [pipeline] * n)
+        pipeline._set_output(results[0]['schema'])
+        columns = pipeline.output_columns_
+        if pipeline.corr_threshold is not None and pipeline.target_col in columns:
+            acc = functools.reduce(lambda a, b: a.merge(b), [r['corr'] for r in results])
+            pipeline.selected_columns_ = columns = correlation_selected(
+                acc.result()[pipeline.target_col], pipeline.target_col, pipeline.corr_threshold)
+            logger.info(f"[特征选择] 相关性完成，选出 {len(columns)} 个特征")
+
+        out = self._assemble([read_frame(p, columns=columns) for p in out_paths], positions, df.index)
+        logger.info(f"[分区并行] 特征工程完成，输出 {out.shape[1]} 列")
+        return out
+
+
+# ---------- 函数入口 ----------
+def clean_data(df: pd.DataFrame, workers: int = None, partitions: int = None,
+               partition_by: str = 'rows', drop_duplicates: bool = True) -> pd.DataFrame:
+    with PartitionedExecutor(workers, partitions, partition_by) as executor:
+        return executor.clean_data(df, drop_duplicates)
+
+
+def fit_transform_features(df: pd.DataFrame, pipeline: FeaturePipeline, workers: int = None,
+                           partitions: int = None, partition_by: str = 'rows') -> pd.DataFrame:
+    with PartitionedExecutor(workers, partitions, partition_by) as executor:
+        return executor.fit_transform_features(df, pipeline)
+
+
+def clean_and_featurize(df: pd.DataFrame, pipeline: FeaturePipeline, workers: int = None,
+                        partitions: int = None, partition_by: str = 'rows') -> tuple:
+    """清洗 + 特征工程共用一个进程池，返回 (cleaned, features)"""
+    with PartitionedExecutor(workers, partitions, partition_by) as executor:
+        cleaned = executor.clean_data(df)
+        return cleaned, executor.fit_transform_features(cleaned, pipeline)
+
+
+# ---------- 一致性校验 / 计时 ----------
+def check_parity(raw: pd.DataFrame, workers: int = None, partitions: int = None,
+                 partition_by: str = 'rows') -> dict:
+    """同一份原始数据分别走串行参考实现与分区并行，比对清洗与特征结果，并记录耗时"""
+    from src.data_processing.polars_backend import _compare
+    logging.disable(logging.INFO)
+    try:
+        start = time.perf_counter()
+        ref_clean = data_cleaner.clean_data(raw)
+        ref_features = FeaturePipeline(corr_threshold=0.05).fit_transform(ref_clean)
+        serial_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        clean, features = clean_and_featurize(raw, FeaturePipeline(corr_threshold=0.05),
+                                              workers, partitions, partition_by)
+        parallel_s = time.perf_counter() - start
+    finally:
+        logging.disable(logging.NOTSET)
+    problems = {'cleaned': _compare(ref_clean, clean), 'features': _compare(ref_features, features)}
+    if not problems['cleaned'] and not ref_clean.index.equals(clean.index):
+        problems['cleaned'].append("行索引不一致")
+    return {**problems, 'serial_s': serial_s, 'parallel_s': parallel_s}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="分区并行执行与串行参考实现的一致性校验 / 计时")
+    parser.add_argument('--csv', default='data/WA_Fn-UseC_-Telco-Customer-Churn.csv')
+    parser.add_argument('--synthetic-rows', type=int, default=50_000,
+                        help="另用合成数据（含空白 TotalCharges、重复行与注入缺失）校验，0 表示跳过")
+    parser.add_argument('--workers', type=int, default=None, help="进程数（默认 CPU 核数）")
+    parser.add_argument('--partitions', type=int, default=None, help="分区数（默认等于进程数）")
+    parser.add_argument('--partition-by', choices=PARTITION_BY, default='rows')
+    args = parser.parse_args(argv)
+
+    datasets = {'source': pd.read_csv(args.csv)}
+    if args.synthetic_rows:
+        from src.data_processing.synthetic import fit_profile, generate_frame
+        syn = generate_frame(args.synthetic_rows, fit_profile(datasets['source']),
+                             blank_rate=0.01, duplicate_rate=0.01)
+        rng = np.random.default_rng(0)
+        for col in ['tenure', 'MonthlyCharges', 'PaymentMethod', 'gender']:
+            syn.loc[rng.random(len(syn)) < 0.01, col] = np.nan
+        datasets['synthetic'] = syn
+    failed = False
+    for name, raw in datasets.items():
+        result = check_parity(raw, args.workers, args.partitions, args.partition_by)
+        print(f"[parity] {name:<10} 串行 {result['serial_s']:.2f}s，分区并行 {result['parallel_s']:.2f}s")
+        for stage in ('cleaned', 'features'):
+            problems = result[stage]
+            status = '一致' if not problems else f"{len(problems)} 处不一致"
+            print(f"[parity] {name:<10} {stage:<8} {status}")
+            for p in problems:
+                print(f"    - {p}")
+            failed |= bool(problems)
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,250 @@
+"""按内容寻址的增量执行：阶段指纹不变且产物齐全时跳过，直接复用磁盘产物
+
+阶段指纹 = 代码源码 + 参数 + 外部输入文件内容哈希 + 上游阶段产物内容哈希。
+代码部分除声明的函数 / 模块外，还包括它们（传递地）导入的全部 src 模块，
+改动任何被用到的 src 代码都会让阶段重跑，不依赖手工列全模块。
+上游即使被强制重跑，只要产物内容没变，下游仍可跳过。
+"""
+import ast
+import hashlib
+import importlib.util
+import inspect
+import json
+import logging
+import time
+import types
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+from src.data_processing.data_cache import file_hash
+from src.utils.instrumentation import instrument, row_count
+
+logger = logging.getLogger(__name__)
+
+CODE_PACKAGE = 'src'   # 指纹追踪其导入关系的顶层包
+
+
+@dataclass
+class Stage:
+    """流水线中的一个阶段
+
+    run:     执行函数，按 deps 顺序接收上游结果
+    deps:    上游阶段名
+    sources: 外部输入文件（按内容哈希）
+    outputs: 产物文件，全部存在时才允许跳过
+    code:    参与指纹的代码（函数 / 模块），默认取 run 本身；其传递导入的 src 模块自动计入
+    params:  参与指纹的参数（需可 JSON 序列化）
+    load:    跳过时从产物恢复结果（无下游需要时可不提供）
+    """
+    name: str
+    run: Callable
+    deps: List[str] = field(default_factory=list)
+    sources: List[Path] = field(default_factory=list)
+    outputs: List[Path] = field(default_factory=list)
+    code: List[Any] = field(default_factory=list)
+    params: Dict[str, Any] = field(default_factory=dict)
+    load: Callable = None
+
+
+def _source_of(obj) -> str:
+    try:
+        return inspect.getsource(obj)
+    except (OSError, TypeError):
+        return repr(obj)
+
+
+def _in_package(name) -> bool:
+    return isinstance(name, str) and (name == CODE_PACKAGE or name.startswith(CODE_PACKAGE + '.'))
+
+
+def _is_module(name: str) -> bool:
+    try:
+        return importlib.util.find_spec(name) is not None
+    except (ImportError, ValueError):
+        return False
+
+
+_IMPORTS: Dict[str, set] = {}
+
+
+def _imports_of(module: str) -> set:
+    """模块源码中（含函数体内的延迟导入）直接导入的 src 模块"""
+    if module not in _IMPORTS:
+        spec = importlib.util.find_spec(module)
+        found = set()
+        if spec is not None and spec.origin and spec.origin.endswith('.py'):
+            package = module if spec.submodule_search_locations is not None else module.rpartition('.')[0]
+            tree = ast.parse(Path(spec.origin).read_text(encoding='utf-8'))
+            for node in ast.walk(tree):
+                if isinstance(node, ast.Import):
+                    found.update(alias.name for alias in node.names)
+                elif isinstance(node, ast.ImportFrom):
+                    base = importlib.util.resolve_name('.' * node.level + (node.module or ''), package) \
+                        if node.level else node.module
+                    # from pkg import name：name 是子模块时记子模块，否则记 pkg
+                    found.update(f"{base}.{alias.name}" if _is_module(f"{base}.{alias.name}") else base
+                                 for alias in node.names)
+        _IMPORTS[module] = {m for m in found if _in_package(m)}
+    return _IMPORTS[module]
+
+
+def _referenced(obj) -> tuple:
+    """obj 直接用到的 (src 模块名集合, 同模块内被调用的其它函数)
+
+    模块取自身；src 中的函数 / 类取所在模块；其它函数（如 main.py 里的阶段函数）
+    按字节码引用的全局名解析：来自 src 的对象记其模块，同模块的函数递归展开
+    """
+    if isinstance(obj, types.ModuleType):
+        return ({obj.__name__} if _in_package(obj.__name__) else set()), []
+    if _in_package(getattr(obj, '__module__', None)):
+        return {obj.__module__}, []
+    func = inspect.unwrap(obj)
+    if not hasattr(func, '__code__'):
+        return set(), []
+    modules, local, seen = set(), [], {func}
+    stack = [func]
+    while stack:
+        f = stack.pop()
+        names, codes = set(), [f.__code__]
+        while codes:
+            code = codes.pop()
+            names.update(code.co_names)
+            codes.extend(c for c in code.co_consts if isinstance(c, types.CodeType))
+        for name in names:
+            value = f.__globals__.get(name)
+            if value is None:
+                continue
+            owner = value.__name__ if isinstance(value, types.ModuleType) else getattr(value, '__module__', None)
+            if _in_package(owner):
+                modules.add(owner)
+            elif (inspect.isfunction(value) and value.__module__ == func.__module__
+                  and value not in seen):
+                seen.add(value)
+                local.append(value)
+                stack.append(value)
+    return modules, local
+
+
+def code_closure(code: list) -> tuple:
+    """(同模块被调用的其它函数, 传递导入的全部 src 模块名（排序）)"""
+    modules, local = set(), []
+    for obj in code:
+        mods, funcs = _referenced(obj)
+        modules |= mods
+        local += [f for f in funcs if f not in local and f not in code]
+    stack = list(modules)
+    while stack:
+        for dep in _imports_of(stack.pop()) - modules:
+            modules.add(dep)
+            stack.append(dep)
+    return sorted(local, key=lambda f: (f.__module__, f.__qualname__)), sorted(modules)
+
+
+class StageGraph:
+    """阶段图：按添加顺序（即拓扑序）执行，manifest 记录各阶段上次的指纹与产物哈希"""
+
+    def __init__(self, manifest_path=Path('data/cache/stages.json')):
+        self.manifest_path = Path(manifest_path)
+        self.manifest = (json.loads(self.manifest_path.read_text(encoding='utf-8'))
+                         if self.manifest_path.exists() else {})
+        self.stages: Dict[str, Stage] = {}
+        self._results: Dict[str, Any] = {}
+        self._digests: Dict[str, str] = {}
+
+    def add(self, stage: Stage) -> Stage:
+        missing = [d for d in stage.deps if d not in self.stages]
+        if missing:
+            raise ValueError(f"阶段 {stage.name} 的上游 {missing} 尚未注册")
+        self.stages[stage.name] = stage
+        return stage
+
+    # ---------- 指纹 ----------
+    def fingerprint(self, stage: Stage) -> str:
+        h = hashlib.sha256()
+        code = stage.code or [stage.run]
+        local, modules = code_closure(code)
+        for obj in code + local:
+            h.update(_source_of(obj).encode('utf-8'))
+        for name in modules:
+            spec = importlib.util.find_spec(name)
+            if spec is not None and spec.origin and spec.origin.endswith('.py'):
+                h.update(f"{name}:{file_hash(spec.origin)}".encode('utf-8'))
+        h.update(json.dumps(stage.params, sort_keys=True, default=str).encode('utf-8'))
+        for src in stage.sources:
+            h.update(f"{src}:{file_hash(src)}".encode('utf-8'))
+        for dep in stage.deps:
+            h.update(f"{dep}:{self._digests[dep]}".encode('utf-8'))
+        return h.hexdigest()[:16]
+
+    @staticmethod
+    def _output_digest(stage: Stage) -> str:
+        h = hashlib.sha256()
+        for out in stage.outputs:
+            h.update(f"{out}:{file_hash(out)}".encode('utf-8'))
+        return h.hexdigest()[:16]
+
+    # ---------- 执行 ----------
+    def result(self, name: str):
+        """取阶段结果；被跳过的阶段按需从产物加载（只加载一次）"""
+        if name not in self._results:
+            stage = self.stages[name]
+            if stage.load is None:
+                raise RuntimeError(f"阶段 {name} 未提供 load，无法复用其产物")
+            logger.info(f"[增量] 复用 {name} 的产物")
+            self._results[name] = stage.load()
+        return self._results[name]
+
+    def run(self, force=(), targets=None) -> Dict[str, str]:
+        """执行整张图（或 targets 及其上游）
+
+        force: 强制重跑的阶段名，'all' 表示全部
+        Returns: {阶段名: 'ran' | 'skipped'}
+        """
+        force = set(force)
+        unknown = force - set(self.stages) - {'all'}
+        if unknown:
+            raise ValueError(f"未知阶段：{sorted(unknown)}，可选 {list(self.stages)}")
+
+        status = {}
+        for name in self._closure(targets):
+            stage = self.stages[name]
+            fp = self.fingerprint(stage)
+            prev = self.manifest.get(name, {})
+            fresh = (prev.get('fingerprint') == fp
+                     and all(Path(o).exists() for o in stage.outputs))
+            if fresh and name not in force and 'all' not in force:
+                self._digests[name] = prev['output_digest']
+                status[name] = 'skipped'
+                logger.info(f"[增量] {name} 未变化，跳过")
+                continue
+
+            t0 = time.perf_counter()
+            inputs = [self.result(d) for d in stage.deps]
+            with instrument(name, rows_in=row_count(inputs[0]) if inputs else None) as span:
+                self._results[name] = stage.run(*inputs)
+                span.rows_out = row_count(self._results[name])
+            self._digests[name] = self._output_digest(stage)
+            self.manifest[name] = {'fingerprint': fp, 'output_digest': self._digests[name]}
+            self._save_manifest()
+            status[name] = 'ran'
+            logger.info(f"[增量] {name} 完成，用时 {time.perf_counter() - t0:.2f}s")
+        return status
+
+    def _closure(self, targets) -> List[str]:
+        """targets 及其全部上游，保持注册顺序"""
+        if targets is None:
+            return list(self.stages)
+        needed, stack = set(), list(targets)
+        while stack:
+            name = stack.pop()
+            if name not in self.stages:
+                raise ValueError(f"未知阶段：{name}")
+            if name not in needed:
+                needed.add(name)
+                stack.extend(self.stages[name].deps)
+        return [n for n in self.stages if n in needed]
+
+    def _save_manifest(self):
+        self.manifest_path.parent.mkdir(parents=True, exist_ok=True)
+        self.manifest_path.write_text(json.dumps(self.manifest, indent=2), encoding='utf-8')
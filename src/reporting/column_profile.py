@@ -0,0 +1,172 @@
+"""共享列画像：一次遍历算出三份报告需要的全部逐列统计，按 DataFrame 指纹缓存
+
+数值列：整块转成 float 矩阵后逐列排序一次，min/max/分位数/唯一值都从排序结果读出，
+矩、偏度、峰度、相关系数用向量化公式计算；分类列各做一次 value_counts。
+"""
+import hashlib
+import logging
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from src.utils.correlation import correlation_matrix
+
+logger = logging.getLogger(__name__)
+
+QUANTILES = (0.25, 0.5, 0.75)
+_CACHE = OrderedDict()
+_CACHE_SIZE = 4
+
+
+def _sorted_quantiles(sorted_x: np.ndarray, counts: np.ndarray, qs) -> np.ndarray:
+    """已排序（NaN 在末尾）的矩阵按列取线性插值分位数，口径同 pandas.describe"""
+    out = np.full((len(qs), sorted_x.shape[1]), np.nan)
+    valid = counts > 0
+    if not valid.any():
+        return out
+    cols = np.flatnonzero(valid)
+    for i, q in enumerate(qs):
+        pos = q * (counts[cols] - 1)
+        lo = np.floor(pos).astype(int)
+        hi = np.minimum(lo + 1, counts[cols] - 1)
+        frac = pos - lo
+        lo_v = sorted_x[lo, cols]
+        hi_v = sorted_x[hi, cols]
+        out[i, cols] = lo_v + (hi_v - lo_v) * frac
+    return out
+
+
+class ColumnProfile:
+    """逐列统计画像（通过 get_profile 获取，相同数据只算一次）"""
+
+    def __init__(self, df: pd.DataFrame, row_hashes: np.ndarray = None):
+        if row_hashes is None:
+            row_hashes = pd.util.hash_pandas_object(df, index=False).to_numpy()
+        self.n_rows, self.n_cols = df.shape
+        self.columns = list(df.columns)
+        self.dtypes = {c: str(df[c].dtype) for c in df.columns}
+        self.duplicate_rows = int(len(row_hashes) - len(np.unique(row_hashes)))
+
+        # 数值列（含 bool，与 is_numeric_dtype 一致）；number_columns 与 select_dtypes('number') 一致
+        self.numeric_columns = [c for c in df.columns if pd.api.types.is_numeric_dtype(df[c])]
+        self.number_columns = list(df.select_dtypes('number').columns)
+        self.categorical_columns = [c for c in df.columns if c not in self.numeric_columns]
+
+        missing = {}
+        unique = {}
+        self.top_values = {}
+        self._numeric_block(df, missing, unique)
+        for col in self.categorical_columns:
+            counts = df[col].value_counts()
+            missing[col] = np.int64(len(df) - counts.sum())
+            unique[col] = int((counts > 0).sum())
+            self.top_values[col] = counts.head(5)
+        self.missing_count = pd.Series(missing, dtype='int64').reindex(self.columns)
+        self.unique_count = pd.Series(unique, dtype='int64').reindex(self.columns)
+
+    def _numeric_block(self, df: pd.DataFrame, missing: dict, unique: dict):
+        cols = self.numeric_columns
+        self.stats = pd.DataFrame(index=cols, columns=[
+            'count', 'mean', 'std', 'min', '25%', '50%', '75%', 'max', 'skew', 'kurt'], dtype='float64')
+        self.raw_min, self.raw_max = {}, {}
+        self.corr = pd.DataFrame()
+        self.outlier_counts = pd.Series(dtype='int64')
+        if not cols:
+            return
+
+        X = df[cols].to_numpy(dtype='float64', na_value=np.nan)
+        nan = np.isnan(X)
+        counts = (~nan).sum(axis=0)
+        S = np.sort(X, axis=0)  # NaN 排在末尾
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = np.where(nan, 0, X).sum(axis=0) / counts
+            d = np.where(nan, 0, X - mean)
+            m2 = (d ** 2).sum(axis=0) / counts
+            m3 = (d ** 3).sum(axis=0) / counts
+            m4 = (d ** 4).sum(axis=0) / counts
+            std = np.sqrt(m2 * counts / (counts - 1))
+            # 有偏估计，与 scipy.stats.skew / kurtosis 默认口径一致
+            skew = m3 / m2 ** 1.5
+            kurt = m4 / m2 ** 2 - 3
+
+        idx = np.arange(len(cols))
+        last = np.maximum(counts - 1, 0)
+        mins = np.where(counts > 0, S[0], np.nan)
+        maxs = np.where(counts > 0, S[last, idx], np.nan)
+        q = _sorted_quantiles(S, counts, QUANTILES)
+        # 唯一值：排序后相邻不等的个数
+        changes = (np.diff(S, axis=0) != 0) & ~np.isnan(S[1:])
+        nunique = np.where(counts > 0, changes.sum(axis=0) + 1, 0)
+
+        self.stats['count'] = counts
+        self.stats['mean'] = mean
+        self.stats['std'] = std
+        self.stats['min'] = mins
+        self.stats['25%'], self.stats['50%'], self.stats['75%'] = q
+        self.stats['max'] = maxs
+        self.stats['skew'] = skew
+        self.stats['kurt'] = kurt
+
+        for j, col in enumerate(cols):
+            missing[col] = np.int64(len(df) - counts[j])
+            unique[col] = int(nunique[j])
+            # min/max 还原成列本身的类型（int 列仍是 int）
+            dtype_type = df[col].dtype.type if isinstance(df[col].dtype, np.dtype) else float
+            if counts[j] > 0:
+                self.raw_min[col] = dtype_type(mins[j])
+                self.raw_max[col] = dtype_type(maxs[j])
+            else:
+                self.raw_min[col] = self.raw_max[col] = np.nan
+
+        # 相关矩阵与 IQR 异常值在此一并算完，不在缓存里保留整块矩阵
+        num_pos = [cols.index(c) for c in self.number_columns]
+        self.corr = self._corr_matrix(df)
+        self.outlier_counts = self._count_outliers(X[:, num_pos])
+
+    def _corr_matrix(self, df: pd.DataFrame) -> pd.DataFrame:
+        """number_columns 的皮尔逊相关矩阵（取自共享相关缓存，热力图等处复用同一份）"""
+        return correlation_matrix(df, columns=self.number_columns)
+
+    def _count_outliers(self, X: np.ndarray, k: float = 1.5) -> pd.Series:
+        """IQR 规则：落在 [Q1 - k·IQR, Q3 + k·IQR] 之外的个数"""
+        desc = self.describe()
+        iqr = (desc['75%'] - desc['25%']).to_numpy()
+        low = desc['25%'].to_numpy() - k * iqr
+        high = desc['75%'].to_numpy() + k * iqr
+        counts = ((X < low) | (X > high)).sum(axis=0)
+        return pd.Series(counts, index=self.number_columns, dtype='int64')
+
+    # ---------- 派生统计 ----------
+    def describe(self) -> pd.DataFrame:
+        """等价于 num.describe().T + skew + kurt（num 为 select_dtypes('number')）"""
+        return self.stats.loc[self.number_columns].copy()
+
+    def missing_rate(self) -> pd.Series:
+        return self.missing_count / self.n_rows if self.n_rows else self.missing_count.astype(float)
+
+
+def frame_fingerprint(df: pd.DataFrame, row_hashes: np.ndarray = None) -> str:
+    """DataFrame 指纹：列名 + dtype + 逐行内容哈希"""
+    if row_hashes is None:
+        row_hashes = pd.util.hash_pandas_object(df, index=False).to_numpy()
+    h = hashlib.sha256()
+    h.update(repr([(c, str(t)) for c, t in df.dtypes.items()]).encode('utf-8'))
+    h.update(row_hashes.tobytes())
+    return h.hexdigest()
+
+
+def get_profile(df: pd.DataFrame) -> ColumnProfile:
+    """按指纹缓存的列画像：同一份数据被多个报告使用时只统计一次"""
+    row_hashes = pd.util.hash_pandas_object(df, index=False).to_numpy()
+    key = frame_fingerprint(df, row_hashes)
+    if key in _CACHE:
+        _CACHE.move_to_end(key)
+        return _CACHE[key]
+    profile = ColumnProfile(df, row_hashes)
+    _CACHE[key] = profile
+    if len(_CACHE) > _CACHE_SIZE:
+        _CACHE.popitem(last=False)
+    logger.info(f"[列画像] 已统计 {profile.n_rows} 行 × {profile.n_cols} 列")
+    return profile
@@ -3,9 +3,12 @@ import pandas as pd
 import json
 from pathlib import Path
 import logging
+from src.reporting.column_profile import get_profile
+from src.utils.instrumentation import instrument
 
 logger = logging.getLogger(__name__)
 
+@instrument()
 def generate_feature_documentation(df: pd.DataFrame, save_path: str = "reports/feature_documentation.md"):
     """
     生成特征文档说明
@@ -30,37 +33,39 @@ def generate_feature_documentation(df: pd.DataFrame, save_path: str = "reports/f
     return md_content
 
 def analyze_features(df: pd.DataFrame) -> dict:
-    """分析特征信息"""
+    """分析特征信息（取自共享列画像，不再逐列重复扫描）"""
+    profile = get_profile(df)
     feature_info = {
         'basic_info': {
-            'total_features': len(df.columns),
-            'total_samples': len(df),
-            'numerical_features': len(df.select_dtypes(include=['number']).columns),
+            'total_features': profile.n_cols,
+            'total_samples': profile.n_rows,
+            'numerical_features': len(profile.number_columns),
             'categorical_features': len(df.select_dtypes(include=['object', 'category']).columns)
         },
         'features': {}
     }
     
-    for col in df.columns:
+    for col in profile.columns:
+        missing = profile.missing_count[col]
         col_info = {
-            'dtype': str(df[col].dtype),
-            'missing_count': df[col].isnull().sum(),
-            'missing_percent': (df[col].isnull().sum() / len(df)) * 100,
-            'unique_count': df[col].nunique()
+            'dtype': profile.dtypes[col],
+            'missing_count': missing,
+            'missing_percent': (missing / profile.n_rows) * 100,
+            'unique_count': int(profile.unique_count[col])
         }
         
         # 数值型特征统计
-        if pd.api.types.is_numeric_dtype(df[col]):
+        if col in profile.numeric_columns:
+            stats = profile.stats.loc[col]
             col_info.update({
-                'min': df[col].min(),
-                'max': df[col].max(),
-                'mean': df[col].mean(),
-                'std': df[col].std()
+                'min': profile.raw_min[col],
+                'max': profile.raw_max[col],
+                'mean': stats['mean'],
+                'std': stats['std']
             })
         # 分类型特征统计
         else:
-            top_values = df[col].value_counts().head(5).to_dict()
-            col_info['top_values'] = top_values
+            col_info['top_values'] = profile.top_values[col].to_dict()
         
         feature_info['features'][col] = col_info
     
@@ -81,8 +86,10 @@ def create_markdown_document(feature_info: dict, df: pd.DataFrame) -> str:
         ""
     ]
     
+    profile = get_profile(df)
+
     # 数值型特征表格
-    numerical_features = [col for col in df.columns if pd.api.types.is_numeric_dtype(df[col])]
+    numerical_features = profile.numeric_columns
     if numerical_features:
         content.extend([
             "### 数值型特征",
@@ -97,7 +104,7 @@ def create_markdown_document(feature_info: dict, df: pd.DataFrame) -> str:
         content.append("")
     
     # 分类型特征表格
-    categorical_features = [col for col in df.columns if not pd.api.types.is_numeric_dtype(df[col])]
+    categorical_features = profile.categorical_columns
     if categorical_features:
         content.extend([
             "### 分类型特征",
@@ -113,6 +120,7 @@ def create_markdown_document(feature_info: dict, df: pd.DataFrame) -> str:
         content.append("")
     
     # 特征分类说明
+    missing = profile.missing_count
     content.extend([
         "## 特征分类说明",
         "",
@@ -132,9 +140,9 @@ def create_markdown_document(feature_info: dict, df: pd.DataFrame) -> str:
         "- **PCA特征**: 主成分分析降维特征",
         "",
         "## 数据质量",
-        f"- **整体缺失率**: {(df.isnull().sum().sum() / (len(df) * len(df.columns)) * 100):.2f}%",
-        f"- **完全缺失特征**: {sum(df.isnull().sum() == len(df))} 个",
-        f"- **无缺失特征**: {sum(df.isnull().sum() == 0)} 个",
+        f"- **整体缺失率**: {(missing.sum() / (profile.n_rows * profile.n_cols) * 100):.2f}%",
+        f"- **完全缺失特征**: {sum(missing == profile.n_rows)} 个",
+        f"- **无缺失特征**: {sum(missing == 0)} 个",
         "",
         "*文档自动生成于特征工程完成后*"
     ])
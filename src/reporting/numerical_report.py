@@ -6,16 +6,24 @@ import numpy as np
 import seaborn as sns
 import matplotlib.pyplot as plt
 from pathlib import Path
-from scipy.stats import skew, kurtosis
 import logging
+from src.reporting.column_profile import get_profile
+from src.visualization.eda_plots import (AGGREGATE_MIN_ROWS, aggregated_histplot,
+                                         aggregated_jointplot)
+from src.utils.instrumentation import instrument
 
 plt.style.use('seaborn-v0_8')
 
 
-def numerical_report(df: pd.DataFrame, out_dir: Path = Path('reports')):
+@instrument()
+def numerical_report(df: pd.DataFrame, out_dir: Path = Path('reports'), aggregate: bool = None):
+    """aggregate：分布图/联合图先分箱聚合再画（None 时按行数自动选择）"""
     out_dir.mkdir(exist_ok=True)
+    if aggregate is None:
+        aggregate = len(df) >= AGGREGATE_MIN_ROWS
     md_path = out_dir / 'numerical_feature_report.md'
-    num = df.select_dtypes('number')
+    profile = get_profile(df)  # 描述统计/偏度/峰度/相关矩阵都取自共享列画像
+    num = df[profile.number_columns]
 
     md = f"# 数值特征报告\n\n样本：{df.shape}\n\n"
     if num.empty:
@@ -24,9 +32,7 @@ def numerical_report(df: pd.DataFrame, out_dir: Path = Path('reports')):
         return
 
     # 1. 描述 + 偏度 + 峰度 + CV
-    stat = num.describe().T
-    stat['skew'] = skew(num, nan_policy='omit')
-    stat['kurt'] = kurtosis(num, nan_policy='omit')
+    stat = profile.describe()
     stat['cv'] = stat['std'] / stat['mean']
     md += "## 1 描述统计\n" + stat.round(2).to_markdown() + "\n\n"
 
@@ -35,7 +41,10 @@ def numerical_report(df: pd.DataFrame, out_dir: Path = Path('reports')):
     plt_dir.mkdir(exist_ok=True)
     for col in num.columns[:4]:
         plt.figure(figsize=(4, 2))
-        sns.histplot(num[col], kde=True)
+        if aggregate:
+            aggregated_histplot(plt.gca(), num[col].to_numpy())
+        else:
+            sns.histplot(num[col], kde=True)
         plt.title(f'{col} 分布')
         fig = plt_dir / f'dist_{col}.png'
         plt.savefig(fig, dpi=300); plt.close()
@@ -53,16 +62,19 @@ def numerical_report(df: pd.DataFrame, out_dir: Path = Path('reports')):
 
     # 4. 联合图（tenure vs MonthlyCharges）
     if {'tenure', 'MonthlyCharges'}.issubset(num.columns):
-        plt.figure(figsize=(4, 3))
-        sns.jointplot(x='tenure', y='MonthlyCharges', data=num, kind='scatter', alpha=0.6)
-        plt.tight_layout()
+        if aggregate:
+            aggregated_jointplot(num['tenure'], num['MonthlyCharges'])
+        else:
+            plt.figure(figsize=(4, 3))
+            sns.jointplot(x='tenure', y='MonthlyCharges', data=num, kind='scatter', alpha=0.6)
+            plt.tight_layout()
         fig_joint = plt_dir / 'tenure_vs_monthly.png'
         plt.savefig(fig_joint, dpi=300); plt.close()
         md += f"![联合图]({fig_joint.relative_to(out_dir)})\n\n"
 
     # 5. 相关性热力图
     plt.figure(figsize=(6, 5))
-    sns.heatmap(num.corr(), annot=True, fmt='.2f', cmap='coolwarm', square=True)
+    sns.heatmap(profile.corr, annot=True, fmt='.2f', cmap='coolwarm', square=True)
     plt.title('皮尔逊相关系数')
     fig_corr = plt_dir / 'num_corr.png'
     plt.savefig(fig_corr, dpi=300); plt.close()
@@ -70,7 +82,7 @@ def numerical_report(df: pd.DataFrame, out_dir: Path = Path('reports')):
 
     # 6. 高相关警告
     high_corr = (
-        num.corr()
+        profile.corr
         .where(np.triu(np.ones(num.shape[1]), k=1).astype(bool))
         .stack()
         .abs()
@@ -6,22 +6,26 @@ import seaborn as sns
 import matplotlib.pyplot as plt
 from pathlib import Path
 import logging
+from src.reporting.column_profile import get_profile
+from src.utils.instrumentation import instrument
 
 plt.style.use('seaborn-v0_8')
 
 
+@instrument()
 def quality_report(df: pd.DataFrame, out_dir: Path = Path('reports')):
     out_dir.mkdir(exist_ok=True)
     md_path = out_dir / 'data_quality_report.md'
     csv_path = out_dir / 'tables' / 'outlier_detail.csv'
 
-    n, m = df.shape
+    profile = get_profile(df)  # 与数值报告/特征文档共用同一份列统计
+    n, m = profile.n_rows, profile.n_cols
     md = f"# 数据质量报告\n\n样本：{n:,} 行 × {m} 列\n\n"
 
     # 1. 缺失 & 重复
-    missing = df.isnull().mean()
+    missing = profile.missing_rate()
     missing = missing[missing > 0]
-    dup = df.duplicated().sum()
+    dup = profile.duplicate_rows
     md += f"缺失字段：{len(missing)}  |  重复行：{dup} ({dup/n:.1%})\n\n"
     if not missing.empty:
         plt.figure(figsize=(5, 2))
@@ -33,15 +37,11 @@ def quality_report(df: pd.DataFrame, out_dir: Path = Path('reports')):
 
 
     # 2. 异常值（IQR 明细导出）
-    num = df.select_dtypes('number')
     outlier = []
-    for col in num.columns:
-        q1, q3 = num[col].quantile([0.25, 0.75])
-        iqr = q3 - q1
-        low, high = q1 - 1.5 * iqr, q3 + 1.5 * iqr
-        out = num[col].between(low, high, inclusive='neither')
-        outlier.append({'字段': col, '异常数': out.sum(), '异常比例': f"{out.sum()/n:.1%}"})
-    outlier = pd.DataFrame(outlier)
+    for col, cnt in profile.outlier_counts.items():
+        # 落在 [Q1-1.5IQR, Q3+1.5IQR] 之外的才算异常
+        outlier.append({'字段': col, '异常数': cnt, '异常比例': f"{cnt/n:.1%}"})
+    outlier = pd.DataFrame(outlier, columns=['字段', '异常数', '异常比例'])
     md += "## 异常值（IQR）\n" + outlier.to_markdown(index=False) + "\n\n"
     outlier.to_csv(csv_path, index=False)
     logging.info(f"[质量报告] 异常明细 -> {csv_path}")
@@ -0,0 +1,378 @@
+"""本地打分服务：asyncio HTTP + 微批（micro-batching）
+
+启动时加载一次持久化的模型（models/churn_model.joblib）及与之一同保存的特征流水线
+（训练时只在训练部分上拟合；旧模型文件没有时退回 models/feature_pipeline.*），
+并发到达的单客户请求在队列里合并成微批：
+攒满 max_batch_size 条或等待超过 max_wait_ms 即出批，整批做特征计算和
+predict_proba，模型调用开销按批分摊。
+
+接口：
+    POST /score    请求体为一条原始 CSV 行（JSON 对象）或其列表
+    GET  /metrics  p50 / p99 延迟、吞吐、批大小等计数
+    GET  /health
+
+用法（项目根目录）：
+    python -m src.serving.scoring_server serve   [--port 8080] [--max-batch-size 64] [--max-wait-ms 2]
+    python -m src.serving.scoring_server loadgen [--port 8080] [--concurrency 32] [--requests 5000]
+"""
+import argparse
+import asyncio
+import json
+import logging
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from src.data_processing.data_cleaner import compute_fill_values
+from src.feature_engineering.online_features import RecordFeaturizer
+from src.modeling.model_io import MODEL_DIR, MODEL_NAME, load_model, save_model
+
+logger = logging.getLogger(__name__)
+
+RAW_CSV = Path('data/WA_Fn-UseC_-Telco-Customer-Churn.csv')
+
+
+def bootstrap_model(featurizer: RecordFeaturizer, csv_path=RAW_CSV, model_dir=MODEL_DIR) -> Path:
+    """尚无训练好的模型时，用原始数据拟合一个逻辑回归基线，便于联调和压测
+
+    缺失值由模型自带的中位数填充处理（与训练阶段的 impute_scale 相同），打分时原样传入
+    """
+    from sklearn.impute import SimpleImputer
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.pipeline import make_pipeline
+    from sklearn.preprocessing import StandardScaler
+
+    raw = pd.read_csv(csv_path)
+    X = featurizer.transform_records(raw.to_dict('records'))
+    y = (raw['Churn'] == 'Yes').astype(int).to_numpy()
+    model = make_pipeline(SimpleImputer(strategy='median'), StandardScaler(),
+                          LogisticRegression(max_iter=1000)).fit(X, y)
+    return save_model(model, featurizer.feature_names_, model_dir, kind='baseline_logreg',
+                      feature_pipeline=featurizer.pipeline)
+
+
+# ---------- 指标 ----------
+class ServerMetrics:
+    """请求延迟环形缓冲 + 累计计数；p50/p99 基于最近 window 条请求
+
+    throughput_rps_10s：最近 10 秒内完成的请求，按其首末完成时刻的实际跨度计算速率
+    """
+
+    def __init__(self, window: int = 10_000):
+        self.started = time.perf_counter()
+        self.latencies_ms = deque(maxlen=window)
+        self.done_at = deque(maxlen=window)
+        self.requests = 0
+        self.batches = 0
+        self.batched_records = 0
+        self.errors = 0
+
+    def observe(self, latency_ms: float):
+        self.requests += 1
+        self.latencies_ms.append(latency_ms)
+        self.done_at.append(time.perf_counter())
+
+    def snapshot(self) -> dict:
+        lat = np.asarray(self.latencies_ms)
+        now = time.perf_counter()
+        recent = [t for t in self.done_at if now - t <= 10.0]
+        span = recent[-1] - recent[0] if len(recent) > 1 else 0.0
+        return {
+            'uptime_s': round(now - self.started, 3),
+            'requests_total': self.requests,
+            'errors_total': self.errors,
+            'batches_total': self.batches,
+            'mean_batch_size': round(self.batched_records / self.batches, 2) if self.batches else 0.0,
+            'latency_p50_ms': round(float(np.percentile(lat, 50)), 3) if len(lat) else None,
+            'latency_p99_ms': round(float(np.percentile(lat, 99)), 3) if len(lat) else None,
+            'throughput_rps_10s': round((len(recent) - 1) / span, 1) if span > 0 else 0.0,
+        }
+
+
+# ---------- 微批打分 ----------
+class MicroBatchScorer:
+    """请求入队，后台协程按 max_batch_size / max_wait_ms 出批并整批打分"""
+
+    def __init__(self, featurizer: RecordFeaturizer, bundle: dict,
+                 max_batch_size: int = 64, max_wait_ms: float = 2.0):
+        self.featurizer = featurizer
+        self.model = bundle['model']
+        names = bundle['feature_names']
+        missing = set(names) - set(featurizer.feature_names_)
+        if missing:
+            raise ValueError(f"模型所需特征不在特征流水线输出中：{sorted(missing)}")
+        pos = {n: i for i, n in enumerate(featurizer.feature_names_)}
+        self._columns = np.array([pos[n] for n in names])
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.metrics = ServerMetrics()
+        self._queue = None
+        self._worker = None
+        # 特征 + 预测放到单独线程，事件循环在算分期间继续收请求
+        self._executor = ThreadPoolExecutor(max_workers=1)
+
+    async def start(self):
+        self._queue = asyncio.Queue()
+        self._worker = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._worker:
+            self._worker.cancel()
+        self._executor.shutdown(wait=False)
+
+    async def score(self, record: dict) -> float:
+        fut = asyncio.get_running_loop().create_future()
+        await self._queue.put((record, fut, time.perf_counter()))
+        return await fut
+
+    def _predict(self, records: list) -> np.ndarray:
+        """缺失值原样交给模型：模型自带的填充（或原生缺失值处理）与训练、交叉验证时一致"""
+        X = self.featurizer.transform_records(records)[:, self._columns]
+        return self.model.predict_proba(X)[:, 1]
+
+    def _predict_each(self, records: list) -> list:
+        """逐条打分：出错的记录返回异常对象，其余返回概率"""
+        probs = []
+        for rec in records:
+            try:
+                probs.append(self._predict([rec])[0])
+            except Exception as err:
+                probs.append(err)
+        return probs
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            self.metrics.batches += 1
+            self.metrics.batched_records += len(batch)
+            records = [rec for rec, _, _ in batch]
+            try:
+                probs = await loop.run_in_executor(self._executor, self._predict, records)
+            except Exception as e:
+                # 整批失败时逐条重试，只让出错的那条请求报错；重试同样放在线程里，不阻塞事件循环
+                logger.warning(f"[服务] 批量打分失败，逐条重试：{e}")
+                probs = await loop.run_in_executor(self._executor, self._predict_each, records)
+            now = time.perf_counter()
+            for (_, fut, t0), p in zip(batch, probs):
+                if fut.done():
+                    continue
+                if isinstance(p, Exception):
+                    self.metrics.errors += 1
+                    fut.set_exception(p)
+                else:
+                    fut.set_result(float(p))
+                    self.metrics.observe((now - t0) * 1000)
+
+
+# ---------- HTTP ----------
+_REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 500: 'Internal Server Error'}
+
+
+async def _read_request(reader: asyncio.StreamReader):
+    """极简 HTTP/1.1 解析：请求行 + 头 + Content-Length 请求体；连接关闭时返回 None"""
+    line = await reader.readline()
+    if not line:
+        return None
+    method, target, _ = line.decode('latin-1').split(' ', 2)
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        key, _, value = line.decode('latin-1').partition(':')
+        headers[key.strip().lower()] = value.strip()
+    length = int(headers.get('content-length', 0))
+    body = await reader.readexactly(length) if length else b''
+    return method, target, headers, body
+
+
+def _response(status: int, payload, keep_alive: bool = True) -> bytes:
+    body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+    head = (f"HTTP/1.1 {status} {_REASONS[status]}\r\n"
+            f"Content-Type: application/json; charset=utf-8\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+    return head.encode('latin-1') + body
+
+
+class ScoringServer:
+    def __init__(self, scorer: MicroBatchScorer, host: str = '127.0.0.1', port: int = 8080):
+        self.scorer = scorer
+        self.host = host
+        self.port = port
+
+    async def _dispatch(self, method: str, target: str, body: bytes):
+        if method == 'GET' and target == '/health':
+            return 200, {'status': 'ok'}
+        if method == 'GET' and target == '/metrics':
+            return 200, self.scorer.metrics.snapshot()
+        if method == 'POST' and target == '/score':
+            try:
+                payload = json.loads(body or b'null')
+            except ValueError as e:
+                return 400, {'error': f"JSON 解析失败：{e}"}
+            records = payload if isinstance(payload, list) else [payload]
+            if not records or not all(isinstance(r, dict) for r in records):
+                return 400, {'error': "请求体应为 JSON 对象或对象列表"}
+            try:
+                probs = await asyncio.gather(*(self.scorer.score(r) for r in records))
+            except ValueError as e:
+                return 400, {'error': str(e)}
+            if isinstance(payload, list):
+                return 200, {'churn_probability': probs}
+            return 200, {'churn_probability': probs[0]}
+        return 404, {'error': f"未知接口：{method} {target}"}
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                request = await _read_request(reader)
+                if request is None:
+                    break
+                method, target, headers, body = request
+                keep_alive = headers.get('connection', '').lower() != 'close'
+                try:
+                    status, payload = await self._dispatch(method, target, body)
+                except Exception as e:
+                    logger.exception("[服务] 处理请求出错")
+                    status, payload = 500, {'error': str(e)}
+                writer.write(_response(status, payload, keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve_forever(self):
+        await self.scorer.start()
+        server = await asyncio.start_server(self._handle, self.host, self.port)
+        logger.info(f"[服务] 监听 http://{self.host}:{self.port}  "
+                    f"max_batch_size={self.scorer.max_batch_size} max_wait_ms={self.scorer.max_wait * 1000:g}")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            await self.scorer.stop()
+
+
+# ---------- 压测 ----------
+async def _client(host, port, records, latencies, errors):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        for rec in records:
+            body = json.dumps(rec).encode('utf-8')
+            t0 = time.perf_counter()
+            writer.write((f"POST /score HTTP/1.1\r\nHost: {host}\r\n"
+                          f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n")
+                         .encode('latin-1') + body)
+            await writer.drain()
+            line = await reader.readline()
+            length = 0
+            while True:
+                h = await reader.readline()
+                if h in (b'\r\n', b''):
+                    break
+                if h.lower().startswith(b'content-length:'):
+                    length = int(h.split(b':')[1])
+            await reader.readexactly(length)
+            latencies.append((time.perf_counter() - t0) * 1000)
+            if b' 200 ' not in line:
+                errors.append(line)
+    finally:
+        writer.close()
+
+
+async def _fetch_json(host, port, target):
+    reader, writer = await asyncio.open_connection(host, port)
+    writer.write(f"GET {target} HTTP/1.1\r\nHost: {host}\r\nConnection: close\r\n\r\n".encode('latin-1'))
+    await writer.drain()
+    raw = await reader.read()
+    writer.close()
+    return json.loads(raw.split(b'\r\n\r\n', 1)[1])
+
+
+async def run_load(host='127.0.0.1', port=8080, concurrency=32, n_requests=5000,
+                   csv_path=RAW_CSV, seed=0) -> dict:
+    """并发 concurrency 个长连接客户端，共发送 n_requests 条单客户请求"""
+    rows = pd.read_csv(csv_path, dtype=str, keep_default_na=False).to_dict('records')
+    rng = np.random.default_rng(seed)
+    sample = [rows[i] for i in rng.integers(len(rows), size=n_requests)]
+    latencies, errors = [], []
+    t0 = time.perf_counter()
+    await asyncio.gather(*(_client(host, port, sample[i::concurrency], latencies, errors)
+                           for i in range(concurrency)))
+    elapsed = time.perf_counter() - t0
+    lat = np.asarray(latencies)
+    return {
+        'requests': len(lat), 'errors': len(errors), 'concurrency': concurrency,
+        'elapsed_s': round(elapsed, 3), 'throughput_rps': round(len(lat) / elapsed, 1),
+        'client_p50_ms': round(float(np.percentile(lat, 50)), 3),
+        'client_p99_ms': round(float(np.percentile(lat, 99)), 3),
+        'server': await _fetch_json(host, port, '/metrics'),
+    }
+
+
+# ---------- 入口 ----------
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="本地微批打分服务 / 压测")
+    sub = parser.add_subparsers(dest='command', required=True)
+    serve = sub.add_parser('serve', help="启动打分服务")
+    serve.add_argument('--model-dir', default=str(MODEL_DIR))
+    serve.add_argument('--max-batch-size', type=int, default=64)
+    serve.add_argument('--max-wait-ms', type=float, default=2.0)
+    serve.add_argument('--bootstrap-model', action='store_true',
+                       help="models/ 下没有模型时先拟合逻辑回归基线")
+    serve.add_argument('--fill-csv', default=None,
+                       help="由该 CSV 计算缺失字段的填充值（中位数 / 众数），不给则缺失字段报 400")
+    load = sub.add_parser('loadgen', help="对运行中的服务压测")
+    load.add_argument('--concurrency', type=int, default=32)
+    load.add_argument('--requests', type=int, default=5000)
+    load.add_argument('--csv', default=str(RAW_CSV))
+    for p in (serve, load):
+        p.add_argument('--host', default='127.0.0.1')
+        p.add_argument('--port', type=int, default=8080)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    args = parse_args(argv)
+    if args.command == 'loadgen':
+        result = asyncio.run(run_load(args.host, args.port, args.concurrency, args.requests, args.csv))
+        print(json.dumps(result, indent=2, ensure_ascii=False))
+        return
+
+    fill_values = compute_fill_values(args.fill_csv) if args.fill_csv else None
+    if args.bootstrap_model and not (Path(args.model_dir) / f'{MODEL_NAME}.joblib').exists():
+        bootstrap_model(RecordFeaturizer.load(args.model_dir, fill_values=fill_values), model_dir=args.model_dir)
+    bundle = load_model(args.model_dir)
+    if bundle.get('feature_pipeline') is not None:
+        featurizer = RecordFeaturizer(bundle['feature_pipeline'], fill_values=fill_values)
+    else:
+        featurizer = RecordFeaturizer.load(args.model_dir, fill_values=fill_values)
+    scorer = MicroBatchScorer(featurizer, bundle,
+                              max_batch_size=args.max_batch_size, max_wait_ms=args.max_wait_ms)
+    try:
+        asyncio.run(ScoringServer(scorer, args.host, args.port).serve_forever())
+    except KeyboardInterrupt:
+        logger.info("[服务] 已停止")
+
+
+if __name__ == '__main__':
+    main()
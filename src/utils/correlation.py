@@ -0,0 +1,163 @@
+"""可合并的皮尔逊相关系数累加器
+
+每个分块只算成对的 样本数 / 均值 / 离差平方和 / 交叉离差积（块内先按列中心化，
+再用矩阵乘法一次得到全部列对），块与块之间按 Chan 公式合并，
+因此既能按块流式累加，也能把多个进程各自的结果 merge 起来。
+缺失值按成对删除处理，与 DataFrame.corr 口径一致。
+
+- 全矩阵模式：p × p，供报告 / 热力图使用，按数据指纹缓存
+- 目标列模式：p × 1，只算各列与目标列的相关，O(p·n)，供 select_correlation 使用
+"""
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+_CACHE = OrderedDict()
+_CACHE_SIZE = 8
+
+
+def numeric_columns(df: pd.DataFrame) -> list:
+    """参与相关计算的列（数值 + 布尔，同 DataFrame.corr(numeric_only=True)）"""
+    return [c for c in df.columns
+            if pd.api.types.is_numeric_dtype(df[c]) and not isinstance(df[c].dtype, pd.CategoricalDtype)]
+
+
+class CorrelationAccumulator:
+    """按块累加成对统计量；targets=None 为全矩阵，否则只算与 targets 的相关"""
+
+    def __init__(self, columns: list, targets: list = None):
+        self.columns = list(columns)
+        self.targets = list(columns) if targets is None else list(targets)
+        self._target_pos = [self.columns.index(t) for t in self.targets]
+        shape = (len(self.columns), len(self.targets))
+        self.n = np.zeros(shape)
+        self.mean_x = np.zeros(shape)   # 列 i 在（i, j 都非缺失）的行上的均值
+        self.mean_y = np.zeros(shape)   # 列 j 在同样行上的均值
+        self.m2_x = np.zeros(shape)
+        self.m2_y = np.zeros(shape)
+        self.c_xy = np.zeros(shape)
+
+    def update(self, chunk) -> 'CorrelationAccumulator':
+        """chunk：DataFrame（按 columns 取列）或同列序的二维数组"""
+        if isinstance(chunk, pd.DataFrame):
+            X = chunk[self.columns].to_numpy(dtype='float64', na_value=np.nan, copy=True)
+        else:
+            X = np.array(chunk, dtype='float64')
+        if not len(X):
+            return self
+        valid = ~np.isnan(X)
+        if valid.all():
+            return self._update_complete(X)
+        vx = valid.astype('float64')
+        with np.errstate(invalid='ignore', divide='ignore'):
+            # 块内按列均值中心化，避免大数值列（如 TotalCharges）的平方和相消
+            center = np.nanmean(np.where(valid.any(axis=0), X, 0.0), axis=0)
+        center = np.nan_to_num(center)
+        Z = np.where(valid, X - center, 0.0)
+        Y, vy = Z[:, self._target_pos], vx[:, self._target_pos]
+
+        n = vx.T @ vy
+        sx = Z.T @ vy
+        sy = vx.T @ Y
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mx = np.where(n > 0, sx / n, 0.0)
+            my = np.where(n > 0, sy / n, 0.0)
+        chunk_stats = (n,
+                       mx + center[:, None],
+                       my + center[self._target_pos][None, :],
+                       (Z * Z).T @ vy - sx * mx,
+                       vx.T @ (Y * Y) - sy * my,
+                       Z.T @ Y - sx * my)
+        return self._combine(*chunk_stats)
+
+    def _update_complete(self, X: np.ndarray) -> 'CorrelationAccumulator':
+        """无缺失的块：所有列对样本数相同，原地中心化后只需一次矩阵乘法"""
+        pos = self._target_pos
+        center = X.mean(axis=0)
+        X -= center
+        n = float(len(X))
+        sx = X.sum(axis=0)
+        sq = np.einsum('ij,ij->j', X, X)
+        mx = sx / n
+        shape = (len(self.columns), len(self.targets))
+        return self._combine(np.full(shape, n),
+                             np.broadcast_to((mx + center)[:, None], shape),
+                             np.broadcast_to((mx + center)[pos][None, :], shape),
+                             np.broadcast_to((sq - sx * mx)[:, None], shape),
+                             np.broadcast_to((sq - sx * mx)[pos][None, :], shape),
+                             X.T @ X[:, pos] - np.outer(sx, mx[pos]))
+
+    def merge(self, other: 'CorrelationAccumulator') -> 'CorrelationAccumulator':
+        if other.columns != self.columns or other.targets != self.targets:
+            raise ValueError("列不一致的相关累加器不能合并")
+        return self._combine(other.n, other.mean_x, other.mean_y, other.m2_x, other.m2_y, other.c_xy)
+
+    def _combine(self, n_b, mx_b, my_b, m2x_b, m2y_b, c_b) -> 'CorrelationAccumulator':
+        n_a = self.n
+        n = n_a + n_b
+        with np.errstate(invalid='ignore', divide='ignore'):
+            w = np.where(n > 0, n_a * n_b / n, 0.0)
+            frac = np.where(n > 0, n_b / n, 0.0)
+        dx = mx_b - self.mean_x
+        dy = my_b - self.mean_y
+        self.mean_x = self.mean_x + dx * frac
+        self.mean_y = self.mean_y + dy * frac
+        self.m2_x = self.m2_x + m2x_b + dx * dx * w
+        self.m2_y = self.m2_y + m2y_b + dy * dy * w
+        self.c_xy = self.c_xy + c_b + dx * dy * w
+        self.n = n
+        return self
+
+    def result(self, min_periods: int = 1) -> pd.DataFrame:
+        with np.errstate(invalid='ignore', divide='ignore'):
+            corr = self.c_xy / np.sqrt(self.m2_x * self.m2_y)
+        corr[(self.n < max(min_periods, 2)) | (self.m2_x <= 0) | (self.m2_y <= 0)] = np.nan
+        corr = np.clip(corr, -1, 1)
+        out = pd.DataFrame(corr, index=self.columns, columns=self.targets)
+        # 对角线（列与自身）只要方差非零即为 1
+        for j, t in enumerate(self.targets):
+            if not np.isnan(corr[self._target_pos[j], j]):
+                out.loc[t, t] = 1.0
+        return out
+
+
+# 分块大小：限制中心化副本等临时数组的内存，结果与不分块一致
+DEFAULT_CHUNKSIZE = 100_000
+
+
+def _chunks(df: pd.DataFrame, chunksize: int = None):
+    chunksize = chunksize or DEFAULT_CHUNKSIZE
+    for start in range(0, len(df), chunksize):
+        yield df.iloc[start:start + chunksize]
+
+
+def correlation_matrix(df: pd.DataFrame, columns: list = None, chunksize: int = None,
+                       key: str = None) -> pd.DataFrame:
+    """全相关矩阵，按（数据指纹, 列）缓存；key 可由调用方传入已算好的指纹"""
+    columns = numeric_columns(df) if columns is None else list(columns)
+    if key is None:
+        from src.reporting.column_profile import frame_fingerprint
+        key = frame_fingerprint(df[columns])
+    cache_key = (key, tuple(columns))
+    if cache_key in _CACHE:
+        _CACHE.move_to_end(cache_key)
+        return _CACHE[cache_key].copy()
+    acc = CorrelationAccumulator(columns)
+    for chunk in _chunks(df, chunksize):
+        acc.update(chunk)
+    corr = acc.result()
+    _CACHE[cache_key] = corr
+    if len(_CACHE) > _CACHE_SIZE:
+        _CACHE.popitem(last=False)
+    return corr.copy()
+
+
+def target_correlation(df: pd.DataFrame, target_col: str, columns: list = None,
+                       chunksize: int = None) -> pd.Series:
+    """各数值列与目标列的相关系数（含目标列自身），O(p·n)"""
+    columns = numeric_columns(df) if columns is None else list(columns)
+    acc = CorrelationAccumulator(columns, targets=[target_col])
+    for chunk in _chunks(df, chunksize):
+        acc.update(chunk)
+    return acc.result()[target_col]
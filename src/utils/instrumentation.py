@@ -0,0 +1,293 @@
+"""阶段 / 子步骤级埋点：耗时、CPU、峰值 RSS、行数与写盘字节，导出 JSON 与 Prometheus textfile
+
+用法：
+    @instrument()                      # 装饰器：自动取首个 DataFrame 参数 / 返回值的行数
+    def handle_missing_values(df, ...): ...
+
+    with instrument('features') as span:   # 上下文管理器：可手动补充行数
+        out = run(df)
+        span.rows_out = len(out)
+
+默认关闭（只多一次标志判断），set_instrumentation(True) 后开始记录：
+- wall / CPU 时间（CPU 为本进程 user+sys，不含子进程）
+- 峰值 RSS：后台线程按 SAMPLE_INTERVAL 采样，记到所有正在进行的埋点上
+- 写盘字节：psutil io_counters 的 write_chars 差值（本进程 write 调用写出的字节，含日志）
+- 嵌套埋点记录完整路径，如 clean/handle_missing_values
+
+profile_stages 中的埋点同时用 cProfile 采样，.prof 写到 profile_dir
+（可用 snakeviz / flameprof 生成火焰图），另附按累计时间排序的文本摘要。
+"""
+import cProfile
+import functools
+import io
+import json
+import logging
+import os
+import pstats
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from src.utils.memory import current_rss_mb, peak_rss_mb
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_INTERVAL = 0.01   # 秒
+METRIC_PREFIX = 'telco_pipeline'
+
+_ENABLED = False
+_PROFILE_STAGES = set()
+_PROFILE_DIR = Path('reports/profiles')
+# 已完成埋点的记录：[{'name', 'path', 'wall_s', 'cpu_s', 'peak_rss_mb', 'rows_in', ...}]
+METRICS = []
+_local = threading.local()
+
+
+def set_instrumentation(enabled: bool = True, profile_stages=(), profile_dir=None):
+    """打开 / 关闭埋点；profile_stages 为需要 cProfile 的埋点名"""
+    global _ENABLED, _PROFILE_STAGES, _PROFILE_DIR
+    _ENABLED = enabled
+    _PROFILE_STAGES = set(profile_stages or ())
+    if profile_dir is not None:
+        _PROFILE_DIR = Path(profile_dir)
+    if not enabled:
+        _SAMPLER.stop()
+
+
+def reset_metrics():
+    METRICS.clear()
+
+
+def _bytes_written() -> int:
+    if psutil is None:
+        return 0
+    try:
+        counters = psutil.Process().io_counters()
+    except (AttributeError, psutil.Error):
+        return 0
+    return getattr(counters, 'write_chars', counters.write_bytes)
+
+
+def row_count(obj):
+    """DataFrame / Series / 数组 / 稀疏特征的行数，无法判断时为 None"""
+    if isinstance(obj, (pd.DataFrame, pd.Series, np.ndarray)):
+        return int(obj.shape[0])
+    shape = getattr(obj, 'shape', None)
+    if isinstance(shape, tuple) and shape:
+        return int(shape[0])
+    if isinstance(obj, tuple) and obj:
+        return row_count(obj[0])
+    return None
+
+
+class _RssSampler:
+    """有埋点进行时运行的后台采样线程，把当前 RSS 推给所有活跃埋点"""
+
+    def __init__(self):
+        self._spans = set()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+
+    def add(self, span):
+        with self._lock:
+            self._spans.add(span)
+            if psutil is not None and self._thread is None:
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._loop, name='rss-sampler', daemon=True)
+                self._thread.start()
+
+    def remove(self, span):
+        with self._lock:
+            self._spans.discard(span)
+
+    def stop(self):
+        self._stop.set()
+
+    def _loop(self):
+        proc = psutil.Process()
+        try:
+            while not self._stop.wait(SAMPLE_INTERVAL):
+                rss = proc.memory_info().rss / 1024 ** 2
+                with self._lock:
+                    if not self._spans:
+                        self._thread = None   # 在锁内让出，add 随后会启动新线程
+                        return
+                    for span in self._spans:
+                        span.peak_rss = max(span.peak_rss, rss)
+        finally:
+            with self._lock:
+                if self._thread is threading.current_thread():
+                    self._thread = None
+
+
+_SAMPLER = _RssSampler()
+
+
+class instrument:
+    """埋点：既可作装饰器 @instrument(name)，也可作上下文管理器 with instrument(name) as span"""
+
+    def __init__(self, name: str = None, rows_in: int = None):
+        self.name = name
+        self.rows_in = rows_in
+        self.rows_out = None
+        self.extra = {}
+
+    # ----- 装饰器 -----
+    def __call__(self, func):
+        name = self.name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _ENABLED:
+                return func(*args, **kwargs)
+            first = next((a for a in list(args) + list(kwargs.values()) if row_count(a) is not None), None)
+            with instrument(name, rows_in=row_count(first)) as span:
+                result = func(*args, **kwargs)
+                span.rows_out = row_count(result)
+                return result
+        return wrapper
+
+    # ----- 上下文管理器 -----
+    def __enter__(self):
+        if not _ENABLED:
+            return self
+        stack = getattr(_local, 'stack', None)
+        if stack is None:
+            stack = _local.stack = []
+        self.path = '/'.join([s.name for s in stack] + [self.name])
+        stack.append(self)
+        self.rss_start = current_rss_mb()
+        self.peak_rss = self.rss_start
+        self.bytes_start = _bytes_written()
+        self.profiler = None
+        if self.name in _PROFILE_STAGES:
+            self.profiler = cProfile.Profile()
+            try:
+                self.profiler.enable()
+            except ValueError:   # 外层已有 profiler 在运行（同一时刻只能有一个）
+                logger.warning(f"[埋点] {self.name}：已有其它 profiler 运行，跳过 cProfile")
+                self.profiler = None
+        _SAMPLER.add(self)
+        self.cpu_start = time.process_time()
+        self.wall_start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if not hasattr(self, 'wall_start'):
+            return False
+        wall = time.perf_counter() - self.wall_start
+        cpu = time.process_time() - self.cpu_start
+        written = _bytes_written() - self.bytes_start
+        if self.profiler is not None:
+            self.profiler.disable()
+            self._dump_profile()
+        _SAMPLER.remove(self)
+        _local.stack.pop()
+        rss_end = current_rss_mb()
+        record = {
+            'name': self.name,
+            'path': self.path,
+            'wall_s': wall,
+            'cpu_s': cpu,
+            'rss_start_mb': self.rss_start,
+            'rss_end_mb': rss_end,
+            'peak_rss_mb': max(self.peak_rss, rss_end),
+            'process_peak_rss_mb': peak_rss_mb(),
+            'rows_in': self.rows_in,
+            'rows_out': self.rows_out,
+            'bytes_written': written,
+            'status': 'error' if exc_type else 'ok',
+            **self.extra,
+        }
+        METRICS.append(record)
+        logger.info(f"[埋点] {record['path']}: {wall:.3f}s（CPU {cpu:.3f}s），"
+                    f"峰值 RSS {record['peak_rss_mb']:.1f} MB，"
+                    f"行 {record['rows_in']} -> {record['rows_out']}，写出 {record['bytes_written']:,} B")
+        return False
+
+    def _dump_profile(self):
+        _PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+        prof_path = _PROFILE_DIR / f"{self.name}.prof"
+        self.profiler.dump_stats(prof_path)
+        buf = io.StringIO()
+        pstats.Stats(self.profiler, stream=buf).sort_stats('cumulative').print_stats(40)
+        (_PROFILE_DIR / f"{self.name}.txt").write_text(buf.getvalue(), encoding='utf-8')
+        self.extra['profile'] = str(prof_path)
+        logger.info(f"[埋点] {self.name} 的 cProfile 已保存 -> {prof_path}")
+
+
+# ---------- 导出 ----------
+def _atomic_write(path: Path, text: str):
+    """先写临时文件再替换：Prometheus textfile collector 不会读到半截文件"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    tmp.write_text(text, encoding='utf-8')
+    os.replace(tmp, path)
+
+
+def export_json(path, records: list = None) -> Path:
+    path = Path(path)
+    records = METRICS if records is None else records
+    _atomic_write(path, json.dumps({
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'pid': os.getpid(),
+        'spans': records,
+    }, indent=2, ensure_ascii=False))
+    return path
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+PROM_METRICS = [
+    ('wall_s', 'wall_seconds', 'gauge', '阶段墙钟耗时（秒）'),
+    ('cpu_s', 'cpu_seconds', 'gauge', '阶段 CPU 耗时（秒，本进程）'),
+    ('peak_rss_mb', 'peak_rss_bytes', 'gauge', '阶段内峰值 RSS（字节）'),
+    ('rows_in', 'rows_in', 'gauge', '输入行数'),
+    ('rows_out', 'rows_out', 'gauge', '输出行数'),
+    ('bytes_written', 'bytes_written', 'gauge', '阶段内写出的字节数'),
+]
+
+
+def export_prometheus(path, records: list = None) -> Path:
+    """node_exporter textfile 格式；同一路径多次出现时取最后一次（与 gauge 语义一致）"""
+    path = Path(path)
+    records = METRICS if records is None else records
+    latest = {r['path']: r for r in records}
+    lines = []
+    for key, metric, kind, help_text in PROM_METRICS:
+        name = f"{METRIC_PREFIX}_{metric}"
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+        for span_path, r in latest.items():
+            value = r.get(key)
+            if value is None:
+                continue
+            if key == 'peak_rss_mb':
+                value = value * 1024 ** 2
+            lines.append(f'{name}{{stage="{_escape(span_path)}",status="{r["status"]}"}} {value:.6g}')
+    name = f"{METRIC_PREFIX}_last_run_timestamp_seconds"
+    lines += [f"# HELP {name} 最近一次导出的时间戳", f"# TYPE {name} gauge", f"{name} {time.time():.3f}"]
+    _atomic_write(path, '\n'.join(lines) + '\n')
+    return path
+
+
+def export_metrics(out_dir, records: list = None) -> dict:
+    """同时导出 metrics.json 与 telco_pipeline.prom"""
+    out_dir = Path(out_dir)
+    paths = {
+        'json': export_json(out_dir / 'metrics.json', records),
+        'prometheus': export_prometheus(out_dir / f'{METRIC_PREFIX}.prom', records),
+    }
+    logger.info(f"[埋点] 指标已导出 -> {paths['json']}, {paths['prometheus']}")
+    return paths
@@ -0,0 +1,95 @@
+"""内存统计工具：按步骤记录峰值 RSS 与新分配字节数（默认关闭，按需开启）"""
+import functools
+import logging
+import time
+import tracemalloc
+
+import pandas as pd
+
+try:
+    import psutil
+except ImportError:  # psutil 可选，缺失时退回标准库 resource（仅类 Unix）
+    psutil = None
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+_TRACKING = False
+# 每个被统计步骤的记录，便于前后对比：[{'step', 'allocated_mb', 'peak_mb', ...}]
+MEMORY_LOG = []
+
+
+def set_memory_tracking(enabled: bool = True):
+    """打开/关闭逐步骤内存统计（tracemalloc 有开销，只在排查内存时开启）"""
+    global _TRACKING
+    _TRACKING = enabled
+    if enabled and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    elif not enabled and tracemalloc.is_tracing():
+        tracemalloc.stop()
+
+
+def copy_on_write_enabled() -> bool:
+    """pandas 是否处于 Copy-on-Write 模式（pandas>=3 恒为 True）"""
+    if int(pd.__version__.split('.')[0]) >= 3:
+        return True
+    return pd.options.mode.copy_on_write is True
+
+
+def current_rss_mb() -> float:
+    """当前进程常驻内存（MB）"""
+    if psutil is not None:
+        return psutil.Process().memory_info().rss / 1024 ** 2
+    return peak_rss_mb()
+
+
+def peak_rss_mb() -> float:
+    """进程生命周期内的峰值常驻内存（MB）"""
+    if resource is not None:
+        # Linux 下 ru_maxrss 单位为 KB
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    if psutil is not None:
+        info = psutil.Process().memory_info()
+        return getattr(info, 'peak_wset', info.rss) / 1024 ** 2
+    return float('nan')
+
+
+def track_memory(func):
+    """装饰器：开启统计时记录该步骤的分配字节、步骤内峰值与 RSS 变化"""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if not _TRACKING:
+            return func(*args, **kwargs)
+
+        started_here = not tracemalloc.is_tracing()
+        if started_here:
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+        base, _ = tracemalloc.get_traced_memory()
+        rss_before = current_rss_mb()
+        t0 = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            current, peak = tracemalloc.get_traced_memory()
+            record = {
+                'step': func.__name__,
+                'allocated_mb': (current - base) / 1024 ** 2,
+                'peak_mb': (peak - base) / 1024 ** 2,
+                'rss_before_mb': rss_before,
+                'rss_after_mb': current_rss_mb(),
+                'peak_rss_mb': peak_rss_mb(),
+                'seconds': time.perf_counter() - t0,
+            }
+            MEMORY_LOG.append(record)
+            logging.info(
+                f"[内存] {record['step']}: 净分配 {record['allocated_mb']:.1f} MB，"
+                f"步骤峰值 {record['peak_mb']:.1f} MB，"
+                f"RSS {record['rss_before_mb']:.1f} -> {record['rss_after_mb']:.1f} MB，"
+                f"进程峰值 RSS {record['peak_rss_mb']:.1f} MB"
+            )
+            if started_here:
+                tracemalloc.stop()
+    return wrapper
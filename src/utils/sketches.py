@@ -0,0 +1,224 @@
+"""可合并的流式概要（sketch）：分位数 / 基数 / 高频项
+
+- KLLSketch：分位数，秩误差约 1.7/k
+- HyperLogLog：不同值个数，相对误差约 1.04/sqrt(2^p)
+- SpaceSaving：Top-k 高频项，计数误差 ≤ 总数/capacity
+
+三者都支持按块 update、跨进程 merge、to_dict/from_dict 落盘。
+分块 / 分区清洗的近似填充值（data_cleaner.FillStats，approx_error）用 KLL 求中位数、SpaceSaving 求众数。
+"""
+import math
+
+import numpy as np
+import pandas as pd
+
+
+def _to_python(value):
+    """numpy 标量转 Python 原生类型，便于 JSON 序列化"""
+    return value.item() if isinstance(value, np.generic) else value
+
+
+# ---------- 分位数：KLL ----------
+class KLLSketch:
+    """KLL 分位数概要：第 h 层元素权重 2^h，层满时排序后隔一取一上推"""
+
+    def __init__(self, k: int = 200, seed: int = 0):
+        self.k = k
+        self.n = 0
+        self.levels = [np.empty(0)]
+        self._rng = np.random.default_rng(seed)
+
+    @classmethod
+    def from_error(cls, eps: float, seed: int = 0) -> 'KLLSketch':
+        """按目标秩误差 eps 选择 k"""
+        return cls(k=max(8, math.ceil(1.7 / eps)), seed=seed)
+
+    def _capacity(self, level: int) -> int:
+        depth = len(self.levels) - level - 1
+        return max(2, math.ceil(self.k * (2 / 3) ** depth))
+
+    def update(self, values) -> 'KLLSketch':
+        values = np.asarray(values, dtype='float64').ravel()
+        values = values[~np.isnan(values)]
+        if len(values):
+            self.n += len(values)
+            self.levels[0] = np.concatenate([self.levels[0], values])
+            self._compress()
+        return self
+
+    def _compress(self):
+        level = 0
+        while level < len(self.levels):
+            items = self.levels[level]
+            if len(items) > self._capacity(level):
+                if level + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                items = np.sort(items)
+                # 奇数个时留下一个不参与压缩，保证总权重不变
+                keep, items = (items[:1], items[1:]) if len(items) % 2 else (items[:0], items)
+                offset = self._rng.integers(2)
+                self.levels[level + 1] = np.concatenate([self.levels[level + 1], items[offset::2]])
+                self.levels[level] = keep
+            level += 1
+
+    def merge(self, other: 'KLLSketch') -> 'KLLSketch':
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for h, items in enumerate(other.levels):
+            self.levels[h] = np.concatenate([self.levels[h], items])
+        self.n += other.n
+        self._compress()
+        return self
+
+    def quantile(self, q):
+        """分位数（q 可为标量或数组），与 np.quantile(method='inverted_cdf') 口径一致"""
+        if self.n == 0:
+            return np.full(np.shape(q), np.nan) if np.ndim(q) else np.nan
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(x), 2 ** h, dtype='float64')
+                                  for h, x in enumerate(self.levels)])
+        order = np.argsort(items, kind='stable')
+        items, cum = items[order], np.cumsum(weights[order])
+        pos = np.searchsorted(cum, np.asarray(q) * cum[-1], side='left')
+        return items[np.clip(pos, 0, len(items) - 1)]
+
+    def to_dict(self) -> dict:
+        return {'type': 'kll', 'k': self.k, 'n': self.n,
+                'levels': [x.tolist() for x in self.levels]}
+
+    @classmethod
+    def from_dict(cls, d: dict) -> 'KLLSketch':
+        sk = cls(k=d['k'])
+        sk.n = d['n']
+        sk.levels = [np.asarray(x, dtype='float64') for x in d['levels']]
+        return sk
+
+
+# ---------- 基数：HyperLogLog ----------
+def _bit_length(x: np.ndarray) -> np.ndarray:
+    """uint64 数组逐元素 bit_length（纯整数运算，无浮点舍入问题）"""
+    x = x.copy()
+    n = np.zeros(len(x), dtype='int64')
+    for s in (32, 16, 8, 4, 2, 1):
+        m = (x >> np.uint64(s)) != 0
+        n += m * s
+        x = np.where(m, x >> np.uint64(s), x)
+    return n + x.astype('int64')
+
+
+class HyperLogLog:
+    """HyperLogLog 基数估计，寄存器逐元素取 max 即可合并"""
+
+    def __init__(self, p: int = 14):
+        if not 4 <= p <= 18:
+            raise ValueError("p 需在 [4, 18] 之间")
+        self.p = p
+        self.registers = np.zeros(1 << p, dtype='uint8')
+
+    @classmethod
+    def from_error(cls, eps: float) -> 'HyperLogLog':
+        """按目标相对误差 eps 选择精度 p"""
+        return cls(p=min(18, max(4, math.ceil(2 * math.log2(1.04 / eps)))))
+
+    def update(self, values) -> 'HyperLogLog':
+        values = pd.Series(values).dropna()
+        if values.empty:
+            return self
+        h = pd.util.hash_array(values.to_numpy())
+        shift = np.uint64(64 - self.p)
+        idx = (h >> shift).astype('int64')
+        rest = h & np.uint64((1 << (64 - self.p)) - 1)
+        rho = (64 - self.p) - _bit_length(rest) + 1
+        np.maximum.at(self.registers, idx, rho.astype('uint8'))
+        return self
+
+    def merge(self, other: 'HyperLogLog') -> 'HyperLogLog':
+        if other.p != self.p:
+            raise ValueError("精度 p 不同的 HyperLogLog 不能合并")
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    def count(self) -> float:
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        est = alpha * m * m / np.sum(2.0 ** -self.registers.astype('float64'))
+        zeros = int((self.registers == 0).sum())
+        if est <= 2.5 * m and zeros:
+            est = m * math.log(m / zeros)  # 小基数用线性计数修正
+        return float(est)
+
+    def to_dict(self) -> dict:
+        return {'type': 'hll', 'p': self.p, 'registers': self.registers.tolist()}
+
+    @classmethod
+    def from_dict(cls, d: dict) -> 'HyperLogLog':
+        sk = cls(p=d['p'])
+        sk.registers = np.asarray(d['registers'], dtype='uint8')
+        return sk
+
+
+# ---------- 高频项：SpaceSaving ----------
+class SpaceSaving:
+    """可合并的 SpaceSaving：最多保留 capacity 个候选项
+
+    counts 为计数上界，errors 为可能的高估量；floor 为未被保留项计数的上界
+    """
+
+    def __init__(self, capacity: int = 100):
+        self.capacity = capacity
+        self.counts = {}
+        self.errors = {}
+        self.floor = 0
+
+    @classmethod
+    def from_error(cls, eps: float) -> 'SpaceSaving':
+        """计数误差 ≤ eps × 总数"""
+        return cls(capacity=math.ceil(1 / eps))
+
+    def update(self, values) -> 'SpaceSaving':
+        vc = pd.Series(values).value_counts()
+        vc = vc[vc > 0]
+        chunk = SpaceSaving(self.capacity)
+        chunk.counts = {_to_python(k): int(v) for k, v in vc.head(self.capacity).items()}
+        chunk.errors = dict.fromkeys(chunk.counts, 0)
+        chunk.floor = int(vc.iloc[self.capacity]) if len(vc) > self.capacity else 0
+        return self.merge(chunk)
+
+    def merge(self, other: 'SpaceSaving') -> 'SpaceSaving':
+        keys = set(self.counts) | set(other.counts)
+        counts = {k: self.counts.get(k, self.floor) + other.counts.get(k, other.floor) for k in keys}
+        errors = {k: self.errors.get(k, self.floor) + other.errors.get(k, other.floor) for k in keys}
+        floor = self.floor + other.floor
+        if len(counts) > self.capacity:
+            ranked = sorted(counts, key=counts.get, reverse=True)
+            floor = max(floor, counts[ranked[self.capacity]])
+            keys = ranked[:self.capacity]
+            counts = {k: counts[k] for k in keys}
+            errors = {k: errors[k] for k in keys}
+        self.counts, self.errors, self.floor = counts, errors, floor
+        return self
+
+    def top(self, n: int = 5) -> pd.Series:
+        """计数最高的 n 项（同计数按取值排序，结果稳定）"""
+        ranked = sorted(self.counts.items(), key=lambda kv: (-kv[1], str(kv[0])))[:n]
+        return pd.Series(dict(ranked), dtype='int64')
+
+    def to_dict(self) -> dict:
+        return {'type': 'spacesaving', 'capacity': self.capacity, 'floor': self.floor,
+                'items': [[k, self.counts[k], self.errors[k]] for k in self.counts]}
+
+    @classmethod
+    def from_dict(cls, d: dict) -> 'SpaceSaving':
+        sk = cls(capacity=d['capacity'])
+        sk.floor = d['floor']
+        for k, c, e in d['items']:
+            sk.counts[k], sk.errors[k] = c, e
+        return sk
+
+
+_TYPES = {'kll': KLLSketch, 'hll': HyperLogLog, 'spacesaving': SpaceSaving}
+
+
+def sketch_from_dict(d: dict):
+    return _TYPES[d['type']].from_dict(d)
+
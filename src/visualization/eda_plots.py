@@ -5,6 +5,8 @@ import seaborn as sns
 import pandas as pd
 import numpy as np
 from pathlib import Path
+from src.utils.correlation import correlation_matrix
+from src.utils.instrumentation import instrument
 
 # 全局样式，一次设定
 plt.style.use('seaborn-v0_8')
@@ -19,7 +21,114 @@ def _save(fig_path: str, plot_name: str):
     logging.info(f"[EDA] 已保存图表: {plot_name} -> {fig_path}")
 
 
+# 大数据量渲染：先用 NumPy 向量化分箱聚合再画，耗时只与箱数有关，与行数无关 --------
+AGGREGATE_MIN_ROWS = 50_000  # aggregate=None 时，超过该行数自动走聚合渲染
+
+
+def _use_aggregate(df: pd.DataFrame, aggregate) -> bool:
+    return len(df) >= AGGREGATE_MIN_ROWS if aggregate is None else aggregate
+
+
+def hist_counts(values, bins: int = 50, range_=None):
+    """固定箱数直方图：返回 (counts, edges)，自动忽略 NaN/inf"""
+    values = np.asarray(values, dtype='float64')
+    values = values[np.isfinite(values)]
+    return np.histogram(values, bins=bins, range=range_)
+
+
+def kde_from_counts(counts, edges, grid_size: int = 256):
+    """由分箱计数在网格上估计高斯 KDE（Scott 带宽，与 seaborn 默认一致）
+
+    以箱中心为加权样本点，计算量为 箱数 × 网格点数
+    Returns: (grid, density)
+    """
+    centers = (edges[:-1] + edges[1:]) / 2
+    n = counts.sum()
+    grid = np.linspace(edges[0], edges[-1], grid_size)
+    if n < 2:
+        return grid, np.zeros_like(grid)
+    mean = (counts * centers).sum() / n
+    std = np.sqrt((counts * (centers - mean) ** 2).sum() / (n - 1))
+    bw = std * n ** (-1 / 5) if std > 0 else (edges[1] - edges[0])
+    z = (grid[:, None] - centers[None, :]) / bw
+    density = (np.exp(-0.5 * z ** 2) * counts).sum(axis=1) / (n * bw * np.sqrt(2 * np.pi))
+    return grid, density
+
+
+def density_raster(x, y, bins: int = 200, range_=None):
+    """二维密度栅格：返回 (H, xedges, yedges)，H[i, j] 为落在第 i 个 x 箱、第 j 个 y 箱的行数"""
+    x = np.asarray(x, dtype='float64')
+    y = np.asarray(y, dtype='float64')
+    ok = np.isfinite(x) & np.isfinite(y)
+    return np.histogram2d(x[ok], y[ok], bins=bins, range=range_)
+
+
+def aggregated_histplot(ax, values, bins: int = 50, kde: bool = True, color=None):
+    """替代 sns.histplot(kde=True)：固定箱直方图 + 由计数得到的 KDE 曲线"""
+    counts, edges = hist_counts(values, bins)
+    color = color or sns.color_palette()[0]
+    ax.stairs(counts, edges, fill=True, alpha=0.6, color=color)
+    if kde and counts.sum() > 1:
+        grid, density = kde_from_counts(counts, edges)
+        # 换算到计数刻度，与直方图对齐
+        ax.plot(grid, density * counts.sum() * (edges[1] - edges[0]), color=color)
+    ax.set_ylabel('Count')
+
+
+def aggregated_scatter(ax, x, y, hue=None, palette=None, bins: int = 200):
+    """替代逐行散点：每个 hue 取值画一层对数色阶的二维密度栅格"""
+    from matplotlib.colors import LinearSegmentedColormap, LogNorm
+    from matplotlib.patches import Patch
+
+    x = np.asarray(x, dtype='float64')
+    y = np.asarray(y, dtype='float64')
+    ok = np.isfinite(x) & np.isfinite(y)
+    range_ = [[x[ok].min(), x[ok].max()], [y[ok].min(), y[ok].max()]] if ok.any() else None
+
+    groups = [(None, np.ones(len(x), dtype=bool))] if hue is None else [
+        (level, np.asarray(hue == level)) for level in pd.unique(hue)]
+    palette = palette or sns.color_palette(n_colors=len(groups))
+    handles = []
+    for (level, mask), color in zip(groups, palette):
+        H, xedges, yedges = density_raster(x[mask], y[mask], bins, range_)
+        if H.max() == 0:
+            continue
+        cmap = LinearSegmentedColormap.from_list(str(level), ['white', color])
+        ax.pcolormesh(xedges, yedges, np.ma.masked_equal(H.T, 0), cmap=cmap,
+                      norm=LogNorm(vmin=1, vmax=H.max()), alpha=0.7, shading='flat')
+        handles.append(Patch(color=color, label=str(level)))
+    if hue is not None:
+        ax.legend(handles=handles, title=getattr(hue, 'name', None))
+
+
+def aggregated_jointplot(x, y, bins: int = 100, height: float = 4):
+    """替代 sns.jointplot(kind='scatter')：中间为密度栅格，两侧为固定箱直方图"""
+    from matplotlib.colors import LogNorm
+
+    fig = plt.figure(figsize=(height, height))
+    gs = fig.add_gridspec(2, 2, width_ratios=(5, 1), height_ratios=(1, 5),
+                          wspace=0.05, hspace=0.05)
+    ax = fig.add_subplot(gs[1, 0])
+    ax_x = fig.add_subplot(gs[0, 0], sharex=ax)
+    ax_y = fig.add_subplot(gs[1, 1], sharey=ax)
+
+    H, xedges, yedges = density_raster(x, y, bins)
+    ax.pcolormesh(xedges, yedges, np.ma.masked_equal(H.T, 0), cmap='Blues',
+                  norm=LogNorm(vmin=1, vmax=max(H.max(), 1)), shading='flat')
+    ax.set_xlabel(getattr(x, 'name', None))
+    ax.set_ylabel(getattr(y, 'name', None))
+
+    cx, ex = hist_counts(x, bins)
+    ax_x.stairs(cx, ex, fill=True, alpha=0.6)
+    cy, ey = hist_counts(y, bins)
+    ax_y.stairs(cy, ey, fill=True, alpha=0.6, orientation='horizontal')
+    ax_x.axis('off')
+    ax_y.axis('off')
+    return fig
+
+
 # 1. 目标变量分布 -------------------------------------------------------------
+@instrument()
 def plot_target_distribution(df: pd.DataFrame, save_path: str = None):
     """目标变量 Churn 的饼图+柱状图"""
     if 'Churn' not in df.columns:
@@ -47,8 +156,9 @@ def plot_target_distribution(df: pd.DataFrame, save_path: str = None):
 
 
 # 2. 数值变量分布 -------------------------------------------------------------
-def plot_numerical_distributions(df: pd.DataFrame, save_path: str = None):
-    """前 4 个数值字段的直方图+密度曲线"""
+@instrument()
+def plot_numerical_distributions(df: pd.DataFrame, save_path: str = None, aggregate: bool = None):
+    """前 4 个数值字段的直方图+密度曲线（aggregate：先分箱聚合再画，None 按行数自动选择）"""
     nums = df.select_dtypes(include=np.number).columns[:4]
     if nums.empty:
         logging.warning("[EDA] 无数值列，跳过数值分布图")
@@ -60,8 +170,13 @@ def plot_numerical_distributions(df: pd.DataFrame, save_path: str = None):
     fig, axes = plt.subplots(rows, cols, figsize=(15, 5 * rows))
     axes = axes.flatten() if n > 1 else [axes]
 
+    agg = _use_aggregate(df, aggregate)
     for i, col in enumerate(nums):
-        sns.histplot(data=df, x=col, kde=True, ax=axes[i])
+        if agg:
+            aggregated_histplot(axes[i], df[col].to_numpy())
+            axes[i].set_xlabel(col)
+        else:
+            sns.histplot(data=df, x=col, kde=True, ax=axes[i])
         axes[i].set_title(f'{col} 分布')
 
     # 隐藏多余子图
@@ -74,6 +189,7 @@ def plot_numerical_distributions(df: pd.DataFrame, save_path: str = None):
 
 
 # 3. 分类变量分布 -------------------------------------------------------------
+@instrument()
 def plot_categorical_distributions(df: pd.DataFrame, save_path: str = None):
     """前 6 个分类字段的条形图（取出现次数前 8 的类别）"""
     cats = [c for c in df.columns if df[c].dtype.name == 'category'
@@ -104,6 +220,7 @@ def plot_categorical_distributions(df: pd.DataFrame, save_path: str = None):
 
 
 # 4. 相关性热力图 -------------------------------------------------------------
+@instrument()
 def plot_correlation_heatmap(df: pd.DataFrame, save_path: str = None):
     """数值字段皮尔逊相关系数热力图"""
     nums = df.select_dtypes(include=np.number)
@@ -112,7 +229,8 @@ def plot_correlation_heatmap(df: pd.DataFrame, save_path: str = None):
         return
 
     plt.figure(figsize=(10, 8))
-    corr = nums.corr()
+    # 与数值报告共用相关矩阵缓存（同一份数据只算一次）
+    corr = correlation_matrix(df, columns=list(nums.columns))
     mask = np.triu(np.ones_like(corr, dtype=bool))
     sns.heatmap(corr, mask=mask, annot=True, fmt='.2f',
                 cmap='coolwarm', square=True, linewidths=.5,
@@ -123,6 +241,7 @@ def plot_correlation_heatmap(df: pd.DataFrame, save_path: str = None):
 
 
 # 5. 按特征统计流失率 ---------------------------------------------------------
+@instrument()
 def plot_churn_rates_by_features(df: pd.DataFrame, save_path: str = None):
     """看 Contract / InternetService / PaymentMethod 的流失率"""
     feats = ['Contract', 'InternetService', 'PaymentMethod']
@@ -149,6 +268,7 @@ def plot_churn_rates_by_features(df: pd.DataFrame, save_path: str = None):
 
 
 # 6. 在网时长 vs 流失 ---------------------------------------------------------
+@instrument()
 def plot_tenure_vs_churn(df: pd.DataFrame, save_path: str = None):
     """Tenure 按流失分组箱线图"""
     if 'tenure' not in df.columns or 'Churn' not in df.columns:
@@ -164,23 +284,32 @@ def plot_tenure_vs_churn(df: pd.DataFrame, save_path: str = None):
 
 
 # 7. 费用 vs 流失 -------------------------------------------------------------
-def plot_charges_vs_churn(df: pd.DataFrame, save_path: str = None):
-    """MonthlyCharges  vs  TotalCharges 散点图，按流失着色"""
+@instrument()
+def plot_charges_vs_churn(df: pd.DataFrame, save_path: str = None, aggregate: bool = None):
+    """MonthlyCharges  vs  TotalCharges 散点图，按流失着色（aggregate：改画二维密度栅格）"""
     needed = {'MonthlyCharges', 'TotalCharges', 'Churn'}
     if not needed.issubset(df.columns):
         logging.warning("[EDA] 缺少费用字段，跳过费用散点图")
         return
 
     plt.figure(figsize=(7, 5))
-    sns.scatterplot(data=df, x='MonthlyCharges', y='TotalCharges',
-                    hue='Churn', alpha=0.7,
-                    palette=['#2ecc71', '#e74c3c'])
+    if _use_aggregate(df, aggregate):
+        ax = plt.gca()
+        aggregated_scatter(ax, df['MonthlyCharges'], df['TotalCharges'], hue=df['Churn'],
+                           palette=['#2ecc71', '#e74c3c'])
+        ax.set_xlabel('MonthlyCharges')
+        ax.set_ylabel('TotalCharges')
+    else:
+        sns.scatterplot(data=df, x='MonthlyCharges', y='TotalCharges',
+                        hue='Churn', alpha=0.7,
+                        palette=['#2ecc71', '#e74c3c'])
     plt.title('月费 vs 总费用（按流失着色）')
     if save_path:
         _save(save_path, "费用散点图")
 
 
 # 8. 服务开通情况 -------------------------------------------------------------
+@instrument()
 def plot_services_usage(df: pd.DataFrame, save_path: str = None):
     """电话/网络/附加服务开通比例条形图"""
     services = ['PhoneService', 'InternetService', 'StreamingTV']
@@ -219,8 +348,8 @@ class EDAPlots:
     def plot_target_distribution(self, df, save_path=None):
         plot_target_distribution(df, save_path)
 
-    def plot_numerical_distributions(self, df, save_path=None):
-        plot_numerical_distributions(df, save_path)
+    def plot_numerical_distributions(self, df, save_path=None, aggregate=None):
+        plot_numerical_distributions(df, save_path, aggregate)
 
     def plot_categorical_distributions(self, df, save_path=None):
         plot_categorical_distributions(df, save_path)
@@ -234,8 +363,8 @@ class EDAPlots:
     def plot_tenure_vs_churn(self, df, save_path=None):
         plot_tenure_vs_churn(df, save_path)
 
-    def plot_charges_vs_churn(self, df, save_path=None):
-        plot_charges_vs_churn(df, save_path)
+    def plot_charges_vs_churn(self, df, save_path=None, aggregate=None):
+        plot_charges_vs_churn(df, save_path, aggregate)
 
     def plot_services_usage(self, df, save_path=None):
         plot_services_usage(df, save_path)
\ No newline at end of file
@@ -0,0 +1,37 @@
+"""共享夹具：由原始 CSV 拟合画像，生成小规模合成数据（含空白 TotalCharges、重复行与注入缺失）"""
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.data_processing.data_cleaner import clean_data
+from src.data_processing.synthetic import RAW_CSV, fit_profile, generate_frame
+
+ROOT = Path(__file__).resolve().parents[1]
+N_ROWS = 3000
+# 注入缺失的列：覆盖数值列中位数 / 字符串列众数填充
+MISSING_COLS = ['tenure', 'MonthlyCharges', 'PaymentMethod', 'gender']
+
+
+@pytest.fixture(scope='session')
+def raw_csv(tmp_path_factory) -> Path:
+    """合成原始 CSV（与真实文件同 schema），经 CSV 往返后各路径读到的类型一致"""
+    profile = fit_profile(pd.read_csv(ROOT / RAW_CSV))
+    df = generate_frame(N_ROWS, profile, seed=7, chunksize=1000, blank_rate=0.01, duplicate_rate=0.01)
+    rng = np.random.default_rng(0)
+    for col in MISSING_COLS:
+        df.loc[rng.random(len(df)) < 0.01, col] = np.nan
+    path = tmp_path_factory.mktemp('synthetic') / 'telco.csv'
+    df.to_csv(path, index=False)
+    return path
+
+
+@pytest.fixture
+def raw(raw_csv) -> pd.DataFrame:
+    return pd.read_csv(raw_csv)
+
+
+@pytest.fixture(scope='session')
+def cleaned(raw_csv) -> pd.DataFrame:
+    return clean_data(pd.read_csv(raw_csv))
@@ -0,0 +1,24 @@
+import pandas as pd
+
+from src.data_processing.data_cleaner import clean_data, clean_data_chunked
+
+
+def test_chunked_clean_matches_in_memory(raw_csv, tmp_path):
+    out = tmp_path / 'cleaned.csv'
+    stats = clean_data_chunked(raw_csv, out, chunksize=700)
+    expected = clean_data(pd.read_csv(raw_csv))
+    expected.to_csv(tmp_path / 'expected.csv', index=False)
+    assert stats['rows_out'] == len(expected)
+    assert stats['duplicates'] > 0
+    # 两条路径都经 CSV 写出，按同样的方式读回比较
+    pd.testing.assert_frame_equal(pd.read_csv(out), pd.read_csv(tmp_path / 'expected.csv'))
+
+
+def test_chunked_clean_approximate_fill_close(raw_csv, tmp_path):
+    exact = tmp_path / 'exact.csv'
+    approx = tmp_path / 'approx.csv'
+    clean_data_chunked(raw_csv, exact, chunksize=700)
+    clean_data_chunked(raw_csv, approx, chunksize=700, approx_error=0.01)
+    a, b = pd.read_csv(exact), pd.read_csv(approx)
+    assert a.shape == b.shape
+    pd.testing.assert_frame_equal(a.select_dtypes('number'), b.select_dtypes('number'), rtol=0.05)
@@ -0,0 +1,48 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.data_processing.data_cleaner import compute_fill_values
+from src.feature_engineering.online_features import RecordFeaturizer
+from src.feature_engineering.pipeline import FeaturePipeline
+
+
+def fit(cleaned, **params) -> tuple:
+    pipeline = FeaturePipeline(corr_threshold=0.05, chunksize=500, **params)
+    return pipeline, pipeline.fit_transform(cleaned)
+
+
+def test_pca_skips_all_nan_inputs(cleaned):
+    pipeline, out = fit(cleaned)
+    assert cleaned.filter(like='Service').select_dtypes('number').empty   # num_services 全为缺失
+    assert 'num_services' not in pipeline.pca_cols_
+    assert pipeline.pca_components_ is not None
+    assert out.filter(like='pca_').notna().all().all()
+
+
+def test_incremental_pca_matches_exact(cleaned):
+    exact, _ = fit(cleaned, pca_mode='exact')
+    incremental, _ = fit(cleaned, pca_mode='incremental')
+    assert incremental.pca_cols_ == exact.pca_cols_
+    np.testing.assert_allclose(incremental.explained_variance_ratio_, exact.explained_variance_ratio_,
+                               rtol=1e-4)
+    # 主成分只差符号
+    signs = np.sign(np.sum(incremental.pca_components_ * exact.pca_components_, axis=1))
+    np.testing.assert_allclose(incremental.pca_components_ * signs[:, None], exact.pca_components_,
+                               atol=1e-3)
+
+
+@pytest.mark.parametrize('params', [{}, {'cluster_mode': 'minibatch', 'pca_mode': 'incremental'}])
+def test_record_featurizer_matches_transform(raw_csv, cleaned, params):
+    pipeline, _ = fit(cleaned, **params)
+    featurizer = RecordFeaturizer(pipeline, fill_values=compute_fill_values(raw_csv))
+    assert any(name.startswith('pca_') for name in featurizer.feature_names_)
+
+    # 清洗保留原索引：同一行的原始记录（字符串，与线上请求一致）对应清洗后的行
+    raw = pd.read_csv(raw_csv, dtype=str, keep_default_na=False).loc[cleaned.index]
+    records = raw.to_dict('records')
+    expected = pipeline.transform(cleaned)[featurizer.feature_names_].to_numpy(dtype='float64')
+
+    np.testing.assert_array_equal(featurizer.transform_records(records), expected)
+    for i in range(0, len(records), 97):
+        np.testing.assert_array_equal(featurizer.transform_record(records[i]), expected[i])
@@ -0,0 +1,24 @@
+import pandas as pd
+import pytest
+
+from src.feature_engineering.pipeline import FeaturePipeline
+from src.pipeline import partitioned
+
+
+@pytest.mark.parametrize('partition_by', partitioned.PARTITION_BY)
+def test_partitioned_matches_serial(raw, partition_by):
+    result = partitioned.check_parity(raw, workers=2, partitions=3, partition_by=partition_by)
+    assert result['cleaned'] == []
+    assert result['features'] == []
+
+
+def test_partitioned_streaming_features_match_serial(cleaned):
+    """minibatch + incremental：分区逐块流式拟合，块边界与串行不同，PCA 投影只近似一致（量级 1e-4）"""
+    params = {'corr_threshold': 0.05, 'cluster_mode': 'minibatch', 'pca_mode': 'incremental',
+              'chunksize': 500}
+    serial = FeaturePipeline(**params)
+    expected = serial.fit_transform(cleaned)
+    pipeline = FeaturePipeline(**params)
+    actual = partitioned.fit_transform_features(cleaned, pipeline, workers=2, partitions=3)
+    assert pipeline.selected_columns_ == serial.selected_columns_
+    pd.testing.assert_frame_equal(actual, expected, rtol=1e-5, atol=1e-3)
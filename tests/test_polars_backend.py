@@ -0,0 +1,17 @@
+import pandas as pd
+import pytest
+
+pytest.importorskip('polars')
+
+from src.data_processing import data_cleaner, polars_backend  # noqa: E402
+
+
+def test_polars_matches_pandas(raw):
+    result = polars_backend.check_parity(raw)
+    assert result == {'cleaned': [], 'basic': []}
+
+
+def test_polars_csv_scan_matches_pandas(raw_csv):
+    """main.py 的 polars 路径直接扫描 CSV，不经过 pandas 读入"""
+    expected = data_cleaner.clean_data(pd.read_csv(raw_csv))
+    assert polars_backend._compare(expected, polars_backend.clean_data(raw_csv)) == []
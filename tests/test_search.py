@@ -0,0 +1,42 @@
+import pytest
+
+from src.modeling import search
+
+
+def config(tmp_path, **features) -> dict:
+    return {
+        'random_seed': 0,
+        'features': {'chunksize': 500, **features},
+        'modeling': {'search': {
+            'method': 'successive_halving', 'n_candidates': 3, 'eta': 3, 'min_rows': 300,
+            'cv_folds': 3, 'n_jobs': 1,
+            'param_space': {'learning_rate': {'low': 0.05, 'high': 0.3, 'log': True},
+                            'max_iter': [30]},
+            'checkpoint': str(tmp_path / 'checkpoint.jsonl'),
+            'result': str(tmp_path / 'result.json'),
+        }},
+    }
+
+
+def test_search_resumes_from_interrupted_checkpoint(cleaned, tmp_path):
+    cfg = config(tmp_path)
+    full = search.run_search(cleaned, cfg)
+    assert full['trials_run'] == full['trials_total'] > 2
+
+    # 模拟中断：只留头 + 两次试验 + 半行
+    path = tmp_path / 'checkpoint.jsonl'
+    lines = path.read_text(encoding='utf-8').splitlines(keepends=True)
+    path.write_text(''.join(lines[:3]) + lines[3][:20], encoding='utf-8')
+
+    resumed = search.run_search(cleaned, cfg)
+    assert resumed['trials_resumed'] == 2
+    assert resumed['trials_run'] == full['trials_total'] - 2
+    assert resumed['best']['candidate'] == full['best']['candidate']
+    assert resumed['best']['score'] == pytest.approx(full['best']['score'])
+
+
+def test_search_checkpoint_rejects_changed_features(cleaned, tmp_path):
+    search.run_search(cleaned, config(tmp_path))
+    with pytest.raises(search.CheckpointMismatch) as e:
+        search.run_search(cleaned, config(tmp_path, pca_mode='incremental'))
+    assert e.value.changed == ['features']
@@ -0,0 +1,31 @@
+import numpy as np
+
+from src.modeling import train
+
+
+def split(cleaned) -> tuple:
+    y, _ = train.target_vector(cleaned)
+    return train.holdout_split(y, train.modeling_config(), seed=0)
+
+
+def test_fold_features_fit_on_train_rows_only(cleaned):
+    train_rows, test_rows = split(cleaned)
+    base = train.fold_features(cleaned, train_rows, test_rows)
+    # 只改测试行：训练部分的特征（含聚类 / PCA / 选中列）不变
+    shifted = cleaned.copy()
+    pos = shifted.columns.get_loc('MonthlyCharges')
+    shifted.iloc[test_rows, pos] = shifted.iloc[test_rows, pos] * 10
+    moved = train.fold_features(shifted, train_rows, test_rows)
+    assert not moved['cached']
+    assert moved['names'] == base['names']
+    np.testing.assert_array_equal(moved['X_train'], base['X_train'])
+    assert 'Churn_numeric' not in base['names']
+
+
+def test_fold_features_cached_per_rows_and_config(cleaned):
+    train_rows, test_rows = split(cleaned)
+    first = train.fold_features(cleaned, train_rows, test_rows, {'chunksize': 500})
+    again = train.fold_features(cleaned, train_rows, test_rows, {'chunksize': 500})
+    assert again['cached'] and again['X_test'] is first['X_test']
+    other = train.fold_features(cleaned, train_rows, test_rows, {'chunksize': 500, 'pca_mode': 'incremental'})
+    assert not other['cached']